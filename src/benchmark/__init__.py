@@ -0,0 +1,4 @@
+"""
+Benchmarks de las consultas: generador de datasets sintéticos (generate.py) y ejecución de todas
+las variantes con reporte y comparación contra una línea base (run.py).
+"""
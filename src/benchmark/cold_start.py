@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CLOUD_FUNCTION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cloud_function')
+
+# Módulos costosos de importar cuya carga se informa en cada medición.
+HEAVY_MODULES = ('emoji', 'utils.emoji_matcher', 'google.cloud.storage', 'memory_profiler', 'cProfile', 'pstats')
+
+# Lo que se importa en cada medición: el arranque de la función y la primera solicitud de cada consulta.
+TARGETS = ('main', 'q1_time', 'q1_memory', 'q2_time', 'q2_memory', 'q3_time', 'q3_memory', 'utils.engine')
+
+# Código del proceso hijo: importa el módulo en un intérprete nuevo y mide cuánto tarda.
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+try:
+    __import__(sys.argv[1])
+    error = None
+except ImportError as e:
+    error = str(e)
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'error': error, 'loaded': [name for name in sys.argv[2:] if name in sys.modules]}))
+"""
+
+
+def measure_import(module: str, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Importa el módulo en intérpretes nuevos (desde el directorio de la Cloud Function) y devuelve el
+    tiempo de importación y los módulos costosos que quedaron cargados.
+
+    Args:
+        module (str): Módulo a importar, por ejemplo 'main' o 'q2_time'.
+        repeat (int): Cantidad de procesos; se informan la mediana y el mínimo.
+
+    Returns:
+        Dict[str, Any]: Segundos (mediana y mínimo), módulos costosos cargados o el error de importación.
+    """
+    timings = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, '-c', _CHILD, module, *HEAVY_MODULES],
+            cwd=CLOUD_FUNCTION_DIR, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'error'}
+        child = json.loads(completed.stdout.strip().splitlines()[-1])
+        if child['error']:
+            # Dependencia no instalada en este entorno (por ejemplo google-cloud-storage).
+            return {'skipped': child['error']}
+        timings.append(child['seconds'])
+    return {'median_seconds': statistics.median(timings), 'min_seconds': min(timings), 'loaded': child['loaded']}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Punto de entrada de línea de comandos; imprime el reporte JSON del tiempo de importación.
+    """
+    parser = argparse.ArgumentParser(description="Mide el arranque en frío (tiempo de importación) de la Cloud Function.")
+    parser.add_argument('--modules', nargs='+', default=list(TARGETS))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    report = {}
+    for module in args.modules:
+        report[module] = measure_import(module, args.repeat)
+        result = report[module]
+        if 'median_seconds' in result:
+            print(f"{module}: {result['median_seconds'] * 1000:.1f} ms, cargados: {', '.join(result['loaded']) or '-'}",
+                  file=sys.stderr)
+        else:
+            print(f"{module}: omitido ({result.get('skipped') or result.get('error')})", file=sys.stderr)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    # Uso (desde src): python -m benchmark.cold_start --repeat 10
+    main()
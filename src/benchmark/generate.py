@@ -0,0 +1,138 @@
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import random
+
+# Emojis de ejemplo: simples, con selector de variación, tono de piel, banderas y secuencias ZWJ.
+EMOJIS = ['😂', '🙏', '❤️', '🚜', '👍🏽', '👨‍👩‍👧', '🇮🇳', '✊', '🏳️‍🌈', '👩🏾‍🌾', '💪', '🔥', '😭', '🌾', '🙏🏻', '#️⃣']
+WORDS = ['farmers', 'protest', 'किसान', 'ਕਿਸਾਨ', '#FarmersProtest', '#IStandWithFarmers', 'modi', 'delhi', 'support',
+         'Ñandú', 'india', 'kisan', 'andolan', 'tractor', 'rally', 'https://t.co/abc123', '"quoted"', '{brace}']
+
+
+def _user(username: str, rng: random.Random) -> Dict[str, Any]:
+    """
+    Perfil de usuario con el mismo esquema que el dataset original.
+    """
+    return {
+        'username': username, 'displayname': username.title(), 'id': rng.randint(1, 10 ** 18),
+        'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 20))), 'rawDescription': '',
+        'descriptionUrls': [], 'verified': rng.random() < 0.01, 'created': '2015-06-01T10:00:00+00:00',
+        'followersCount': rng.randint(0, 10 ** 5), 'friendsCount': rng.randint(0, 5000), 'statusesCount': rng.randint(0, 10 ** 5),
+        'favouritesCount': rng.randint(0, 10 ** 5), 'listedCount': 0, 'mediaCount': 0, 'location': 'Punjab, India',
+        'protected': False, 'linkUrl': None, 'linkTcourl': None,
+        'profileImageUrl': 'https://pbs.twimg.com/profile_images/1/x_normal.jpg', 'profileBannerUrl': None,
+        'url': 'https://twitter.com/' + username,
+    }
+
+
+def _mention(username: str) -> Dict[str, Any]:
+    """
+    Usuario mencionado, con el esquema de mentionedUsers (sin datos de perfil).
+    """
+    return {'username': username, 'displayname': username.title(), 'id': 1, 'description': None, 'rawDescription': None,
+            'descriptionUrls': None, 'verified': None, 'created': None, 'followersCount': None, 'friendsCount': None,
+            'statusesCount': None, 'favouritesCount': None, 'listedCount': None, 'mediaCount': None, 'location': None,
+            'protected': None, 'linkUrl': None, 'linkTcourl': None, 'profileImageUrl': None, 'profileBannerUrl': None,
+            'url': 'https://twitter.com/' + username}
+
+
+def _skewed(rng: random.Random, cardinality: int) -> int:
+    """
+    Índice en [0, cardinality) con distribución sesgada (pocos muy frecuentes y una cola larga).
+    """
+    return min(int(rng.paretovariate(1.2)) - 1, cardinality - 1)
+
+
+def _tweet(tweet_id: int, day: int, rng: random.Random, options: Dict[str, Any], nested: bool = False) -> Dict[str, Any]:
+    """
+    Tweet con el esquema del dataset original (incluye quotedTweet anidado en parte de los tweets).
+    """
+    tokens = [
+        rng.choice(EMOJIS) if rng.random() < options['emoji_density'] else rng.choice(WORDS)
+        for _ in range(rng.randint(4, 40))
+    ]
+    mentions = [
+        'mention%d' % _skewed(rng, options['mention_cardinality'])
+        for _ in range(rng.randint(1, 4) if rng.random() < options['mention_ratio'] else 0)
+    ]
+    content = ' '.join(['@' + name for name in mentions] + tokens)
+    date = '2021-02-%02dT%02d:%02d:%02d+00:00' % (day, rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59))
+    username = 'user%d' % _skewed(rng, options['user_cardinality'])
+
+    return {
+        'url': 'https://twitter.com/%s/status/%d' % (username, tweet_id), 'date': date, 'content': content,
+        'renderedContent': content, 'id': tweet_id, 'user': _user(username, rng), 'outlinks': [], 'tcooutlinks': [],
+        'replyCount': rng.randint(0, 50), 'retweetCount': rng.randint(0, 500), 'likeCount': rng.randint(0, 2000),
+        'quoteCount': rng.randint(0, 10), 'conversationId': tweet_id, 'lang': 'en',
+        'source': '<a href="http://twitter.com/download/android" rel="nofollow">Twitter for Android</a>',
+        'sourceUrl': 'http://twitter.com/download/android', 'sourceLabel': 'Twitter for Android', 'media': None,
+        'retweetedTweet': None,
+        'quotedTweet': _tweet(tweet_id + 1, day, rng, options, True) if not nested and rng.random() < options['quote_ratio'] else None,
+        'mentionedUsers': [_mention(name) for name in mentions] or None,
+    }
+
+
+def generate(file_path: str, size_mb: float = 50, lines: Optional[int] = None, emoji_density: float = 0.1,
+             mention_cardinality: int = 10000, user_cardinality: int = 20000, mention_ratio: float = 0.5,
+             quote_ratio: float = 0.2, days: int = 28, seed: int = 0) -> Dict[str, Any]:
+    """
+    Genera un archivo NDJSON de tweets sintéticos con el esquema del dataset del challenge.
+
+    Args:
+        file_path (str): Ruta del archivo a generar.
+        size_mb (float): Tamaño aproximado del archivo en MB (se ignora si se indica lines).
+        lines (Optional[int]): Cantidad exacta de tweets a generar.
+        emoji_density (float): Probabilidad de que cada token del contenido sea un emoji.
+        mention_cardinality (int): Cantidad de usuarios distintos que pueden ser mencionados.
+        user_cardinality (int): Cantidad de autores distintos.
+        mention_ratio (float): Proporción de tweets con menciones.
+        quote_ratio (float): Proporción de tweets que citan a otro tweet (quotedTweet).
+        days (int): Cantidad de días de febrero de 2021 que abarcan los tweets.
+        seed (int): Semilla del generador; la misma configuración genera el mismo archivo.
+
+    Returns:
+        Dict[str, Any]: Los parámetros usados junto con el tamaño en bytes y la cantidad de líneas.
+    """
+    options = {
+        'emoji_density': emoji_density, 'mention_cardinality': mention_cardinality, 'user_cardinality': user_cardinality,
+        'mention_ratio': mention_ratio, 'quote_ratio': quote_ratio,
+    }
+    rng = random.Random(seed)
+    target = None if lines is not None else int(size_mb * 1024 * 1024)
+    written = count = 0
+
+    with open(file_path, 'w', encoding='utf-8') as f:
+        while (count < lines) if lines is not None else (written < target):
+            # Como en el dataset original, los tweets están ordenados por fecha.
+            day = 1 + (count * days // lines if lines is not None else written * days // target)
+            # Se alternan líneas con y sin escape de caracteres no ASCII, ambas presentes en datos reales.
+            line = json.dumps(_tweet(count * 2, day, rng, options), ensure_ascii=rng.random() < 0.5) + '\n'
+            f.write(line)
+            written += len(line.encode('utf-8'))
+            count += 1
+
+    return {**options, 'days': days, 'seed': seed, 'bytes': written, 'lines': count}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Punto de entrada de línea de comandos; imprime los parámetros y el tamaño del archivo generado.
+    """
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético de tweets (NDJSON).")
+    parser.add_argument('file_path')
+    parser.add_argument('--size-mb', type=float, default=50)
+    parser.add_argument('--lines', type=int)
+    parser.add_argument('--emoji-density', type=float, default=0.1)
+    parser.add_argument('--mention-cardinality', type=int, default=10000)
+    parser.add_argument('--user-cardinality', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(generate(
+        args.file_path, args.size_mb, args.lines, args.emoji_density, args.mention_cardinality,
+        args.user_cardinality, seed=args.seed,
+    )))
+
+
+if __name__ == "__main__":
+    # Uso (desde src): python -m benchmark.generate tweets.json --size-mb 200 --emoji-density 0.2
+    main()
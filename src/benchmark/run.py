@@ -0,0 +1,418 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Tolerancia por defecto frente a la línea base: una variante regresa si es más de un 20% más lenta
+# o usa más de un 20% más de memoria.
+DEFAULT_TOLERANCE = 0.2
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+class Variant(NamedTuple):
+    """
+    Una forma de resolver las consultas. Los módulos se importan, y setup y teardown se ejecutan,
+    fuera de la medición. data indica el archivo que lee la variante si no es el dataset (por
+    ejemplo uno que genera setup); el throughput se calcula sobre ese archivo.
+    """
+    run: Callable[[str], Any]
+    modules: Tuple[str, ...] = ('engine',)
+    setup: Optional[Callable[[str], None]] = None
+    teardown: Optional[Callable[[str], None]] = None
+    data: Optional[Callable[[str], str]] = None
+
+
+def _query(name: str, **kwargs) -> Variant:
+    """
+    Variante que llama a una de las funciones q1/q2/q3 (módulo y función con el mismo nombre).
+    """
+    return Variant(lambda path: getattr(importlib.import_module(name), name)(path, **kwargs), modules=(name,))
+
+
+def _engine(setup: Optional[Callable[[str], None]] = None, teardown: Optional[Callable[[str], None]] = None,
+            **kwargs) -> Variant:
+    """
+    Variante que resuelve q1, q2 y q3 juntas con el motor de agregaciones.
+    """
+    def run(path: str) -> Any:
+        import engine
+        return engine.run_query(path, [engine.Q1_SPEC, engine.Q2_SPEC, engine.Q3_SPEC], **kwargs)
+    return Variant(run, setup=setup, teardown=teardown)
+
+
+def _vectorized(name: str, **kwargs) -> Variant:
+    """
+    Variante de q1 o q3 con el conteo vectorizado; se omite si NumPy no está instalado.
+    """
+    variant = _query(name, vectorized=True)
+    return variant._replace(modules=variant.modules + ('numpy',), **kwargs)
+
+
+def _use_backend(name: str) -> Callable[[str], None]:
+    """
+    Preparación que fija el parser de JSON; la variante se omite si no está instalado.
+    """
+    def setup(path: str) -> None:
+        import json_backend
+        json_backend.set_backend(name)
+    return setup
+
+
+def _build_cache(path: str) -> None:
+    """
+    Genera la caché columnar (su costo no forma parte de la medición de la consulta).
+    """
+    import columnar
+    columnar.build_cache(path)
+
+
+def _remove_cache(path: str) -> None:
+    """
+    Elimina la caché para que no la usen las variantes siguientes.
+    """
+    import columnar
+    os.remove(columnar.cache_path(path))
+
+
+# Tamaño (sin comprimir) de cada frame de los .zst de prueba, como los que genera pzstd.
+ZSTD_FRAME_BYTES = 4 * 1024 * 1024
+
+
+def _write_compressed(extension: str) -> Callable[[str], None]:
+    """
+    Preparación que escribe una copia comprimida del dataset (<archivo><extensión>); la compresión
+    no forma parte de la medición.
+    """
+    def setup(path: str) -> None:
+        import gzip
+        import shutil
+        import zipfile
+        if extension == '.gz':
+            with open(path, 'rb') as src, gzip.open(path + extension, 'wb') as out:
+                shutil.copyfileobj(src, out)
+        elif extension == '.zip':
+            with zipfile.ZipFile(path + extension, 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.write(path, os.path.basename(path))
+        else:
+            from compressed import zstd_module
+            # Un frame por bloque para poder descomprimir en paralelo.
+            compressor = zstd_module().ZstdCompressor()
+            with open(path, 'rb') as src, open(path + extension, 'wb') as out:
+                while True:
+                    chunk = src.read(ZSTD_FRAME_BYTES)
+                    if not chunk:
+                        break
+                    out.write(compressor.compress(chunk))
+    return setup
+
+
+def _compressed(extension: str, **kwargs) -> Variant:
+    """
+    Variante que resuelve q1, q2 y q3 juntas leyendo una copia comprimida del dataset; el
+    throughput se calcula sobre el tamaño sin comprimir para compararla con la lectura del plano.
+    """
+    def run(path: str) -> Any:
+        import engine
+        return engine.run_query(path + extension, [engine.Q1_SPEC, engine.Q2_SPEC, engine.Q3_SPEC], **kwargs)
+    return Variant(run, modules=('engine', 'compressed'), setup=_write_compressed(extension),
+                   teardown=lambda path: os.remove(path + extension))
+
+
+def _build_index(path: str) -> None:
+    """
+    Genera el índice por fecha antes de medir la consulta por rango.
+    """
+    import date_index
+    date_index.load_index(path)
+
+
+def _middle_week(path: str) -> Any:
+    """
+    q1 restringida a la semana central del dataset, usando el índice por fecha.
+    """
+    import date_index
+    from q1_time import q1_time
+    days = sorted(date_index.load_index(path))
+    middle = len(days) // 2
+    return q1_time(path, date_range=(days[max(middle - 3, 0)], days[min(middle + 3, len(days) - 1)]))
+
+
+# Dataset de q1 con muchos pares (fecha, usuario) distintos, donde los conteos dominan la memoria:
+# solo tiene la fecha y el autor de cada tweet, con los autores repartidos de forma uniforme.
+HIGH_CARDINALITY_LINES = 2_000_000
+HIGH_CARDINALITY_USERS = 300_000
+HIGH_CARDINALITY_DAYS = 28
+
+
+def _high_cardinality_path(path: str) -> str:
+    return path + '.users.json'
+
+
+def _write_high_cardinality(path: str) -> None:
+    """
+    Genera junto al dataset el archivo de q1 con muchos usuarios (ver HIGH_CARDINALITY_LINES).
+    """
+    import random
+    rng = random.Random(0)
+    with open(_high_cardinality_path(path), 'w', encoding='utf-8') as f:
+        for i in range(HIGH_CARDINALITY_LINES):
+            day = 1 + i * HIGH_CARDINALITY_DAYS // HIGH_CARDINALITY_LINES
+            f.write('{"date": "2021-02-%02dT10:00:00+00:00", "user": {"username": "user%d"}}\n'
+                    % (day, rng.randrange(HIGH_CARDINALITY_USERS)))
+
+
+def _remove_high_cardinality(path: str) -> None:
+    os.remove(_high_cardinality_path(path))
+
+
+def _high_cardinality(name: str) -> Variant:
+    """
+    Variante de q1 sobre el archivo con muchos usuarios, para comparar la memoria del conteo
+    compacto de q1_memory con la de q1_time.
+    """
+    variant = _query(name)
+    return variant._replace(run=lambda path: variant.run(_high_cardinality_path(path)), setup=_write_high_cardinality,
+                            teardown=_remove_high_cardinality, data=_high_cardinality_path)
+
+
+VARIANTS: Dict[str, Variant] = {
+    'q1_time': _query('q1_time'),
+    'q1_memory': _query('q1_memory'),
+    'q2_time': _query('q2_time'),
+    'q2_memory': _query('q2_memory'),
+    'q3_time': _query('q3_time'),
+    'q3_memory': _query('q3_memory'),
+    'q1_time[high_cardinality]': _high_cardinality('q1_time'),
+    'q1_memory[high_cardinality]': _high_cardinality('q1_memory'),
+    'q2_memory[approximate]': _query('q2_memory', approximate=True),
+    'q3_memory[approximate]': _query('q3_memory', approximate=True),
+    'q1_time[vectorized]': _vectorized('q1_time'),
+    'q3_time[vectorized]': _vectorized('q3_time'),
+    'q1_time[columnar]': _query('q1_time')._replace(setup=_build_cache, teardown=_remove_cache),
+    'q1_time[vectorized,columnar]': _vectorized('q1_time', setup=_build_cache, teardown=_remove_cache),
+    'q3_time[columnar]': _query('q3_time')._replace(setup=_build_cache, teardown=_remove_cache),
+    'q3_time[vectorized,columnar]': _vectorized('q3_time', setup=_build_cache, teardown=_remove_cache),
+    'q1_time[date_range]': Variant(_middle_week, modules=('q1_time', 'date_index'), setup=_build_index),
+    'engine': _engine(),
+    'engine[full_parse]': _engine(projected=False),
+    'engine[json]': _engine(setup=_use_backend('json')),
+    'engine[orjson]': _engine(setup=_use_backend('orjson')),
+    'engine[workers]': _engine(workers=max(os.cpu_count() or 1, 2)),
+    'engine[columnar]': _engine(setup=_build_cache, teardown=_remove_cache),
+    'engine[mmap]': _engine(mapped=True),
+    'engine[mmap,workers]': _engine(mapped=True, workers=max(os.cpu_count() or 1, 2)),
+    'engine[gzip]': _compressed('.gz'),
+    'engine[zip]': _compressed('.zip'),
+    'engine[zstd]': _compressed('.zst'),
+    'engine[zstd,workers]': _compressed('.zst', workers=max(os.cpu_count() or 1, 2)),
+}
+
+
+def _peak_rss_mb() -> float:
+    """
+    Memoria residente máxima del proceso y de sus procesos hijos (en MB).
+    """
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux informa KB y macOS bytes.
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _file_stats(file_path: str) -> Dict[str, int]:
+    """
+    Tamaño en bytes y cantidad de líneas del archivo.
+    """
+    with open(file_path, 'rb') as f:
+        lines = sum(1 for _ in f)
+    return {'bytes': os.path.getsize(file_path), 'lines': lines}
+
+
+def measure(name: str, file_path: str, repeat: int = 1) -> Dict[str, Any]:
+    """
+    Mide una variante en el proceso actual. Se usa desde un proceso nuevo por variante (ver
+    run_variant) para que la memoria máxima no incluya la de otras variantes.
+
+    Returns:
+        Dict[str, Any]: El mejor tiempo de las repeticiones, todos los tiempos y la memoria máxima,
+        o el motivo por el que se omitió la variante.
+    """
+    variant = VARIANTS[name]
+    timings = []
+    # Las consultas informan por consola las líneas inválidas; no forman parte del reporte.
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            for module in variant.modules:
+                importlib.import_module(module)
+            if variant.setup:
+                variant.setup(file_path)
+        except (ImportError, ValueError) as e:
+            return {'skipped': str(e)}
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                variant.run(file_path)
+                timings.append(time.perf_counter() - start)
+            result = {'seconds': min(timings), 'timings': timings, 'peak_rss_mb': _peak_rss_mb()}
+            if variant.data:
+                result['data'] = _file_stats(variant.data(file_path))
+        finally:
+            if variant.teardown:
+                variant.teardown(file_path)
+    return result
+
+
+def run_variant(name: str, file_path: str, repeat: int = 1) -> Dict[str, Any]:
+    """
+    Ejecuta measure en un intérprete nuevo (con src en el path) y devuelve su resultado.
+    """
+    src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmark.run', '--child', name, file_path, '--repeat', str(repeat)],
+        cwd=src, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'error'}
+    return json.loads(completed.stdout)
+
+
+def run_suite(file_path: str, variants: List[str], repeat: int = 1, dataset: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Mide todas las variantes sobre el archivo y arma el reporte.
+
+    Args:
+        file_path (str): Dataset NDJSON a utilizar.
+        variants (List[str]): Nombres de las variantes (claves de VARIANTS).
+        repeat (int): Repeticiones por variante; se informa el mejor tiempo.
+        dataset (Optional[Dict[str, Any]]): Parámetros del dataset sintético, si se generó.
+
+    Returns:
+        Dict[str, Any]: Reporte con el entorno, el dataset y, por variante, el tiempo, el throughput
+        (MB/s y líneas/s) y la memoria máxima.
+    """
+    stats = _file_stats(file_path)
+
+    results = {}
+    for name in variants:
+        result = run_variant(name, file_path, repeat)
+        if 'seconds' in result:
+            data = result.get('data', stats)
+            result['mb_per_s'] = data['bytes'] / (1024 * 1024) / result['seconds']
+            result['lines_per_s'] = data['lines'] / result['seconds']
+        results[name] = result
+        print(f"{name}: {_describe(result)}", file=sys.stderr)
+
+    return {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'dataset': {**(dataset or {}), 'path': os.path.abspath(file_path), **stats},
+        'results': results,
+    }
+
+
+def _describe(result: Dict[str, Any]) -> str:
+    """
+    Resumen de una línea del resultado de una variante.
+    """
+    if 'seconds' not in result:
+        return f"omitida ({result.get('skipped') or result.get('error')})"
+    return (f"{result['seconds']:.2f} s, {result['mb_per_s']:.1f} MB/s, {result['lines_per_s']:.0f} líneas/s, "
+            f"{result['peak_rss_mb']:.0f} MB")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Compara un reporte con la línea base y devuelve las regresiones encontradas: variantes cuyo
+    tiempo o memoria máxima supera en más de tolerance (proporción) a los de la línea base.
+    """
+    regressions = []
+    for name, result in report['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if 'seconds' not in result or not reference or 'seconds' not in reference:
+            continue
+        for metric, unit in (('seconds', 's'), ('peak_rss_mb', 'MB')):
+            if result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {result[metric]:.2f} {unit} > {reference[metric]:.2f} {unit} (+{tolerance:.0%})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Punto de entrada de línea de comandos. Devuelve 1 si alguna variante regresó frente a la línea base.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark de las variantes de q1, q2 y q3.")
+    parser.add_argument('--data', help="Dataset existente; si no se indica se genera uno sintético.")
+    parser.add_argument('--size-mb', type=float, default=50)
+    parser.add_argument('--emoji-density', type=float, default=0.1)
+    parser.add_argument('--mention-cardinality', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="Ruta del reporte JSON (por defecto se imprime).")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Guarda el reporte como nueva línea base.")
+    parser.add_argument('--no-compare', action='store_true', help="Solo mide, sin comparar con la línea base.")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--child', nargs=2, metavar=('VARIANT', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], args.child[1], args.repeat)))
+        return 0
+
+    if args.data and os.path.exists(args.data + '.colcache'):
+        # Con caché columnar todas las variantes leerían de ella en lugar del JSON.
+        print("Error: el dataset tiene caché columnar; elimínela antes de medir.", file=sys.stderr)
+        return 2
+
+    if not (args.save_baseline or args.no_compare or os.path.exists(args.baseline)):
+        # Sin línea base no se detectan regresiones; se avisa antes de medir en lugar de salir con 0.
+        print(f"Error: no existe la línea base {args.baseline}; guárdela con --save-baseline o use --no-compare.",
+              file=sys.stderr)
+        return 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = None
+        file_path = args.data
+        if file_path is None:
+            from benchmark.generate import generate
+            file_path = os.path.join(tmp, 'tweets.json')
+            dataset = generate(file_path, args.size_mb, emoji_density=args.emoji_density,
+                               mention_cardinality=args.mention_cardinality, seed=args.seed)
+        report = run_suite(file_path, args.variants, args.repeat, dataset)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return 0
+
+    if args.no_compare:
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if {key: value for key, value in baseline['dataset'].items() if key != 'path'} != \
+            {key: value for key, value in report['dataset'].items() if key != 'path'}:
+        print("Aviso: la línea base se midió con otro dataset.", file=sys.stderr)
+
+    regressions = compare(report, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"Regresión: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    # Uso (desde src): python -m benchmark.run --size-mb 100 --output report.json
+    sys.exit(main())
@@ -0,0 +1,184 @@
+from typing import Any, Dict, List, Optional
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from bad_records import INVALID_JSON, MISSING_KEYS, BadRecords
+from benchmark.run import _peak_rss_mb
+
+# Configuraciones de ventana que se miden (argumentos de streaming.WindowedTopK).
+VARIANTS: Dict[str, Dict[str, Any]] = {
+    'tumbling': {'size': 3600},
+    'sliding': {'size': 3600, 'slide': 300},
+    'sliding[approximate]': {'size': 3600, 'slide': 300, 'capacity': 1000},
+    'sliding[day]': {'size': 86400, 'slide': 3600},
+}
+
+
+def sort_by_date(file_path: str, output_path: str) -> BadRecords:
+    """
+    Escribe una copia del dataset ordenada por fecha, como llegarían los tweets en vivo (el
+    generador ordena por día pero no dentro de cada día). Las líneas que no son JSON válido o no
+    tienen fecha no se copian y se cuentan en el resultado, con sus offsets.
+    """
+    # Solo se guardan la fecha y el offset de cada línea: la memoria de este proceso se hereda en la
+    # medición de los procesos hijos (ru_maxrss).
+    dates = []
+    # Sin avisos: con el reporte impreso por stdout se mezclarían con el JSON.
+    errors = BadRecords(log_interval=None)
+    offset = 0
+    with open(file_path, 'rb') as f:
+        for line in f:
+            errors.position = offset
+            try:
+                date = json.loads(line)['date']
+            except ValueError:
+                errors.record(INVALID_JSON)
+            except (KeyError, TypeError):
+                errors.record(MISSING_KEYS)
+            else:
+                if isinstance(date, str):
+                    dates.append((date, offset))
+                else:
+                    errors.record(MISSING_KEYS)
+            offset += len(line)
+        dates.sort()
+        with open(output_path, 'wb') as out:
+            for _, offset in dates:
+                f.seek(offset)
+                line = f.readline()
+                # La última línea del archivo puede no terminar en salto de línea.
+                out.write(line if line.endswith(b'\n') else line + b'\n')
+    return errors
+
+
+def measure(name: str, file_path: str, lateness: int = 0, query_every: int = 1000) -> Dict[str, Any]:
+    """
+    Alimenta las ventanas con el archivo línea por línea y consulta el top de la ventana en curso
+    cada query_every tweets. Se usa desde un proceso nuevo por variante (ver run_variant).
+
+    Returns:
+        Dict[str, Any]: Tiempo de ingesta (sin las consultas), tweets por segundo, latencia de las
+        consultas en milisegundos (mediana, p99 y máxima), ventanas cerradas y memoria máxima.
+    """
+    from engine import parse_lines
+    from streaming import WINDOW_KEYS, WindowedTopK
+
+    windows = WindowedTopK(k=10, lateness=lateness, on_window=lambda result: None, **VARIANTS[name])
+    latencies = []
+    tweets = 0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), open(file_path, 'rb') as f:
+        start = time.perf_counter()
+        for tweet in parse_lines(f, WINDOW_KEYS, errors=windows.errors):
+            windows.add(tweet)
+            tweets += 1
+            if tweets % query_every == 0:
+                query_start = time.perf_counter()
+                windows.top()
+                latencies.append(time.perf_counter() - query_start)
+        windows.flush()
+        seconds = time.perf_counter() - start - sum(latencies)
+
+    latencies.sort()
+    return {
+        'seconds': seconds,
+        'tweets': tweets,
+        'tweets_per_s': tweets / seconds,
+        'mb_per_s': os.path.getsize(file_path) / (1024 * 1024) / seconds,
+        'query_ms': {
+            'median': statistics.median(latencies) * 1000 if latencies else None,
+            'p99': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+            'max': latencies[-1] * 1000 if latencies else None,
+            'queries': len(latencies),
+        },
+        'windows': windows.closed,
+        'late': windows.errors.counts.get('late', 0),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def run_variant(name: str, file_path: str, lateness: int, query_every: int) -> Dict[str, Any]:
+    """
+    Ejecuta measure en un intérprete nuevo (con src en el path) y devuelve su resultado.
+    """
+    src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmark.streaming', '--child', name, file_path,
+         '--lateness', str(lateness), '--query-every', str(query_every)],
+        cwd=src, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'error'}
+    return json.loads(completed.stdout)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Punto de entrada de línea de comandos: mide la ingesta sostenida y la latencia de consulta de
+    cada configuración de ventana e imprime el reporte JSON (o lo guarda con --output).
+    """
+    parser = argparse.ArgumentParser(description="Benchmark del modo streaming por ventanas.")
+    parser.add_argument('--data', help="Dataset existente; si no se indica se genera uno sintético.")
+    parser.add_argument('--size-mb', type=float, default=50)
+    parser.add_argument('--days', type=int, default=28)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lateness', type=int, default=0)
+    parser.add_argument('--query-every', type=int, default=1000)
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument('--output', help="Ruta del reporte JSON (por defecto se imprime).")
+    parser.add_argument('--child', nargs=2, metavar=('VARIANT', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], args.child[1], args.lateness, args.query_every)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = {}
+        file_path = args.data
+        if file_path is None:
+            from benchmark.generate import generate
+            file_path = os.path.join(tmp, 'tweets.json')
+            dataset = generate(file_path, args.size_mb, days=args.days, seed=args.seed)
+        # La ingesta se mide sobre una copia ordenada por fecha (el orden no forma parte de la medición).
+        ordered = os.path.join(tmp, 'ordered.json')
+        skipped = sort_by_date(file_path, ordered)
+        if skipped.total:
+            print(f"Se omitieron {skipped.total} líneas sin fecha legible: {dict(skipped.counts)}", file=sys.stderr)
+
+        results = {}
+        for name in args.variants:
+            result = results[name] = run_variant(name, ordered, args.lateness, args.query_every)
+            if 'seconds' in result:
+                print(f"{name}: {result['tweets_per_s']:.0f} tweets/s, {result['mb_per_s']:.1f} MB/s, consulta "
+                      f"{result['query_ms']['median']:.2f} ms (p99 {result['query_ms']['p99']:.2f} ms), "
+                      f"{result['peak_rss_mb']:.0f} MB", file=sys.stderr)
+            else:
+                print(f"{name}: {result.get('error')}", file=sys.stderr)
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'dataset': {**dataset, 'path': os.path.abspath(args.data) if args.data else None},
+        'skipped': skipped.as_dict(),
+        'lateness': args.lateness,
+        'query_every': args.query_every,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    # Uso (desde src): python -m benchmark.streaming --size-mb 100 --lateness 600 --output streaming.json
+    main()
@@ -0,0 +1,178 @@
+from typing import Any, BinaryIO, Iterator, List, Optional, Tuple
+import hashlib
+import os
+import pickle
+from bad_records import BadRecords
+from engine import AggregationSpec, Aggregator, scan_lines
+
+# Los checkpoints se guardan junto a los datos: <archivo>.<id de las agregaciones>.ckpt
+CHECKPOINT_SUFFIX = '.ckpt'
+CHECKPOINT_VERSION = 2
+
+# Bytes del inicio y del final del prefijo consumido que se usan para su huella.
+FINGERPRINT_BYTES = 64 * 1024
+
+
+def _fields(specs: List[AggregationSpec]) -> List[Tuple[str, Optional[str], Optional[int], bool, bool]]:
+    """
+    Datos de las agregaciones de los que depende el estado guardado (no incluye top_k).
+    """
+    return [(spec.group_by, spec.sub_group, spec.capacity, spec.compact, spec.vectorized) for spec in specs]
+
+
+def _date_key(date_range: Optional[Tuple[Any, Any]]) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """
+    Fechas del filtro como strings YYYY-MM-DD (acepta también datetime.date), o None sin filtro.
+    """
+    if date_range is None:
+        return None
+    return tuple(str(day) if day is not None else None for day in date_range)
+
+
+def checkpoint_path(file_path: str, specs: List[AggregationSpec], date_range: Optional[Tuple[Any, Any]] = None) -> str:
+    """
+    Devuelve la ruta del checkpoint de un conjunto de agregaciones. Solo dependen de los campos
+    agrupados, del modo de conteo y del rango de fechas (no de top_k), por lo que consultas que
+    difieren en k comparten el checkpoint.
+    """
+    fields = ','.join(
+        f"{group_by}:{sub_group or ''}" + (f"~{capacity}" if capacity is not None else '')
+        + ('#compact' if compact else '') + ('#vectorized' if vectorized else '')
+        for group_by, sub_group, capacity, compact, vectorized in _fields(specs)
+    )
+    if date_range is not None:
+        fields += '@{}..{}'.format(*(day or '' for day in _date_key(date_range)))
+    return f"{file_path}.{hashlib.sha1(fields.encode('utf-8')).hexdigest()[:12]}{CHECKPOINT_SUFFIX}"
+
+
+def fingerprint(f: BinaryIO, offset: int) -> str:
+    """
+    Calcula la huella de los primeros offset bytes del archivo a partir de su largo, su inicio y su
+    final. Detecta truncamientos y reescrituras del archivo sin volver a leer el prefijo completo;
+    un cambio que solo afecte la zona intermedia del prefijo no se detecta.
+
+    Args:
+        f (BinaryIO): El archivo abierto en modo binario.
+        offset (int): Largo del prefijo consumido.
+
+    Returns:
+        str: La huella en hexadecimal.
+    """
+    digest = hashlib.sha256(str(offset).encode('ascii'))
+    f.seek(0)
+    digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+    f.seek(max(offset - FINGERPRINT_BYTES, 0))
+    digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+    return digest.hexdigest()
+
+
+def load_checkpoint(file_path: str, specs: List[AggregationSpec],
+                    date_range: Optional[Tuple[Any, Any]] = None) -> Optional[Tuple[int, List[Aggregator]]]:
+    """
+    Carga el checkpoint de las agregaciones si sigue siendo válido para el archivo.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets.
+        specs (List[AggregationSpec]): Agregaciones a calcular.
+        date_range (Optional[Tuple[Any, Any]]): Rango de fechas con el que se contó.
+
+    Returns:
+        Optional[Tuple[int, List[Aggregator]]]: (offset, agregadores con los conteos hasta offset), o
+        None si no hay checkpoint, si no se puede leer o si el archivo fue truncado o reescrito.
+    """
+    # Un checkpoint dañado o guardado con otra forma de las clases (por ejemplo antes de un cambio en
+    # Aggregator o CompactCounts) puede fallar al leerse o al mezclarse: se recorre el archivo completo.
+    try:
+        with open(checkpoint_path(file_path, specs, date_range), 'rb') as f:
+            state = pickle.load(f)
+
+        if not isinstance(state, dict) or state.get('version') != CHECKPOINT_VERSION:
+            return None
+        if state['fields'] != _fields(specs) or state.get('date_range') != _date_key(date_range):
+            return None
+        if os.path.getsize(file_path) < state['offset']:
+            return None
+
+        with open(file_path, 'rb') as f:
+            if fingerprint(f, state['offset']) != state['fingerprint']:
+                return None
+
+        # Se parte de agregadores nuevos para respetar el top_k pedido en esta ejecución.
+        aggregators = [Aggregator(spec) for spec in specs]
+        for aggregator, saved in zip(aggregators, state['aggregators']):
+            aggregator.merge(saved)
+    except (FileNotFoundError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, KeyError, TypeError, ValueError):
+        return None
+    return state['offset'], aggregators
+
+
+def save_checkpoint(file_path: str, specs: List[AggregationSpec], offset: int, aggregators: List[Aggregator],
+                    date_range: Optional[Tuple[Any, Any]] = None) -> None:
+    """
+    Guarda los conteos de las agregaciones junto con el offset y la huella del prefijo consumido.
+    """
+    with open(file_path, 'rb') as f:
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'fields': _fields(specs),
+            'date_range': _date_key(date_range),
+            'offset': offset,
+            'fingerprint': fingerprint(f, offset),
+            'aggregators': aggregators,
+        }
+
+    # Se escribe a un archivo temporal y se reemplaza al final para no dejar checkpoints a medio escribir.
+    target = checkpoint_path(file_path, specs, date_range)
+    with open(target + '.tmp', 'wb') as out:
+        pickle.dump(state, out, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(target + '.tmp', target)
+
+
+def _complete_lines(f: BinaryIO, progress: List[int]) -> Iterator[bytes]:
+    """
+    Itera las líneas terminadas en salto de línea, sumando a progress[0] los bytes consumidos.
+    La última línea sin salto (que puede estar a medio escribir) queda en progress[1].
+    """
+    for line in f:
+        if not line.endswith(b'\n'):
+            progress[1] = line
+            return
+        progress[0] += len(line)
+        yield line
+
+
+def run_incremental(file_path: str, specs: List[AggregationSpec], projected: bool = True,
+                    errors: Optional[BadRecords] = None, date_range: Optional[Tuple[Any, Any]] = None) -> List[Aggregator]:
+    """
+    Resuelve las agregaciones procesando solo las líneas agregadas al archivo desde la última
+    ejecución. Si no hay checkpoint válido (primera ejecución, archivo truncado o reescrito) se
+    recorre el archivo completo. Al terminar se guarda un nuevo checkpoint.
+
+    La última línea sin salto de línea se cuenta en el resultado pero no en el checkpoint, ya que
+    puede estar a medio escribir; la siguiente ejecución la vuelve a leer.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets.
+        specs (List[AggregationSpec]): Agregaciones a calcular.
+        projected (bool): Si es True solo se decodifican las claves que usan las agregaciones.
+        errors (Optional[BadRecords]): Si se indica, cuenta los registros descartados de las líneas
+            leídas en esta ejecución.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive; solo se
+            cuentan los tweets de esas fechas. Cada rango de fechas tiene su propio checkpoint.
+
+    Returns:
+        List[Aggregator]: Un agregador con los conteos de todo el archivo por cada especificación.
+    """
+    checkpoint = load_checkpoint(file_path, specs, date_range)
+    offset, aggregators = checkpoint or (0, [Aggregator(spec) for spec in specs])
+    progress = [offset, None]
+
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        scan_lines(_complete_lines(f, progress), aggregators, projected, date_range, errors=errors, start=offset)
+
+    save_checkpoint(file_path, specs, progress[0], aggregators, date_range)
+
+    if progress[1] is not None:
+        scan_lines([progress[1]], aggregators, projected, date_range, errors=errors, start=progress[0])
+    return aggregators
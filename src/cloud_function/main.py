@@ -1,38 +1,196 @@
-from q1_memory import main as q1_memory
-from q1_time import main as q1_time
+# Las consultas (y sus dependencias: base de emojis, cliente de GCS) se importan recién al recibir
+# una solicitud que las necesita, para acortar el arranque en frío de la función.
+from utils.execution import PROFILE_MODES
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, registry
+from utils.result_cache import ResultCache
+import utils.config as config
 
-from q2_memory import main as q2_memory
-from q2_time import main as q2_time
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime
+from functools import partial
+from time import perf_counter
+import gc
+import importlib
 
-from q3_memory import main as q3_memory
-from q3_time import main as q3_time
+# Módulo que resuelve cada consulta; se importa en la primera solicitud que la pide.
+QUERY_MODULES = {
+    'q1_memory': 'q1_memory',
+    'q1_time': 'q1_time',
 
-import gc
+    'q2_memory': 'q2_memory',
+    'q2_time': 'q2_time',
+
+    'q3_memory': 'q3_memory',
+    'q3_time': 'q3_time',
+}
+
+# Parámetros opcionales que acepta cada consulta en el cuerpo de la solicitud.
+Q1_PARAMS = ('k', 'top_users', 'counts', 'date_range')
+COUNT_PARAMS = ('k', 'approximate', 'date_range')
+QUERY_PARAMS = {
+    'q1_memory': Q1_PARAMS,
+    'q1_time': Q1_PARAMS,
+
+    'q2_memory': COUNT_PARAMS,
+    'q2_time': COUNT_PARAMS,
+
+    'q3_memory': COUNT_PARAMS,
+    'q3_time': COUNT_PARAMS,
+
+    'all': ('k', 'date_range'),
+}
+
+# Mensajes de los trabajos por partes (ver utils/jobs.py): avanzar un trabajo y consultar su estado.
+JOB_MESSAGES = ('job_run', 'job_status')
+
+# Se crea al cargar el módulo, por lo que se conserva entre invocaciones de una instancia caliente.
+result_cache = ResultCache()
+
+def get_process(function: str):
+    """
+    Importa y devuelve la función que resuelve la consulta pedida, o None si no existe.
+    """
+    if function == 'all':
+        # q1, q2 y q3 en un único recorrido del archivo
+        from utils.engine import run_all
+        from utils.execution import execute
+        return partial(execute, run_all)
+    module = QUERY_MODULES.get(function)
+    return importlib.import_module(module).main if module else None
+
+def parse_params(function: str, request_json: dict) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Valida los parámetros opcionales de la consulta (k, top_users, counts, approximate y date_range).
+
+    Returns:
+        Tuple[Dict[str, Any], Optional[str]]: Los parámetros listos para la consulta y, si alguno no
+        es válido, el mensaje de error.
+    """
+    params = {}
+    for key, value in request_json.items():
+        if key in ('message', 'file_path', 'profile', 'job'):
+            continue
+        if key not in QUERY_PARAMS[function]:
+            return {}, f"No valid parameter {key} for {function}"
+        if key in ('k', 'top_users'):
+            if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                return {}, f"No valid {key} {value!r}, use a positive integer"
+        elif key in ('counts', 'approximate'):
+            if not isinstance(value, bool):
+                return {}, f"No valid {key} {value!r}, use true or false"
+        elif key == 'date_range':
+            # ["YYYY-MM-DD", "YYYY-MM-DD"], ambas inclusive; null deja el extremo abierto.
+            try:
+                start, end = value
+                for day in (start, end):
+                    if day is not None:
+                        datetime.strptime(day, "%Y-%m-%d")
+            except (TypeError, ValueError):
+                return {}, f"No valid date_range {value!r}, use [\"YYYY-MM-DD\", \"YYYY-MM-DD\"]"
+            value = (start, end)
+        params[key] = value
+    return params, None
+
+def run_cached(function: str, process, file_path: str, params: dict) -> dict:
+    """
+    Devuelve la respuesta guardada si el mismo objeto (misma generación de GCS) ya se consultó con
+    los mismos parámetros; si no, ejecuta la consulta y guarda su respuesta. Para un prefijo o patrón
+    de varios objetos la clave incluye el nombre y la generación de cada objeto que coincide.
+    """
+    import utils.utils as helper
+    from utils.shards import is_pattern
+
+    start = perf_counter()
+    try:
+        # Consulta de metadatos: confirma que el resultado guardado corresponde al objeto vigente.
+        if is_pattern(file_path):
+            # Un listado: el resultado cambia si se agrega, quita o reescribe cualquiera de los objetos.
+            generation = [[blob.name, blob.generation] for blob in helper.list_objects(file_path)]
+        else:
+            generation = helper.get_object_generation(file_path)
+    except FileNotFoundError:
+        return process(file_path, None, **params)
+
+    key = ResultCache.make_key(config.BUCKET_NAME, file_path, generation, function, params)
+    cached = result_cache.get(key)
+    if cached is not None:
+        elapsed = round(perf_counter() - start, 3)
+        return {**cached, 'timings': {'cache': elapsed, 'total': elapsed}, 'cached': True}
+
+    response = process(file_path, None, **params)
+    # Un resultado vacío puede venir de un error ya informado por la consulta; no se guarda. Las
+    # métricas son de esta ejecución y no se guardan con el resultado.
+    if response['result']:
+        result_cache.put(key, {name: value for name, value in response.items() if name != 'metrics'})
+    return {**response, 'cached': False}
+
+def job_request(function: str, request_json: dict, file_path: Optional[str] = None, params: Optional[dict] = None):
+    """
+    Crea un trabajo por partes para la consulta (si se indican file_path y params), lo avanza
+    ('job_run') o devuelve su estado ('job_status').
+    """
+    from utils import jobs
+
+    if function not in JOB_MESSAGES:
+        try:
+            return jobs.start_job(function, file_path, params)
+        except FileNotFoundError:
+            return f"No valid file_path {file_path}"
+        except ValueError as e:
+            return str(e)
+
+    job_id = request_json.get('job_id')
+    try:
+        return jobs.get_job(job_id) if function == 'job_status' else jobs.run_job(job_id)
+    except KeyError:
+        return f"No valid job_id {job_id!r}"
+
+def observed(function: str, response):
+    """
+    Suma las métricas de una consulta ejecutada a las de la instancia (ver utils/metrics.py). Las
+    respuestas de la caché y las ejecuciones con profiler no se cuentan.
+    """
+    if isinstance(response, dict) and 'metrics' in response:
+        registry.observe(function, response['metrics'])
+    return response
 
 def main(request):
+    # GET .../metrics: métricas acumuladas de la instancia en el formato de texto de Prometheus.
+    if request.method == 'GET' and request.path.rstrip('/').endswith('/metrics'):
+        return registry.prometheus(), 200, {'Content-Type': PROMETHEUS_CONTENT_TYPE}
+
     gc.collect()
     request_json = request.get_json()
     if not request_json or 'message' not in request_json:
         return 'Please, insert parameters'
 
     function = request_json['message']
+    if function in JOB_MESSAGES:
+        return job_request(function, request_json)
     file_path = request_json.get('file_path')
+    # Diagnóstico opcional ('cpu' o 'memory'); por defecto la consulta se ejecuta una sola vez sin profiler.
+    profile = request_json.get('profile')
+    if profile is not None and profile not in PROFILE_MODES:
+        return f"No valid profile {profile}, use one of {', '.join(PROFILE_MODES)}"
 
-    options = {
-        'q1_memory': q1_memory,
-        'q1_time': q1_time,
-
-        'q2_memory': q2_memory,
-        'q2_time': q2_time,
-
-        'q3_memory': q3_memory,
-        'q3_time': q3_time        
-    }
-
-    process = options.get(function)
-    if process:
-        return process(file_path)
-    return f"No valid process for {function}"
+    process = get_process(function)
+    if not process:
+        return f"No valid process for {function}"
+    params, error = parse_params(function, request_json)
+    if error:
+        return error
+    # Modo trabajo: la consulta se procesa por partes en varias invocaciones (ver utils/jobs.py).
+    job = request_json.get('job', False)
+    if not isinstance(job, bool):
+        return f"No valid job {job!r}, use true or false"
+    if job and profile is not None:
+        return "No valid profile for a job"
+    if job:
+        return job_request(function, request_json, file_path, params)
+    if profile is not None:
+        # Los diagnósticos siempre ejecutan la consulta.
+        return process(file_path, profile, **params)
+    return observed(function, run_cached(function, process, file_path, params))
 
 if __name__ == "__main__":
     print("Starting Function")
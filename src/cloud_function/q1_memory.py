@@ -1,57 +1,33 @@
-from typing import List, Tuple
-from datetime import datetime
-import json
-from collections import Counter
-import cProfile
-import pstats
-from memory_profiler import memory_usage
-import utils.utils as helper
-
-def q1_memory(file_path: str) -> List[Tuple[datetime.date, str]]:
+from typing import Any, Dict, List, Optional, Tuple
+import utils.engine as engine
+from utils.bad_records import BadRecords
+from utils.execution import execute
+from utils.timing import StageTimer
+
+def q1_memory(file_path: str, k: int = 10, top_users: int = 1, counts: bool = False,
+              date_range: Optional[Tuple[Any, Any]] = None, timer: Optional[StageTimer] = None,
+              errors: Optional[BadRecords] = None) -> List[Tuple[Any, ...]]:
     """
-    Encuentra las top 10 fechas con más tweets y menciona el usuario con más publicaciones en cada una de esas fechas.
+    Encuentra las top k fechas con más tweets y menciona el usuario con más publicaciones en cada una de esas fechas.
     
     Args:
         file_path (str): La ruta al archivo JSON que contiene los tweets.
+        k (int): Cantidad de fechas a devolver (10 por defecto).
+        top_users (int): Cantidad de usuarios a devolver por fecha.
+        counts (bool): Si es True se devuelven también los conteos: (fecha, tweets de la fecha, [(usuario, tweets), ...]).
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, en formato YYYY-MM-DD o datetime.date; solo se consideran los tweets de esas fechas.
+        timer (Optional[StageTimer]): Si se indica, acumula el tiempo de cada etapa de la consulta.
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados (por categoría, con offsets de ejemplo).
     
     Returns:
-        List[Tuple[datetime.date, str]]: Una lista de tuplas, cada una con una fecha y el usuario que más tweets publicó en esa fecha.
+        List[Tuple[Any, ...]]: Una lista de tuplas, cada una con una fecha y el usuario que más tweets publicó en esa fecha (o, con counts, la cantidad de tweets de la fecha y de cada usuario).
     """
-    date_counter = Counter()
-    user_counter_per_date = {}
-
     try:
-        # Descargar el contenido del archivo desde GCS
-        content = helper.download_file_from_gcs(file_path)
-
-        # Leer y procesar cada línea una vez
-        for line in content.splitlines():
-            try:
-                tweet = json.loads(line)
-                tweet_date = tweet['date'].split('T')[0]
-                username = tweet['user']['username']
-
-                # Contar fechas
-                date_counter[tweet_date] += 1
+        # Se resuelve la consulta con el motor de agregaciones en una sola lectura del archivo. Los
+        # conteos se guardan con ids enteros: cada usuario se guarda una sola vez aunque publique en muchas fechas.
+        result, = engine.run_query(file_path, [engine.compact_spec(engine.top_spec(engine.Q1_SPEC, k, top_users))], date_range=date_range, timer=timer, errors=errors)
+        return engine.format_q1(result, counts)
 
-                # Contar usuarios por fecha
-                if tweet_date not in user_counter_per_date:
-                    user_counter_per_date[tweet_date] = Counter()
-                user_counter_per_date[tweet_date][username] += 1
-            except json.JSONDecodeError:
-                print("Error: No se pudo decodificar una línea del archivo JSON.")
-            except KeyError:
-                print("Error: Una línea del archivo JSON no contiene las claves esperadas.")
-
-        # Obtener las 10 fechas más comunes
-        most_common_dates = date_counter.most_common(10)
-
-        # Obtener el usuario más común por cada una de las fechas más comunes
-        most_common_users = [user_counter_per_date[date[0]].most_common(1)[0][0] for date in most_common_dates]
-
-        # Convertir las fechas a formato datetime.date y agrupar resultados
-        return list(zip([datetime.strptime(date[0], "%Y-%m-%d").date() for date in most_common_dates], most_common_users))
-    
     except FileNotFoundError:
         print(f"Error: El archivo '{file_path}' no se encontró.")
         return []
@@ -59,32 +35,24 @@ def q1_memory(file_path: str) -> List[Tuple[datetime.date, str]]:
         print(f"Error inesperado: {e}")
         return []
 
-def main(file_path: str) -> List[Tuple[datetime.date, str]]:
+def main(file_path: str, profile: Optional[str] = None, k: int = 10, top_users: int = 1, counts: bool = False,
+         date_range: Optional[Tuple[Any, Any]] = None) -> Dict[str, Any]:
     """
-    Función principal que ejecuta el análisis de los tweets, midiendo el tiempo de ejecución y el uso de memoria.
+    Función principal que ejecuta el análisis de los tweets una sola vez, midiendo el tiempo de cada etapa.
+    El profiling completo (cProfile o memoria) solo se ejecuta si se pide.
     
     Args:
         file_path (str): La ruta al archivo JSON que contiene los tweets.
-
+        profile (Optional[str]): None (producción), 'cpu' (cProfile) o 'memory' (memory_profiler).
+        k (int): Cantidad de fechas a devolver (10 por defecto).
+        top_users (int): Cantidad de usuarios a devolver por fecha.
+        counts (bool): Si es True se devuelven también los conteos de cada fecha y usuario.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, a considerar.
+    
     Returns:
-        List[Tuple[datetime.date, str]]: Una lista de tuplas, cada una con una fecha y el usuario que más tweets publicó en esa fecha.
-    """    
-
-    # Medir el tiempo de ejecución con cProfile
-    profiler = cProfile.Profile()
-    profiler.enable()
-
-    result = q1_memory(file_path)
-
-    profiler.disable()
-    stats = pstats.Stats(profiler).sort_stats('cumtime')
-    stats.print_stats()
-
-    # Medir el uso de memoria
-    mem_usage = memory_usage((q1_memory, (file_path,)), interval=1, timeout=None)
-    print(f"Memoria utilizada: {max(mem_usage)} MB \nRESULTADO:")
-
-    return result
+        Dict[str, Any]: El resultado de la consulta ('result'), los segundos por etapa ('timings') y, si se pidió, el reporte del profiler ('profile').
+    """
+    return execute(q1_memory, file_path, profile, k=k, top_users=top_users, counts=counts, date_range=date_range)
 
 """
 if __name__ == "__main__":
@@ -1,85 +1,57 @@
-from typing import List, Tuple
-from datetime import datetime
-import json
-from collections import defaultdict, Counter
-import cProfile
-import pstats
-from memory_profiler import memory_usage
-import utils.utils as helper
-
-def q1_time(file_path: str) -> List[Tuple[datetime.date, str]]:
+from typing import Any, Dict, List, Optional, Tuple
+import utils.engine as engine
+from utils.bad_records import BadRecords
+from utils.execution import execute
+from utils.timing import StageTimer
+
+def q1_time(file_path: str, k: int = 10, top_users: int = 1, counts: bool = False,
+            date_range: Optional[Tuple[Any, Any]] = None, timer: Optional[StageTimer] = None,
+            errors: Optional[BadRecords] = None) -> List[Tuple[Any, ...]]:
     """
-    Encuentra las top 10 fechas con mas tweets y menciona el usuario con mas publicaciones en cada una de esas fechas.
+    Encuentra las top k fechas con mas tweets y menciona el usuario con mas publicaciones en cada una de esas fechas.
     
     Args:
         file_path (str): La ruta al archivo JSON que contiene los tweets.
+        k (int): Cantidad de fechas a devolver (10 por defecto).
+        top_users (int): Cantidad de usuarios a devolver por fecha.
+        counts (bool): Si es True se devuelven también los conteos: (fecha, tweets de la fecha, [(usuario, tweets), ...]).
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, en formato YYYY-MM-DD o datetime.date; solo se consideran los tweets de esas fechas.
+        timer (Optional[StageTimer]): Si se indica, acumula el tiempo de cada etapa de la consulta.
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados (por categoría, con offsets de ejemplo).
     
     Returns:
-        List[Tuple[datetime.date, str]]: Una lista de tuplas, cada una con una fecha y el usuario que mas tweets publico en esa fecha.
+        List[Tuple[Any, ...]]: Una lista de tuplas, cada una con una fecha y el usuario que mas tweets publico en esa fecha (o, con counts, la cantidad de tweets de la fecha y de cada usuario).
     """
     try:
-        # Descargar el contenido del archivo desde GCS
-        content = helper.download_file_from_gcs(file_path)
+        # Se resuelve la consulta con el motor de agregaciones en una sola lectura del archivo.
+        result, = engine.run_query(file_path, [engine.top_spec(engine.Q1_SPEC, k, top_users)], date_range=date_range, timer=timer, errors=errors)
+        return engine.format_q1(result, counts)
 
-        # Se usa un solo diccionario para mantener el conteo de tweets por usuario y fecha.
-        dates_dict = defaultdict(Counter)
-        
-        # Se analiza linea por linea para optimizar el uso de memoria.
-        for line in content.splitlines():
-            tweet = json.loads(line)
-            tweet_date = tweet['date'].split('T')[0]
-            username = tweet['user']['username']
-            
-            # Se actualiza el contador de tweets escritos por un usuario en un dia.
-            dates_dict[tweet_date][username] += 1
-        
-        # Se ordenan las fechas segun el numero de tweets que se publicaron ese dia.
-        top_dates = sorted(dates_dict.keys(), key=lambda x: sum(dates_dict[x].values()), reverse=True)[:10]
-        
-        # Se obtiene el usuario con mayor cantidad de tweets para cada fecha segun el numero registrado en el contador.
-        top_users = [max(dates_dict[date], key=dates_dict[date].get) for date in top_dates]
-        
-        # Se pasan todas las fechas a formato datetime.date()
-        top_dates = [datetime.strptime(date_str, "%Y-%m-%d").date() for date_str in top_dates]
-        
-        return list(zip(top_dates, top_users))
-    
     except FileNotFoundError:
         print(f"Error: El archivo '{file_path}' no se encontro.")
         return []
-    except json.JSONDecodeError:
-        print("Error: No se pudo decodificar el archivo JSON.")
-        return []
     except Exception as e:
         print(f"Error: {e}")
         return []
 
-def main(file_path: str) -> List[Tuple[datetime.date, str]]:
+def main(file_path: str, profile: Optional[str] = None, k: int = 10, top_users: int = 1, counts: bool = False,
+         date_range: Optional[Tuple[Any, Any]] = None) -> Dict[str, Any]:
     """
-    Funcion principal que ejecuta el analisis de los tweets, midiendo el tiempo de ejecucion y el uso de memoria.
+    Funcion principal que ejecuta el analisis de los tweets una sola vez, midiendo el tiempo de cada etapa.
+    El profiling completo (cProfile o memoria) solo se ejecuta si se pide.
     
     Args:
         file_path (str): La ruta al archivo JSON que contiene los tweets.
+        profile (Optional[str]): None (produccion), 'cpu' (cProfile) o 'memory' (memory_profiler).
+        k (int): Cantidad de fechas a devolver (10 por defecto).
+        top_users (int): Cantidad de usuarios a devolver por fecha.
+        counts (bool): Si es True se devuelven también los conteos de cada fecha y usuario.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, a considerar.
     
     Returns:
-        List[Tuple[datetime.date, str]]: Una lista de tuplas, cada una con una fecha y el usuario que mas tweets publico en esa fecha.
+        Dict[str, Any]: El resultado de la consulta ('result'), los segundos por etapa ('timings') y, si se pidio, el reporte del profiler ('profile').
     """
-
-    # Medir el tiempo de ejecucion con cProfile
-    profiler = cProfile.Profile()
-    profiler.enable()
-
-    result = q1_time(file_path)
-
-    profiler.disable()
-    stats = pstats.Stats(profiler).sort_stats('cumtime')
-    stats.print_stats()
-
-    # Medir el uso de memoria
-    mem_usage = memory_usage((q1_time, (file_path,)), interval=1, timeout=None)
-    print(f"Memoria utilizada: {max(mem_usage)} MB \nRESULTADO:")
-
-    return result
+    return execute(q1_time, file_path, profile, k=k, top_users=top_users, counts=counts, date_range=date_range)
 
 """
 if __name__ == "__main__":
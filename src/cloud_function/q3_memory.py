@@ -1,46 +1,32 @@
-from typing import List, Tuple
-import json
-from collections import Counter
-from emoji import emoji_list
-import cProfile
-import pstats
-from memory_profiler import memory_usage
-import utils.utils as helper
-
-def q3_memory(file_path: str) -> List[Tuple[str, int]]:
+from typing import Any, Dict, List, Optional, Tuple
+import utils.engine as engine
+from utils.bad_records import BadRecords
+from utils.execution import execute
+from utils.timing import StageTimer
+
+def q3_memory(file_path: str, approximate: bool = False, k: int = 10, date_range: Optional[Tuple[Any, Any]] = None,
+              timer: Optional[StageTimer] = None,
+              errors: Optional[BadRecords] = None) -> List[Tuple[str, int]]:
     """
-    Encuentra los top 10 usuarios más mencionados en los tweets.
+    Encuentra los top k usuarios más mencionados en los tweets.
     
     Args:
         file_path (str): La ruta al archivo JSON que contiene los tweets.
+        approximate (bool): Si es True el conteo es aproximado con memoria acotada y cada tupla agrega el error máximo del conteo.
+        k (int): Cantidad de usuarios a devolver (10 por defecto).
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, en formato YYYY-MM-DD o datetime.date; solo se consideran los tweets de esas fechas.
+        timer (Optional[StageTimer]): Si se indica, acumula el tiempo de cada etapa de la consulta.
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados (por categoría, con offsets de ejemplo).
     
     Returns:
         List[Tuple[str, int]]: Una lista de tuplas, cada una con un usuario y el número de veces que fue mencionado.
     """
-    users_counter = Counter()
-    
     try:
-        # Descargar el contenido del archivo desde GCS
-        content = helper.download_file_from_gcs(file_path)
+        spec = engine.top_spec(engine.Q3_SPEC, k)
+        # Se resuelve la consulta con el motor de agregaciones en una sola lectura del archivo.
+        result, = engine.run_query(file_path, [engine.approximate_spec(spec) if approximate else spec], date_range=date_range, timer=timer, errors=errors)
+        return result
 
-        for line in content.splitlines():
-            try:
-                tweet = json.loads(line)
-                mentioned_users = tweet.get('mentionedUsers', [])
-                
-                if not mentioned_users:
-                    continue
-                
-                usernames = [user['username'] for user in mentioned_users]
-                users_counter.update(usernames)
-            
-            except json.JSONDecodeError:
-                print("Error: No se pudo decodificar una línea del archivo JSON.")
-            except KeyError:
-                print("Error: Una línea del archivo JSON no contiene las claves esperadas.")
-        
-        return users_counter.most_common(10)
-    
     except FileNotFoundError:
         print(f"Error: El archivo '{file_path}' no se encontró.")
         return []
@@ -48,32 +34,23 @@ def q3_memory(file_path: str) -> List[Tuple[str, int]]:
         print(f"Error inesperado: {e}")
         return []
 
-def main(file_path: str) -> List[Tuple[str, int]]:
+def main(file_path: str, profile: Optional[str] = None, approximate: bool = False, k: int = 10,
+         date_range: Optional[Tuple[Any, Any]] = None) -> Dict[str, Any]:
     """
-    Función principal que ejecuta el análisis de los tweets, midiendo el tiempo de ejecución y el uso de memoria.
+    Función principal que ejecuta el análisis de los tweets una sola vez, midiendo el tiempo de cada etapa.
+    El profiling completo (cProfile o memoria) solo se ejecuta si se pide.
     
     Args:
         file_path (str): La ruta al archivo JSON que contiene los tweets.
+        profile (Optional[str]): None (producción), 'cpu' (cProfile) o 'memory' (memory_profiler).
+        approximate (bool): Si es True el conteo es aproximado con memoria acotada.
+        k (int): Cantidad de usuarios a devolver (10 por defecto).
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, a considerar.
     
     Returns:
-        List[Tuple[str, int]]: Una lista de tuplas, cada una con un usuario y el número de veces que fue mencionado.
+        Dict[str, Any]: El resultado de la consulta ('result'), los segundos por etapa ('timings') y, si se pidió, el reporte del profiler ('profile').
     """
-
-    # Medir el tiempo de ejecución con cProfile
-    profiler = cProfile.Profile()
-    profiler.enable()
-
-    result = q3_memory(file_path)
-
-    profiler.disable()
-    stats = pstats.Stats(profiler).sort_stats('cumtime')
-    stats.print_stats()
-
-    # Medir el uso de memoria
-    mem_usage = memory_usage((q3_memory, (file_path,)), interval=1, timeout=None)
-    print(f"Memoria utilizada: {max(mem_usage)} MB \nRESULTADO:")
-
-    return result
+    return execute(q3_memory, file_path, profile, approximate=approximate, k=k, date_range=date_range)
 
 """
 if __name__ == "__main__":
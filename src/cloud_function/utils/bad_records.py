@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Optional
+from collections import Counter
+import time
+
+# Categorías de registros descartados.
+INVALID_JSON = 'invalid_json'
+MISSING_KEYS = 'missing_keys'
+LATE = 'late'
+
+MESSAGES = {
+    INVALID_JSON: "No se pudo decodificar una línea del archivo JSON.",
+    MISSING_KEYS: "Una línea del archivo JSON no contiene las claves esperadas.",
+    LATE: "Un tweet llegó después de cerrarse su ventana.",
+}
+
+# Offsets de ejemplo que se guardan por categoría.
+SAMPLE_SIZE = 10
+
+# Segundos mínimos entre dos avisos impresos; los registros descartados entre medio solo se cuentan.
+LOG_INTERVAL = 5.0
+
+
+class BadRecords:
+    """
+    Cuenta los registros descartados de una consulta por categoría (JSON inválido, claves faltantes,
+    tweets tardíos en streaming) y guarda los offsets en bytes de los primeros de cada una. En lugar
+    de imprimir una línea por registro, imprime como máximo un aviso cada log_interval segundos con
+    los conteos acumulados.
+
+    Los offsets se toman de position, que la lectura actualiza con el offset de la línea en curso
+    cuando lo conoce (ver engine.parse_lines); si no lo conoce, solo se cuentan los registros.
+
+    Con log_interval=None no imprime avisos. Se usa en los procesos o threads que recorren una parte
+    de la consulta: sus conteos se suman con merge al BadRecords de la consulta, que es el que avisa.
+    """
+
+    def __init__(self, sample_size: int = SAMPLE_SIZE, log_interval: Optional[float] = LOG_INTERVAL):
+        self.counts: Counter = Counter()
+        self.samples: Dict[str, List[Any]] = {}
+        self.sample_size = sample_size
+        self.log_interval = log_interval
+        self.position: Optional[int] = None
+        self._next_log = 0.0
+        self._skipped = 0
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def _sample(self, category: str, offsets: List[Any]) -> None:
+        """
+        Agrega offsets a la muestra de la categoría, hasta sample_size.
+        """
+        sample = self.samples.setdefault(category, [])
+        sample.extend(offsets[:self.sample_size - len(sample)])
+
+    def record(self, category: str) -> None:
+        """
+        Cuenta un registro descartado de la categoría en el offset de la línea en curso.
+        """
+        self.counts[category] += 1
+        if self.position is not None:
+            self._sample(category, [self.position])
+        where = f" (offset {self.position})" if self.position is not None else ''
+        self._log(f"{MESSAGES.get(category, category)}{where}")
+
+    def _log(self, message: str) -> None:
+        """
+        Imprime el aviso con los conteos acumulados, salvo que se haya impreso otro hace menos de
+        log_interval segundos.
+        """
+        if self.log_interval is None:
+            return
+        now = time.monotonic()
+        if now < self._next_log:
+            self._skipped += 1
+            return
+        self._next_log = now + self.log_interval
+        skipped = f"; {self._skipped} avisos omitidos" if self._skipped else ''
+        print(f"Error: {message} Descartados hasta ahora: {dict(self.counts)}{skipped}")
+        self._skipped = 0
+
+    def merge(self, other: 'BadRecords', source: Optional[str] = None) -> None:
+        """
+        Suma los conteos y las muestras de otro BadRecords (por ejemplo el de un rango procesado en
+        otro proceso). Con source, los offsets de la muestra se guardan como 'source:offset'. Avisa
+        con el mismo límite de frecuencia que record.
+        """
+        self.counts.update(other.counts)
+        for category, offsets in other.samples.items():
+            self._sample(category, offsets if source is None else [f"{source}:{offset}" for offset in offsets])
+        if other.counts:
+            self._log(f"{other.total} registros descartados" + (f" en {source}." if source else "."))
+
+    def copy(self) -> 'BadRecords':
+        """
+        Copia los conteos y las muestras, sin avisar (por ejemplo al retomar el estado de un trabajo).
+        """
+        copied = BadRecords(self.sample_size, self.log_interval)
+        copied.counts.update(self.counts)
+        copied.samples = {category: list(offsets) for category, offsets in self.samples.items()}
+        return copied
+
+    def log_summary(self) -> None:
+        """
+        Imprime el total de registros descartados de la consulta, si hubo alguno.
+        """
+        if self.counts:
+            print(f"Registros descartados: {self.total} {dict(self.counts)}")
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Devuelve el total, los conteos por categoría y los offsets de ejemplo.
+        """
+        return {'total': self.total, 'counts': dict(self.counts), 'sample_offsets': {key: list(value) for key, value in self.samples.items()}}
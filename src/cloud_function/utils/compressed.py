@@ -0,0 +1,147 @@
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from functools import partial
+import gzip
+import os
+import struct
+import zipfile
+
+# Formato de compresión según la extensión del archivo.
+FORMATS: Dict[str, str] = {
+    '.gz': 'gzip',
+    '.zip': 'zip',
+    '.zst': 'zstd',
+}
+
+# Bytes pedidos al descompresor en cada lectura.
+READ_SIZE = 1024 * 1024
+
+ZSTD_MAGIC = 0xFD2FB528
+# Los frames salteables (metadatos, por ejemplo los de pzstd) usan los números mágicos 0x184D2A50-0x184D2A5F.
+ZSTD_SKIPPABLE_MAGIC = 0x184D2A50
+
+
+def compression(file_path: str) -> Optional[str]:
+    """
+    Devuelve el formato de compresión del archivo ('gzip', 'zip' o 'zstd') o None si es NDJSON plano.
+    """
+    return FORMATS.get(os.path.splitext(file_path)[1].lower())
+
+
+def zstd_module():
+    """
+    Importa zstandard, que solo se necesita para archivos .zst.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Para leer archivos .zst se necesita el paquete zstandard (pip install zstandard).") from None
+    return zstandard
+
+
+def split_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Corta en líneas (sin el salto de línea final) los bloques de bytes de un flujo.
+    """
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+
+    if pending:
+        yield pending
+
+
+def read_chunks(f: BinaryIO, size: int = READ_SIZE) -> Iterator[bytes]:
+    """
+    Lee el archivo en bloques de hasta size bytes.
+    """
+    return iter(partial(f.read, size), b'')
+
+
+def zip_members(archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """
+    Archivos del zip en el orden en que se agregaron, sin directorios ni metadatos de macOS.
+    """
+    return [info for info in archive.infolist() if not info.is_dir() and not info.filename.startswith('__MACOSX/')]
+
+
+def iter_compressed_lines(f: BinaryIO, kind: str) -> Iterator[bytes]:
+    """
+    Descomprime el flujo a medida que se lee y recorre sus líneas, sin escribir el archivo
+    descomprimido ni cargarlo completo en memoria.
+
+    Args:
+        f (BinaryIO): Archivo comprimido abierto en modo binario. Para zip debe permitir seek (el
+            índice del zip está al final).
+        kind (str): Formato de compresión ('gzip', 'zip' o 'zstd').
+
+    Returns:
+        Iterator[bytes]: Las líneas del contenido, sin el salto de línea final. En un zip se recorren
+        todos sus archivos, en orden.
+    """
+    if kind == 'gzip':
+        # Se leen todos los miembros concatenados (por ejemplo los que genera pigz).
+        yield from split_lines(read_chunks(gzip.GzipFile(fileobj=f, mode='rb')))
+    elif kind == 'zip':
+        with zipfile.ZipFile(f) as archive:
+            for info in zip_members(archive):
+                with archive.open(info) as member:
+                    yield from split_lines(read_chunks(member))
+    elif kind == 'zstd':
+        reader = zstd_module().ZstdDecompressor().stream_reader(f, read_across_frames=True)
+        yield from split_lines(read_chunks(reader))
+    else:
+        raise ValueError(f"Formato de compresión no soportado: {kind}")
+
+
+def iter_file_lines(file_path: str) -> Iterator[bytes]:
+    """
+    Recorre las líneas de un archivo .gz, .zip o .zst descomprimiéndolo al vuelo.
+    """
+    with open(file_path, 'rb') as f:
+        yield from iter_compressed_lines(f, compression(file_path))
+
+
+def zstd_frames(f: BinaryIO) -> List[Tuple[int, int]]:
+    """
+    Devuelve el rango de bytes [inicio, fin) de cada frame zstd del archivo. Solo se leen los
+    encabezados de los frames y de sus bloques, sin descomprimir. Cada frame se puede descomprimir
+    por separado, por lo que un archivo con varios frames (por ejemplo uno generado con pzstd) se
+    puede repartir entre procesos.
+    """
+    size = f.seek(0, os.SEEK_END)
+    frames = []
+    position = 0
+    try:
+        while position < size:
+            f.seek(position)
+            magic, = struct.unpack('<I', f.read(4))
+            if magic & 0xFFFFFFF0 == ZSTD_SKIPPABLE_MAGIC:
+                length, = struct.unpack('<I', f.read(4))
+                position += 8 + length
+                continue
+            if magic != ZSTD_MAGIC:
+                raise ValueError(f"El archivo no es zstd válido (offset {position}).")
+
+            descriptor = f.read(1)[0]
+            single_segment = descriptor >> 5 & 1
+            # Descriptor, descriptor de ventana, id de diccionario y tamaño del contenido.
+            header = 1 + (1 - single_segment) + (0, 1, 2, 4)[descriptor & 3] + (single_segment, 2, 4, 8)[descriptor >> 6]
+            end = position + 4 + header
+            while True:
+                f.seek(end)
+                block, = struct.unpack('<I', f.read(3) + b'\0')
+                # Los bloques RLE guardan un solo byte; el resto guarda block_size bytes.
+                end += 3 + (1 if block >> 1 & 3 == 1 else block >> 3)
+                if block & 1:
+                    break
+            if descriptor & 4:
+                end += 4  # checksum del contenido
+            if end > size:
+                raise struct.error
+            frames.append((position, end))
+            position = end
+    except (struct.error, IndexError):
+        raise ValueError("El archivo zstd está truncado.") from None
+    return frames
@@ -1 +1,36 @@
-BUCKET_NAME = 'cloudstoragepreprod'
\ No newline at end of file
+import os
+
+BUCKET_NAME = 'cloudstoragepreprod'
+
+# Tamaño de cada lectura por rango al recorrer un archivo de GCS (bytes)
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Lecturas por rango simultáneas al recorrer un archivo de GCS (1 = secuencial). Se puede fijar en el
+# despliegue con la variable de entorno GCS_CONCURRENCY. En memoria se mantienen hasta
+# GCS_CONCURRENCY + 1 bloques de CHUNK_SIZE.
+GCS_CONCURRENCY = int(os.environ.get('GCS_CONCURRENCY', 4))
+
+# Caché de resultados de la instancia: entradas en memoria y espacio en /tmp para las desalojadas.
+# /tmp usa la memoria de la instancia, por lo que también se acota.
+RESULT_CACHE_ENTRIES = 32
+RESULT_CACHE_DIR = '/tmp/result_cache'
+RESULT_CACHE_SPILL_BYTES = 64 * 1024 * 1024
+
+# Consultas sobre varios objetos (prefijo o patrón): objetos que se leen a la vez y tope de los buffers de
+# descarga sumados de esos objetos (cada uno usa hasta (GCS_CONCURRENCY + 1) * CHUNK_SIZE bytes).
+SHARD_CONCURRENCY = int(os.environ.get('SHARD_CONCURRENCY', 4))
+SHARD_BYTES_IN_FLIGHT = int(os.environ.get('SHARD_BYTES_IN_FLIGHT', 256 * 1024 * 1024))
+
+# Consultas como trabajos por partes (ver utils/jobs.py). El estado de cada trabajo se guarda en el bucket
+# bajo JOB_PREFIX o, si se indica JOB_STORE_DIR, en ese directorio local (para pruebas).
+JOB_PREFIX = 'jobs/'
+JOB_STORE_DIR = os.environ.get('JOB_STORE_DIR')
+# Bytes de datos que se procesan entre dos checkpoints del trabajo.
+JOB_CHUNK_BYTES = int(os.environ.get('JOB_CHUNK_BYTES', 256 * 1024 * 1024))
+# Segundos de procesamiento por invocación: no se empieza una parte que no alcance a terminar antes
+# (deja margen respecto del --timeout 540 del despliegue).
+JOB_TIME_BUDGET = float(os.environ.get('JOB_TIME_BUDGET', 420))
+# Segundos durante los que una invocación reserva el trabajo; si se cae, otra puede retomarlo después.
+JOB_LEASE_SECONDS = 540
+# Intentos consecutivos fallidos de una misma parte antes de marcar el trabajo como fallido.
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
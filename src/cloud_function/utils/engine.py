@@ -0,0 +1,516 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+from itertools import chain
+from collections import Counter, defaultdict
+from utils.bad_records import INVALID_JSON, MISSING_KEYS, BadRecords
+from utils.compact import CompactCounts
+from utils.json_backend import get_backend
+from utils.projection import loads_projected
+from utils.sketch import SpaceSaving
+from utils.timing import StageTimer
+
+
+def extract_date(tweet: dict) -> List[str]:
+    """
+    Obtiene la fecha (YYYY-MM-DD) en la que se publicó el tweet.
+    """
+    return [tweet['date'].split('T')[0]]
+
+
+def extract_username(tweet: dict) -> List[str]:
+    """
+    Obtiene el usuario que publicó el tweet.
+    """
+    return [tweet['user']['username']]
+
+
+# Se importa en el primer uso: la base de emojis tarda en cargarse y solo la necesita q2.
+_emoji_matcher = None
+
+
+def _load_emoji_matcher():
+    """
+    Importa el módulo de emojis la primera vez que se necesita.
+    """
+    global _emoji_matcher
+    import utils.emoji_matcher as _emoji_matcher
+    return _emoji_matcher
+
+
+def extract_emojis(tweet: dict) -> List[str]:
+    """
+    Obtiene todos los emojis presentes en el contenido del tweet.
+    """
+    return (_emoji_matcher or _load_emoji_matcher()).extract_emojis(tweet['content'])
+
+
+def extract_mentions(tweet: dict) -> List[str]:
+    """
+    Obtiene los usuarios mencionados en el tweet (lista vacía si no hay menciones).
+    """
+    return [user['username'] for user in tweet.get('mentionedUsers') or []]
+
+
+# Campos por los que se puede agrupar. Cada extractor devuelve la lista de claves que aporta un tweet.
+FIELDS: Dict[str, Callable[[dict], List[str]]] = {
+    'date': extract_date,
+    'username': extract_username,
+    'emoji': extract_emojis,
+    'mention': extract_mentions,
+}
+
+
+# Extractores que las métricas miden por separado: etapa a la que se suma su tiempo y contador de
+# claves extraídas (la extracción de emojis es la parte costosa de agregar q2).
+TIMED_FIELDS: Dict[str, Tuple[str, str]] = {
+    'emoji': ('emoji', 'emojis'),
+}
+
+
+# Clave del tweet de la que depende cada campo; permite leer solo lo necesario de fuentes proyectadas.
+SOURCE_KEYS: Dict[str, str] = {
+    'date': 'date',
+    'username': 'user',
+    'emoji': 'content',
+    'mention': 'mentionedUsers',
+}
+
+
+class AggregationSpec(NamedTuple):
+    """
+    Describe una agregación top-k que el motor resuelve durante el recorrido del archivo.
+
+    Attributes:
+        group_by (str): Campo por el que se agrupa (una de las claves de FIELDS).
+        sub_group (Optional[str]): Campo secundario contado dentro de cada grupo.
+        top_k (int): Cantidad de grupos a devolver.
+        sub_top_k (int): Cantidad de subgrupos a devolver por cada grupo.
+        capacity (Optional[int]): Si se indica, el conteo es aproximado con memoria acotada a esa
+            cantidad de contadores (ver sketch.py). Solo para agregaciones sin subgrupo.
+        compact (bool): Si es True los conteos por grupo y subgrupo se guardan con las claves
+            internadas a ids enteros y en arrays (ver compact.py); el resultado es el mismo con
+            menos memoria. Solo para agregaciones con subgrupo.
+    """
+    group_by: str
+    sub_group: Optional[str] = None
+    top_k: int = 10
+    sub_top_k: int = 1
+    capacity: Optional[int] = None
+    compact: bool = False
+
+
+class Aggregator:
+    """
+    Acumula los conteos de una AggregationSpec a medida que recibe tweets.
+    """
+
+    def __init__(self, spec: AggregationSpec):
+        if spec.group_by not in FIELDS or (spec.sub_group is not None and spec.sub_group not in FIELDS):
+            raise ValueError(f"Campo de agregación no soportado: {spec}")
+        if spec.capacity is not None and spec.sub_group is not None:
+            raise ValueError(f"El conteo aproximado no admite subgrupos: {spec}")
+        if spec.compact and spec.sub_group is None:
+            raise ValueError(f"El conteo compacto requiere un subgrupo: {spec}")
+        self.spec = spec
+        self.group = FIELDS[spec.group_by]
+        self.sub_group = FIELDS[spec.sub_group] if spec.sub_group else None
+        self.totals = Counter() if spec.capacity is None else SpaceSaving(spec.capacity)
+        self.sub_counters = defaultdict(Counter)
+        self.compact = CompactCounts() if spec.compact else None
+
+    def add(self, tweet: dict) -> None:
+        """
+        Incorpora un tweet al conteo. Las claves se extraen antes de contar para que un
+        KeyError no deje el tweet contado a medias.
+        """
+        keys = self.group(tweet)
+        if self.sub_group is None:
+            self.totals.update(keys)
+            return
+
+        sub_keys = self.sub_group(tweet)
+        if self.compact is not None:
+            self.compact.update(keys, sub_keys)
+            return
+        for key in keys:
+            self.totals[key] += 1
+            self.sub_counters[key].update(sub_keys)
+
+    def merge(self, other: 'Aggregator') -> None:
+        """
+        Suma los conteos parciales de otro agregador de la misma especificación. Los conteos
+        parciales deben mezclarse en el orden de los datos para conservar los desempates de
+        most_common (primera aparición).
+        """
+        if self.spec.capacity is not None:
+            self.totals.merge(other.totals)
+            return
+        if self.compact is not None:
+            self.compact.merge(other.compact)
+            return
+        self.totals.update(other.totals)
+        for key, counter in other.sub_counters.items():
+            self.sub_counters[key].update(counter)
+
+    def cardinality(self) -> Tuple[int, int]:
+        """
+        Devuelve la cantidad de grupos distintos y de pares (grupo, subgrupo) distintos (0 sin subgrupo).
+        """
+        if self.compact is not None:
+            return len(self.compact.groups), sum(len(row) for row in self.compact.rows)
+        if self.sub_group is None:
+            return len(self.totals), 0
+        return len(self.totals), sum(len(counter) for counter in self.sub_counters.values())
+
+    def result(self) -> List[Any]:
+        """
+        Devuelve el top-k de la agregación.
+
+        Returns:
+            List[Any]: Tuplas (clave, conteo) si no hay subgrupo, o (clave, conteo, top de subgrupos)
+            donde el top de subgrupos es una lista de tuplas (subclave, conteo). En el conteo
+            aproximado las tuplas son (clave, conteo estimado, error máximo): el conteo real está
+            entre conteo - error y conteo.
+        """
+        if self.compact is not None:
+            return [(key, count, self.compact.sub_most_common(key, self.spec.sub_top_k))
+                    for key, count in self.compact.most_common(self.spec.top_k)]
+        top = self.totals.most_common(self.spec.top_k)
+        if self.spec.capacity is not None:
+            return [(key, count, self.totals.error(key)) for key, count in top]
+        if self.sub_group is None:
+            return top
+        return [(key, count, self.sub_counters[key].most_common(self.spec.sub_top_k)) for key, count in top]
+
+
+def parse_lines(lines: Iterable[bytes], keys: Optional[List[str]] = None, backend: Optional[str] = None,
+                errors: Optional[BadRecords] = None, start: Optional[int] = None) -> Iterable[dict]:
+    """
+    Decodifica cada línea NDJSON una única vez, omitiendo las que no son JSON válido. Acepta
+    líneas en bytes UTF-8 (lectura en modo binario) o en str.
+
+    Args:
+        lines (Iterable[bytes]): Líneas NDJSON, una por tweet.
+        keys (Optional[List[str]]): Claves de primer nivel a decodificar (ver projection.py). Si es
+            None, o si el backend decodifica más rápido la línea completa, se decodifica el tweet completo.
+        backend (Optional[str]): Parser de JSON a utilizar (ver json_backend.py). Por defecto, el
+            más rápido de los instalados.
+        errors (Optional[BadRecords]): Donde se cuentan las líneas descartadas (ver bad_records.py).
+        start (Optional[int]): Offset de la primera línea, si las líneas son consecutivas en el
+            archivo; con él se lleva el offset de cada línea para la muestra de errors.
+
+    Returns:
+        Iterable[dict]: Los tweets decodificados.
+    """
+    parser = get_backend(backend)
+    loads = partial(loads_projected, keys=keys) if keys is not None and parser.projectable else parser.loads
+    errors = errors if errors is not None else BadRecords()
+
+    if start is None:
+        # Sin offsets: la muestra no debe tomar la posición de una lectura anterior.
+        errors.position = None
+        for line in lines:
+            try:
+                yield loads(line)
+            except ValueError:
+                # Incluye json.JSONDecodeError, los errores de los otros backends y el UTF-8 inválido.
+                errors.record(INVALID_JSON)
+        return
+
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    # Las líneas de un archivo abierto conservan el salto de línea; las de los otros lectores no.
+    newline = 0 if first.endswith(b'\n' if isinstance(first, bytes) else '\n') else 1
+    position = start
+    for line in chain((first,), lines):
+        errors.position = position
+        position += len(line) + newline
+        try:
+            yield loads(line)
+        except ValueError:
+            errors.record(INVALID_JSON)
+
+
+def aggregate(tweets: Iterable[dict], aggregators: List[Aggregator], errors: Optional[BadRecords] = None) -> List[Aggregator]:
+    """
+    Alimenta todos los agregadores con cada tweet en un único recorrido.
+
+    Args:
+        tweets (Iterable[dict]): Tweets ya decodificados.
+        aggregators (List[Aggregator]): Agregadores a alimentar.
+        errors (Optional[BadRecords]): Donde se cuentan los tweets sin las claves esperadas (una vez
+            por tweet aunque falle en varios agregadores).
+
+    Returns:
+        List[Aggregator]: Los mismos agregadores, ya actualizados.
+    """
+    errors = errors if errors is not None else BadRecords()
+    failed = None
+    for tweet in tweets:
+        for aggregator in aggregators:
+            try:
+                aggregator.add(tweet)
+            except (KeyError, TypeError, AttributeError):
+                if failed is not tweet:
+                    errors.record(MISSING_KEYS)
+                    failed = tweet
+    return aggregators
+
+
+def required_keys(specs: List[AggregationSpec]) -> List[str]:
+    """
+    Devuelve las claves del tweet que necesitan las agregaciones indicadas.
+    """
+    fields = {spec.group_by for spec in specs} | {spec.sub_group for spec in specs if spec.sub_group}
+    return [key for field, key in SOURCE_KEYS.items() if field in fields]
+
+
+def filter_dates(tweets: Iterable[dict], start: Optional[Any] = None, end: Optional[Any] = None,
+                 errors: Optional[BadRecords] = None) -> Iterable[dict]:
+    """
+    Deja pasar solo los tweets con fecha entre start y end (YYYY-MM-DD o datetime.date, ambas
+    inclusive; None deja el extremo abierto). Los tweets sin fecha se cuentan en errors.
+    """
+    start = str(start) if start is not None else None
+    end = str(end) if end is not None else None
+    errors = errors if errors is not None else BadRecords()
+    for tweet in tweets:
+        try:
+            day = tweet['date'].split('T')[0]
+        except (KeyError, TypeError, AttributeError):
+            errors.record(MISSING_KEYS)
+            continue
+        if (start is None or day >= start) and (end is None or day <= end):
+            yield tweet
+
+
+def count_lines(lines: Iterable[bytes], timer: StageTimer) -> Iterator[bytes]:
+    """
+    Deja pasar las líneas sumando a los contadores 'lines' y 'bytes' del timer las leídas y sus bytes
+    (con el salto de línea que quitan los lectores). Los contadores se actualizan al terminar.
+    """
+    count = size = 0
+    try:
+        for line in lines:
+            count += 1
+            size += len(line)
+            yield line
+    finally:
+        timer.count('lines', count)
+        timer.count('bytes', size + count)
+
+
+@contextmanager
+def timed_extractors(aggregators: List[Aggregator], timer: StageTimer):
+    """
+    Mientras dura el bloque, mide los extractores de TIMED_FIELDS de los agregadores (tiempo y claves
+    extraídas, ver StageTimer.timed). Al salir se restauran los extractores originales.
+    """
+    saved = [(aggregator, aggregator.group, aggregator.sub_group) for aggregator in aggregators]
+    for aggregator in aggregators:
+        if aggregator.spec.group_by in TIMED_FIELDS:
+            aggregator.group = timer.timed(aggregator.group, *TIMED_FIELDS[aggregator.spec.group_by])
+        if aggregator.spec.sub_group in TIMED_FIELDS:
+            aggregator.sub_group = timer.timed(aggregator.sub_group, *TIMED_FIELDS[aggregator.spec.sub_group])
+    try:
+        yield
+    finally:
+        for aggregator, group, sub_group in saved:
+            aggregator.group, aggregator.sub_group = group, sub_group
+
+
+def scan_lines(lines: Iterable[bytes], aggregators: List[Aggregator], projected: bool = True,
+               date_range: Optional[Tuple[Any, Any]] = None, timer: Optional[StageTimer] = None,
+               errors: Optional[BadRecords] = None, start: Optional[int] = None) -> List[Aggregator]:
+    """
+    Decodifica las líneas y alimenta los agregadores, filtrando por fecha si se indica date_range.
+    Si se indica timer acumula el tiempo de las etapas 'download' (obtención de las líneas),
+    'parse', 'emoji' (extracción de emojis) y 'aggregate', y cuenta las líneas, los bytes y los
+    emojis extraídos. Los registros descartados se cuentan en errors (start es el offset de la
+    primera línea, si se conoce).
+    """
+    keys = required_keys([aggregator.spec for aggregator in aggregators]) if projected else None
+    if keys is not None and date_range is not None and 'date' not in keys:
+        keys.append('date')
+    errors = errors if errors is not None else BadRecords()
+
+    def select(tweets: Iterable[dict]) -> Iterable[dict]:
+        return tweets if date_range is None else filter_dates(tweets, *date_range, errors=errors)
+
+    if timer is None:
+        return aggregate(select(parse_lines(lines, keys, errors=errors, start=start)), aggregators, errors)
+
+    stages = StageTimer()
+    with stages.stage('aggregate'), timed_extractors(aggregators, stages):
+        tweets = parse_lines(count_lines(stages.iterate(lines, 'download'), stages), keys, errors=errors, start=start)
+        aggregate(select(stages.iterate(tweets, 'parse')), aggregators, errors)
+    # Cada etapa se midió incluyendo a la que consume; se informan los tiempos exclusivos.
+    stages.subtract('aggregate', 'parse')
+    if 'emoji' in stages.stages:
+        stages.subtract('aggregate', 'emoji')
+    stages.subtract('parse', 'download')
+    timer.merge(stages)
+    return aggregators
+
+
+def run_lines(lines: Iterable[bytes], specs: List[AggregationSpec], projected: bool = True,
+              date_range: Optional[Tuple[Any, Any]] = None, timer: Optional[StageTimer] = None,
+              errors: Optional[BadRecords] = None, start: Optional[int] = None) -> List[List[Any]]:
+    """
+    Resuelve todas las agregaciones sobre un iterable de líneas NDJSON en un único recorrido.
+
+    Args:
+        lines (Iterable[bytes]): Líneas NDJSON (bytes o str), una por tweet.
+        specs (List[AggregationSpec]): Agregaciones a calcular.
+        projected (bool): Si es True solo se decodifican las claves que usan las agregaciones.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive; solo se
+            agregan los tweets de esas fechas (ver filter_dates).
+        timer (Optional[StageTimer]): Si se indica, acumula el tiempo de las etapas 'download'
+            (obtención de las líneas), 'parse', 'aggregate' y 'rank'.
+        errors (Optional[BadRecords]): Donde se cuentan los registros descartados.
+        start (Optional[int]): Offset de la primera línea en el archivo, si se conoce.
+
+    Returns:
+        List[List[Any]]: El resultado de cada agregación, en el mismo orden que specs.
+    """
+    aggregators = scan_lines(lines, [Aggregator(spec) for spec in specs], projected, date_range, timer, errors, start)
+    return rank(aggregators, timer)
+
+
+def rank(aggregators: List[Aggregator], timer: Optional[StageTimer] = None) -> List[List[Any]]:
+    """
+    Devuelve el top-k de cada agregador. Si se indica timer mide la etapa 'rank' y guarda la
+    cantidad de claves de cada agregación ('groups:<campo>' y, con subgrupo,
+    'groups:<campo>/<subcampo>' y 'pairs:<campo>/<subcampo>').
+    """
+    if timer is None:
+        return [aggregator.result() for aggregator in aggregators]
+    for aggregator in aggregators:
+        spec = aggregator.spec
+        name = spec.group_by if spec.sub_group is None else f"{spec.group_by}/{spec.sub_group}"
+        groups, pairs = aggregator.cardinality()
+        timer.set(f"groups:{name}", groups)
+        if spec.sub_group is not None:
+            timer.set(f"pairs:{name}", pairs)
+    with timer.stage('rank'):
+        return [aggregator.result() for aggregator in aggregators]
+
+
+def run_query(file_path: str, specs: List[AggregationSpec], projected: bool = True,
+              date_range: Optional[Tuple[Any, Any]] = None, timer: Optional[StageTimer] = None,
+              errors: Optional[BadRecords] = None) -> List[List[Any]]:
+    """
+    Resuelve todas las agregaciones recorriendo el archivo de GCS una sola vez, por bloques y sin
+    descargarlo completo. Los objetos .gz, .zip y .zst se descomprimen al vuelo.
+
+    Si file_path es un prefijo terminado en '/' o un patrón glob (por ejemplo 'tweets/2021-02-*.json')
+    se recorren todos los objetos que coinciden, varios a la vez, y se mezclan sus conteos (ver shards.py).
+
+    Args:
+        file_path (str): La ruta al archivo dentro del bucket, o un prefijo o patrón de varios objetos.
+        specs (List[AggregationSpec]): Agregaciones a calcular.
+        projected (bool): Si es True solo se decodifican las claves que usan las agregaciones.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, a considerar.
+        timer (Optional[StageTimer]): Si se indica, acumula el tiempo de cada etapa (ver run_lines).
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados (por
+            categoría y con offsets de ejemplo) para informarlos junto al resultado; al terminar se
+            imprime su total. En objetos comprimidos los offsets son del contenido descomprimido.
+
+    Returns:
+        List[List[Any]]: El resultado de cada agregación, en el mismo orden que specs.
+    """
+    errors = errors if errors is not None else BadRecords()
+    try:
+        from utils.shards import is_pattern
+        if is_pattern(file_path):
+            from utils.shards import run_sharded
+            return rank(run_sharded(file_path, specs, projected, date_range, timer, errors=errors), timer)
+
+        # El cliente de GCS se importa recién al leer un archivo.
+        import utils.utils as helper
+        return run_lines(helper.iter_lines_from_gcs(file_path), specs, projected, date_range, timer, errors, start=0)
+    finally:
+        errors.log_summary()
+
+
+# Consultas del challenge expresadas como agregaciones del motor.
+Q1_SPEC = AggregationSpec(group_by='date', sub_group='username')
+Q2_SPEC = AggregationSpec(group_by='emoji')
+Q3_SPEC = AggregationSpec(group_by='mention')
+
+# Contadores del modo aproximado de q2 y q3: acota la memoria sin importar la cantidad de emojis o usuarios distintos.
+APPROX_CAPACITY = 10000
+
+
+def approximate_spec(spec: AggregationSpec, capacity: int = APPROX_CAPACITY) -> AggregationSpec:
+    """
+    Devuelve la versión aproximada (memoria acotada) de una agregación sin subgrupo.
+    """
+    return spec._replace(capacity=capacity)
+
+
+def compact_spec(spec: AggregationSpec) -> AggregationSpec:
+    """
+    Devuelve la versión compacta (claves internadas a ids enteros) de una agregación con subgrupo.
+    """
+    return spec._replace(compact=True)
+
+
+def top_spec(spec: AggregationSpec, k: int = 10, sub_k: Optional[int] = None) -> AggregationSpec:
+    """
+    Devuelve la agregación con otra cantidad de grupos (k) y, si se indica, de subgrupos por grupo.
+    La selección se hace con un heap de k elementos sobre los conteos acumulados (most_common), sin
+    ordenar todas las claves.
+    """
+    for name, value in (('k', k), ('sub_k', sub_k)):
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+            raise ValueError(f"{name} debe ser un entero positivo: {value!r}")
+    return spec._replace(top_k=k, sub_top_k=spec.sub_top_k if sub_k is None else sub_k)
+
+
+def format_q1(result: List[Any], counts: bool = False) -> List[Tuple[Any, ...]]:
+    """
+    Convierte el resultado de Q1_SPEC al formato de q1: (fecha, usuario con más tweets ese día), o
+    (fecha, [usuarios]) si se pidió más de un usuario por fecha.
+
+    Args:
+        result (List[Any]): Resultado de la agregación por fecha y usuario.
+        counts (bool): Si es True cada tupla es (fecha, tweets de la fecha, [(usuario, tweets), ...]).
+
+    Returns:
+        List[Tuple[Any, ...]]: Una tupla por fecha, de la de más tweets a la de menos.
+    """
+    formatted = []
+    for date, total, top_users in result:
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+        if counts:
+            formatted.append((day, total, top_users))
+        elif len(top_users) == 1:
+            formatted.append((day, top_users[0][0]))
+        else:
+            formatted.append((day, [user for user, _ in top_users]))
+    return formatted
+
+
+def run_all(file_path: str, k: int = 10, date_range: Optional[Tuple[Any, Any]] = None,
+            timer: Optional[StageTimer] = None, errors: Optional[BadRecords] = None) -> Dict[str, List[Any]]:
+    """
+    Resuelve q1, q2 y q3 leyendo y decodificando el archivo una sola vez.
+
+    Args:
+        file_path (str): La ruta al archivo dentro del bucket.
+        k (int): Cantidad de fechas, emojis y usuarios a devolver en cada consulta.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, a considerar.
+        timer (Optional[StageTimer]): Si se indica, acumula el tiempo de cada etapa.
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados.
+
+    Returns:
+        Dict[str, List[Any]]: El resultado de cada consulta con el mismo formato que q1, q2 y q3.
+    """
+    specs = [top_spec(spec, k) for spec in (Q1_SPEC, Q2_SPEC, Q3_SPEC)]
+    q1_result, q2_result, q3_result = run_query(file_path, specs, date_range=date_range, timer=timer, errors=errors)
+    return {'q1': format_q1(q1_result), 'q2': q2_result, 'q3': q3_result}
@@ -0,0 +1,111 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from datetime import date
+from time import perf_counter
+from utils.bad_records import BadRecords
+from utils.metrics import query_metrics
+from utils.timing import StageTimer
+
+# Diagnósticos que se pueden pedir en la solicitud; sin ellos la consulta se ejecuta sin profiler.
+PROFILE_MODES = ('cpu', 'memory')
+
+# Cantidad de funciones del reporte de cProfile (ordenadas por tiempo acumulado).
+PROFILE_TOP_FUNCTIONS = 25
+
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Convierte el resultado de una consulta a tipos serializables a JSON (fechas en formato ISO).
+    """
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    return value
+
+
+def _cpu_profile(query: Callable[..., Any], args: Tuple, kwargs: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Ejecuta la consulta bajo cProfile y devuelve su resultado junto con las funciones más costosas.
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = query(*args, **kwargs)
+    finally:
+        profiler.disable()
+
+    stats = pstats.Stats(profiler)
+    functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+    return result, {
+        'total_calls': stats.total_calls,
+        'total_seconds': round(stats.total_tt, 3),
+        'functions': [
+            {
+                'function': f"{file_name}:{line}({name})", 'calls': calls, 'primitive_calls': primitive_calls,
+                'tottime': round(tottime, 3), 'cumtime': round(cumtime, 3),
+            }
+            for (file_name, line, name), (primitive_calls, calls, tottime, cumtime, _) in functions
+        ],
+    }
+
+
+def _memory_profile(query: Callable[..., Any], args: Tuple, kwargs: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Ejecuta la consulta muestreando la memoria del proceso y devuelve su resultado y el uso máximo.
+    """
+    from memory_profiler import memory_usage
+
+    interval = 0.1
+    samples, result = memory_usage((query, args, kwargs), interval=interval, retval=True)
+    return result, {
+        'peak_mb': round(max(samples), 1),
+        'start_mb': round(samples[0], 1),
+        'samples': len(samples),
+        'interval_seconds': interval,
+    }
+
+
+def execute(query: Callable[..., Any], file_path: str, profile: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+    """
+    Ejecuta una consulta una única vez con temporizadores y contadores por etapa y, solo si se pide,
+    bajo un profiler de CPU (cProfile) o de memoria (memory_profiler).
+
+    Args:
+        query (Callable[..., Any]): La consulta; debe aceptar file_path y los argumentos timer y errors.
+        file_path (str): La ruta al archivo dentro del bucket.
+        profile (Optional[str]): None (producción), 'cpu' o 'memory'.
+        **kwargs: Argumentos adicionales de la consulta.
+
+    Returns:
+        Dict[str, Any]: {'result': resultado, 'timings': segundos por etapa, 'bad_records':
+        registros descartados por categoría con offsets de ejemplo, 'metrics': rendimiento de la
+        consulta (ver metrics.query_metrics)} y, si se pidió, 'profile' con el reporte del profiler.
+    """
+    if profile is not None and profile not in PROFILE_MODES:
+        raise ValueError(f"Modo de profiling no soportado: {profile}")
+
+    timer = StageTimer()
+    errors = BadRecords()
+    args, kwargs = (file_path,), {**kwargs, 'timer': timer, 'errors': errors}
+    report = None
+    start = perf_counter()
+    if profile == 'cpu':
+        result, report = _cpu_profile(query, args, kwargs)
+    elif profile == 'memory':
+        result, report = _memory_profile(query, args, kwargs)
+    else:
+        result = query(*args, **kwargs)
+    seconds = perf_counter() - start
+
+    response = {
+        'result': to_jsonable(result), 'timings': timer.as_dict(), 'bad_records': errors.as_dict(),
+        'metrics': query_metrics(timer, errors, seconds),
+    }
+    if report is not None:
+        response['profile'] = {'mode': profile, **report}
+    return response
@@ -0,0 +1,407 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from time import perf_counter
+import os
+import pickle
+import re
+import time
+import uuid
+import utils.config as config
+from utils.bad_records import BadRecords
+from utils.compressed import compression
+from utils.engine import AggregationSpec, Aggregator, Q1_SPEC, Q2_SPEC, Q3_SPEC, approximate_spec, compact_spec, format_q1, rank, scan_lines, top_spec
+from utils.execution import to_jsonable
+from utils.metrics import query_metrics
+from utils.timing import StageTimer
+import utils.utils as helper
+
+# Versión del formato del estado guardado; un estado de otra versión no se retoma.
+JOB_VERSION = 2
+
+# Los ids son uuid4 en hexadecimal; se validan antes de usarlos como nombre de objeto o archivo.
+JOB_ID = re.compile(r'[0-9a-f]{32}')
+
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobConflict(Exception):
+    """
+    Otra invocación modificó el estado del trabajo desde que se leyó.
+    """
+
+
+class LocalJobStore:
+    """
+    Guarda el estado de los trabajos como archivos en un directorio local. Reemplaza al bucket en
+    pruebas: el control de concurrencia compara la fecha de modificación del archivo y no es atómico
+    entre procesos.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id + '.pkl')
+
+    def get(self, job_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """
+        Devuelve el estado del trabajo y su versión (para put), o None si no existe.
+
+        El estado se lee con pickle, que puede ejecutar código al cargarse: el directorio solo debe
+        ser escribible por la función.
+        """
+        try:
+            with open(self._path(job_id), 'rb') as f:
+                return pickle.load(f), os.fstat(f.fileno()).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def put(self, job_id: str, state: Dict[str, Any], version: Optional[int]) -> int:
+        """
+        Guarda el estado si el vigente sigue siendo el de version (None: el trabajo no debe existir)
+        y devuelve la nueva versión.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(job_id)
+        with open(path + '.tmp', 'wb') as out:
+            pickle.dump(state, out, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            if version is None:
+                # link falla si el archivo ya existe.
+                os.link(path + '.tmp', path)
+                os.remove(path + '.tmp')
+            elif os.stat(path).st_mtime_ns != version:
+                raise JobConflict(job_id)
+            else:
+                os.replace(path + '.tmp', path)
+        except FileExistsError:
+            raise JobConflict(job_id)
+        return os.stat(path).st_mtime_ns
+
+
+class GCSJobStore:
+    """
+    Guarda el estado de los trabajos como objetos del bucket bajo un prefijo. Cada escritura es
+    condicional a la generación leída, por lo que dos invocaciones no pueden pisarse el estado.
+    El prefijo solo debe ser escribible por la función: el estado se guarda con pickle.
+    """
+
+    def __init__(self, bucket_name: str = config.BUCKET_NAME, prefix: str = config.JOB_PREFIX, client=None):
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.client = client
+
+    def _bucket(self):
+        return (self.client or helper.get_client()).bucket(self.bucket_name)
+
+    def get(self, job_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """
+        Devuelve el estado del trabajo y su generación, o None si no existe.
+
+        El estado se lee con pickle, que puede ejecutar código al cargarse: se confía en que nadie
+        más que la función escribe bajo el prefijo (ver la clase).
+        """
+        blob = self._bucket().get_blob(self.prefix + job_id)
+        if blob is None:
+            return None
+        # El blob queda fijado a la generación leída, por lo que la descarga no mezcla dos escrituras.
+        return pickle.loads(blob.download_as_bytes()), blob.generation
+
+    def put(self, job_id: str, state: Dict[str, Any], version: Optional[int]) -> int:
+        """
+        Guarda el estado si la generación vigente sigue siendo version (None: el objeto no debe
+        existir) y devuelve la nueva generación.
+        """
+        from google.api_core.exceptions import PreconditionFailed
+
+        blob = self._bucket().blob(self.prefix + job_id)
+        try:
+            blob.upload_from_string(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL),
+                                    content_type='application/octet-stream', if_generation_match=version or 0)
+        except PreconditionFailed:
+            raise JobConflict(job_id)
+        return blob.generation
+
+
+_store = None
+
+
+def get_store():
+    """
+    Devuelve el almacenamiento de trabajos de la instancia: el directorio JOB_STORE_DIR si se
+    configuró, o el bucket.
+    """
+    global _store
+    if _store is None:
+        _store = LocalJobStore(config.JOB_STORE_DIR) if config.JOB_STORE_DIR else GCSJobStore()
+    return _store
+
+
+def job_query(function: str, k: int = 10, top_users: int = 1, counts: bool = False, approximate: bool = False,
+              date_range: Optional[Tuple[Any, Any]] = None) -> Tuple[List[AggregationSpec], Callable[[List[Any]], Any]]:
+    """
+    Devuelve las agregaciones de una consulta y la función que da formato a sus resultados, igual
+    que las consultas q*.py y run_all (date_range se aplica al recorrer, no forma parte de las
+    agregaciones).
+    """
+    if function == 'all':
+        specs = [top_spec(spec, k) for spec in (Q1_SPEC, Q2_SPEC, Q3_SPEC)]
+        return specs, lambda results: {'q1': format_q1(results[0]), 'q2': results[1], 'q3': results[2]}
+    if function in ('q1_time', 'q1_memory'):
+        spec = top_spec(Q1_SPEC, k, top_users)
+        return [compact_spec(spec) if function == 'q1_memory' else spec], lambda results: format_q1(results[0], counts)
+    if function in ('q2_time', 'q2_memory', 'q3_time', 'q3_memory'):
+        spec = top_spec(Q2_SPEC if function.startswith('q2') else Q3_SPEC, k)
+        return [approximate_spec(spec) if approximate else spec], lambda results: results[0]
+    raise ValueError(f"Consulta no soportada como trabajo: {function}")
+
+
+def _range_lines(blob, start: int, limit: int, progress: List[int]) -> Iterator[bytes]:
+    """
+    Recorre las líneas del blob que comienzan entre start y limit (la última puede terminar después
+    de limit). progress[0] queda en el offset siguiente a la última línea entregada.
+    """
+    progress[0] = start
+    for line in helper.iter_blob_lines_parallel(blob, start=start):
+        if progress[0] >= limit:
+            return
+        progress[0] = min(progress[0] + len(line) + 1, blob.size)
+        yield line
+
+
+def _scan_chunk(state: Dict[str, Any], aggregators: List[Aggregator], timer: StageTimer, errors: BadRecords,
+                chunk_bytes: int, client=None) -> None:
+    """
+    Procesa hasta chunk_bytes bytes desde la posición del trabajo (objeto y offset) y avanza la
+    posición hasta el comienzo de la línea siguiente. Una parte puede abarcar el final de un objeto
+    y el comienzo de los siguientes.
+    """
+    bucket = (client or helper.get_client()).bucket(config.BUCKET_NAME)
+    objects = state['objects']
+    remaining = chunk_bytes
+    while remaining > 0 and state['index'] < len(objects):
+        name, generation, size = objects[state['index']]
+        offset = state['offset']
+        if offset < size:
+            # Se lee la generación que se listó al crear el trabajo; si el objeto se reescribió sin
+            # versionado, esa generación ya no existe y el trabajo falla en lugar de mezclar contenidos.
+            blob = bucket.get_blob(name, generation=generation)
+            if blob is None:
+                raise FileNotFoundError(f"{name} (generación {generation})")
+            progress = [offset]
+            object_errors = errors if len(objects) == 1 else BadRecords(log_interval=None)
+            scan_lines(_range_lines(blob, offset, offset + remaining, progress), aggregators,
+                       date_range=state['params'].get('date_range'), timer=timer, errors=object_errors, start=offset)
+            if object_errors is not errors:
+                errors.merge(object_errors, source=name)
+            remaining -= progress[0] - offset
+            offset = progress[0]
+        if offset >= size:
+            state['index'], state['offset'] = state['index'] + 1, 0
+        else:
+            state['offset'] = offset
+
+
+def job_status(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Arma la respuesta de estado de un trabajo: progreso en bytes y objetos, tiempos por etapa y
+    métricas acumulados entre invocaciones, registros descartados y, al terminar, el resultado.
+    """
+    sizes = [size for _, _, size in state['objects']]
+    total = sum(sizes)
+    done = total if state['status'] == DONE else sum(sizes[:state['index']]) + state['offset']
+    response = {
+        'job_id': state['job_id'],
+        'status': state['status'],
+        'message': state['query'],
+        'file_path': state['file_path'],
+        'progress': {
+            'bytes_done': done,
+            'bytes_total': total,
+            'percent': round(100.0 * done / total, 1) if total else 100.0,
+            'objects_done': min(state['index'], len(sizes)),
+            'objects_total': len(sizes),
+            'chunks': state['chunks'],
+        },
+        'timings': state['timer'].as_dict(),
+        'bad_records': state['errors'].as_dict(),
+        # Las tasas se calculan sobre el tiempo de procesamiento sumado de las partes, sin las esperas
+        # entre invocaciones.
+        'metrics': query_metrics(state['timer'], state['errors'], sum(state['timer'].stages.values())),
+    }
+    if state['status'] == DONE:
+        response['result'] = state['result']
+    if state['status'] == FAILED or state.get('failures'):
+        # Un trabajo en curso con intentos fallidos informa el último error (se reintenta esa parte).
+        response['error'] = state['error']
+        response['failures'] = state.get('failures', 0)
+    return response
+
+
+def start_job(function: str, file_path: str, params: Dict[str, Any], store=None, client=None,
+              time_budget: float = config.JOB_TIME_BUDGET, chunk_bytes: int = config.JOB_CHUNK_BYTES) -> Dict[str, Any]:
+    """
+    Crea un trabajo para la consulta y procesa sus primeras partes en esta misma invocación (ver run_job).
+
+    Args:
+        function (str): La consulta ('q1_time', ..., 'q3_memory' o 'all').
+        file_path (str): La ruta al archivo dentro del bucket, o un prefijo o patrón de varios objetos.
+        params (Dict[str, Any]): Parámetros de la consulta ya validados (k, top_users, counts,
+            approximate, date_range).
+        store: Almacenamiento del estado (por defecto el de get_store()).
+        client (storage.Client): Cliente de GCS a utilizar (por defecto el de la instancia).
+        time_budget (float): Segundos de procesamiento de esta invocación.
+        chunk_bytes (int): Bytes procesados entre dos checkpoints.
+
+    Returns:
+        Dict[str, Any]: El estado del trabajo (ver job_status), con su job_id.
+    """
+    # Valida la consulta y sus parámetros antes de crear el estado.
+    specs, _ = job_query(function, **params)
+    from utils.shards import is_pattern
+    if is_pattern(file_path):
+        blobs = helper.list_objects(file_path, client)
+    else:
+        blob = (client or helper.get_client()).bucket(config.BUCKET_NAME).get_blob(file_path)
+        if blob is None:
+            raise FileNotFoundError(file_path)
+        blobs = [blob]
+    compressed = [blob.name for blob in blobs if compression(blob.name)]
+    if compressed:
+        # Un flujo comprimido no se puede retomar desde un offset.
+        raise ValueError(f"Los trabajos solo admiten objetos sin comprimir: {', '.join(compressed)}")
+
+    now = time.time()
+    job_id = uuid.uuid4().hex
+    state = {
+        'version': JOB_VERSION,
+        'job_id': job_id,
+        'query': function,
+        'params': params,
+        'file_path': file_path,
+        'objects': [(blob.name, blob.generation, blob.size) for blob in blobs],
+        'index': 0,
+        'offset': 0,
+        'chunks': 0,
+        'status': RUNNING,
+        'lease_until': 0.0,
+        'created': now,
+        'updated': now,
+        'aggregators': [Aggregator(spec) for spec in specs],
+        'timer': StageTimer(),
+        'errors': BadRecords(),
+        'result': None,
+        'error': None,
+        'failures': 0,
+    }
+    (store or get_store()).put(job_id, state, None)
+    return run_job(job_id, store, client, time_budget, chunk_bytes)
+
+
+def load_job(job_id: str, store=None) -> Tuple[Dict[str, Any], int]:
+    """
+    Lee el estado de un trabajo y su versión.
+
+    Raises:
+        KeyError: Si el id no es válido o el trabajo no existe (o es de otra versión del formato).
+    """
+    valid = isinstance(job_id, str) and JOB_ID.fullmatch(job_id) is not None
+    loaded = (store or get_store()).get(job_id) if valid else None
+    if not loaded or loaded[0].get('version') != JOB_VERSION:
+        raise KeyError(job_id)
+    return loaded
+
+
+def get_job(job_id: str, store=None) -> Dict[str, Any]:
+    """
+    Devuelve el estado de un trabajo sin procesar nada (ver job_status).
+    """
+    state, _ = load_job(job_id, store)
+    return job_status(state)
+
+
+def run_job(job_id: str, store=None, client=None, time_budget: float = config.JOB_TIME_BUDGET,
+            chunk_bytes: int = config.JOB_CHUNK_BYTES) -> Dict[str, Any]:
+    """
+    Avanza un trabajo: procesa partes de chunk_bytes bytes, guardando los conteos parciales y la
+    posición después de cada una, mientras la parte siguiente alcance a terminar dentro de
+    time_budget segundos (se estima con la parte más lenta de esta invocación). Al llegar al final
+    de los datos calcula el resultado y lo guarda en el estado.
+
+    La invocación reserva el trabajo por JOB_LEASE_SECONDS; si el trabajo está reservado por otra
+    invocación, terminado o fallido, solo se devuelve su estado. Si la invocación se interrumpe, la
+    siguiente retoma desde el último checkpoint cuando vence la reserva.
+
+    Si una parte falla, se descartan los conteos parciales de la parte, se vuelve al último
+    checkpoint y la invocación termina liberando la reserva; la siguiente reintenta la parte. El
+    trabajo se marca como fallido después de JOB_MAX_ATTEMPTS intentos consecutivos fallidos.
+
+    Args:
+        job_id (str): El id del trabajo.
+        store: Almacenamiento del estado (por defecto el de get_store()).
+        client (storage.Client): Cliente de GCS a utilizar (por defecto el de la instancia).
+        time_budget (float): Segundos de procesamiento de esta invocación.
+        chunk_bytes (int): Bytes procesados entre dos checkpoints.
+
+    Returns:
+        Dict[str, Any]: El estado del trabajo después de esta invocación (ver job_status).
+
+    Raises:
+        KeyError: Si el trabajo no existe.
+    """
+    store = store or get_store()
+    state, version = load_job(job_id, store)
+    if state['status'] != RUNNING or state['lease_until'] > time.time():
+        return job_status(state)
+
+    state['lease_until'] = time.time() + config.JOB_LEASE_SECONDS
+    try:
+        version = store.put(job_id, state, version)
+    except JobConflict:
+        # Otra invocación tomó el trabajo entre la lectura y la reserva.
+        return get_job(job_id, store)
+
+    started = perf_counter()
+    slowest = 0.0
+    _, format_result = job_query(state['query'], **state['params'])
+    aggregators, timer = state['aggregators'], state['timer']
+    # Se copian los conteos (no el momento del último aviso, que es de otra instancia).
+    errors = state['errors'].copy()
+    state['errors'] = errors
+    while True:
+        chunk_start = perf_counter()
+        try:
+            _scan_chunk(state, aggregators, timer, errors, chunk_bytes, client)
+            if state['index'] >= len(state['objects']):
+                state['result'] = to_jsonable(format_result(rank(aggregators, timer)))
+                state['status'], state['aggregators'] = DONE, None
+            state['chunks'] += 1
+            state['failures'], state['error'] = 0, None
+            failed = False
+        except Exception as e:
+            # Los conteos y la posición en memoria pueden haber quedado a mitad de la parte: se
+            # retoma el último checkpoint, que sigue siendo el de esta invocación.
+            saved, saved_version = load_job(job_id, store)
+            if saved_version != version:
+                return job_status(saved)
+            state, failed = saved, True
+            state['failures'] = state.get('failures', 0) + 1
+            state['error'] = str(e)
+            if state['failures'] >= config.JOB_MAX_ATTEMPTS:
+                state['status'] = FAILED
+            print(f"Error en el trabajo {job_id} (intento {state['failures']} de {config.JOB_MAX_ATTEMPTS}): {e}")
+        slowest = max(slowest, perf_counter() - chunk_start)
+        more = not failed and state['status'] == RUNNING and perf_counter() - started + slowest <= time_budget
+        # La reserva se libera con el último checkpoint de la invocación.
+        state['lease_until'] = time.time() + config.JOB_LEASE_SECONDS if more else 0.0
+        state['updated'] = time.time()
+        try:
+            version = store.put(job_id, state, version)
+        except JobConflict:
+            # La reserva venció y otra invocación retomó el trabajo; esta parte se descarta.
+            return get_job(job_id, store)
+        response = job_status(state)
+        print(f"Trabajo {job_id}: {response['progress']['percent']}% en {state['chunks']} partes ({state['status']})")
+        if not more:
+            return response
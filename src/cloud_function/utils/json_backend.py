@@ -0,0 +1,109 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+import json
+import os
+
+# Variable de entorno para elegir el parser sin tocar el código (por ejemplo JSON_BACKEND=json).
+ENV_VAR = 'JSON_BACKEND'
+
+
+class JsonBackend(NamedTuple):
+    """
+    Parser de JSON utilizado para decodificar las líneas del archivo.
+
+    Attributes:
+        name (str): Nombre del backend ('orjson', 'ujson' o 'json').
+        loads (Callable[[bytes], Any]): Función que decodifica una línea (bytes UTF-8 o str). Ante
+            una línea inválida lanza ValueError (o una subclase, como json.JSONDecodeError).
+        projectable (bool): Si conviene la decodificación proyectada de projection.py. Solo compensa
+            frente a la librería estándar; los parsers en C decodifican la línea completa más rápido.
+    """
+    name: str
+    loads: Callable[[bytes], Any]
+    projectable: bool
+
+
+def _orjson() -> JsonBackend:
+    import orjson
+    return JsonBackend('orjson', orjson.loads, False)
+
+
+def _ujson() -> JsonBackend:
+    import ujson
+    return JsonBackend('ujson', ujson.loads, False)
+
+
+def _stdlib() -> JsonBackend:
+    return JsonBackend('json', json.loads, True)
+
+
+# Backends soportados, en orden de preferencia.
+_FACTORIES: Dict[str, Callable[[], JsonBackend]] = {
+    'orjson': _orjson,
+    'ujson': _ujson,
+    'json': _stdlib,
+}
+
+_loaded: Dict[str, JsonBackend] = {}
+_default: Optional[str] = None
+
+
+def _load(name: str) -> Optional[JsonBackend]:
+    """
+    Importa el backend indicado; devuelve None si la librería no está instalada.
+    """
+    if name not in _loaded:
+        try:
+            _loaded[name] = _FACTORIES[name]()
+        except ImportError:
+            return None
+    return _loaded[name]
+
+
+def available_backends() -> List[str]:
+    """
+    Devuelve los backends instalados, en orden de preferencia.
+    """
+    return [name for name in _FACTORIES if _load(name) is not None]
+
+
+def get_backend(name: Optional[str] = None) -> JsonBackend:
+    """
+    Devuelve el backend indicado o, si no se indica, el elegido con set_backend, la variable de
+    entorno JSON_BACKEND o el más rápido de los instalados (siempre existe el de la librería estándar).
+
+    Args:
+        name (Optional[str]): Nombre del backend.
+
+    Returns:
+        JsonBackend: El backend solicitado.
+    """
+    global _default
+    if name is None:
+        if _default is None:
+            _default = os.environ.get(ENV_VAR) or available_backends()[0]
+        name = _default
+
+    if name not in _FACTORIES:
+        raise ValueError(f"Backend de JSON no soportado: {name}")
+    backend = _load(name)
+    if backend is None:
+        raise ValueError(f"El backend de JSON {name} no está instalado.")
+    return backend
+
+
+def set_backend(name: Optional[str]) -> JsonBackend:
+    """
+    Elige el backend que se usa por defecto (None vuelve a la elección automática). Permite
+    comparar los parsers entre sí con el mismo código de consulta.
+
+    Args:
+        name (Optional[str]): Nombre del backend.
+
+    Returns:
+        JsonBackend: El backend elegido.
+    """
+    global _default
+    _default = None
+    backend = get_backend(name)
+    _default = name
+    return backend
@@ -0,0 +1,131 @@
+from typing import Any, Dict, List, Optional
+from threading import Lock
+import resource
+from utils.bad_records import BadRecords
+from utils.timing import StageTimer
+
+# Prefijo de los nombres de las métricas en el formato de texto de Prometheus.
+METRIC_PREFIX = 'tweets_query'
+
+# Tipo de contenido del formato de texto de Prometheus.
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def peak_rss_mb() -> float:
+    """
+    Memoria máxima del proceso (RSS) en MB desde que arrancó la instancia, no solo durante la consulta.
+    """
+    # En Linux ru_maxrss está en KB.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def query_metrics(timer: StageTimer, errors: Optional[BadRecords], seconds: float) -> Dict[str, Any]:
+    """
+    Arma el bloque de métricas de una consulta a partir de los tiempos, contadores y valores
+    puntuales del timer (ver engine.scan_lines y engine.rank).
+
+    Args:
+        timer (StageTimer): El timer con el que se ejecutó la consulta.
+        errors (Optional[BadRecords]): Los registros descartados de la consulta.
+        seconds (float): Tiempo transcurrido de la consulta.
+
+    Returns:
+        Dict[str, Any]: Segundos, bytes y registros leídos con su tasa por segundo, segundos por
+        etapa, emojis extraídos, claves de cada agregación, registros descartados y memoria máxima.
+    """
+    counts = timer.counts
+    bytes_read = counts.get('bytes', 0)
+    records = counts.get('lines', 0)
+    cardinality: Dict[str, Dict[str, int]] = {}
+    for name, value in timer.gauges.items():
+        kind, _, field = name.partition(':')
+        if kind in ('groups', 'pairs'):
+            cardinality.setdefault(field, {})[kind] = int(value)
+    return {
+        'seconds': round(seconds, 3),
+        'bytes': bytes_read,
+        'records': records,
+        'bytes_per_s': round(bytes_read / seconds) if seconds > 0 else None,
+        'records_per_s': round(records / seconds) if seconds > 0 else None,
+        'stage_seconds': {stage: round(value, 3) for stage, value in timer.stages.items()},
+        'emojis': counts.get('emojis', 0),
+        'cardinality': cardinality,
+        'bad_records': sum(errors.counts.values()) if errors is not None else 0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _labels(**labels: str) -> str:
+    if not labels:
+        return ''
+    values = ','.join(f'{name}="{value}"' for name, value in sorted(labels.items()))
+    return '{' + values + '}'
+
+
+class MetricsRegistry:
+    """
+    Acumula las métricas de las consultas ejecutadas en el proceso, por consulta, y las entrega en el
+    formato de texto de Prometheus. Los contadores son de la instancia: se reinician con cada
+    arranque en frío y cada instancia lleva los suyos.
+    """
+
+    def __init__(self):
+        self.queries: Dict[str, Dict[str, Any]] = {}
+        self.lock = Lock()
+
+    def observe(self, query: str, metrics: Dict[str, Any]) -> None:
+        """
+        Suma a la consulta indicada las métricas de una ejecución (ver query_metrics).
+        """
+        with self.lock:
+            totals = self.queries.setdefault(query, {
+                'runs': 0, 'seconds': 0.0, 'bytes': 0, 'records': 0, 'emojis': 0, 'bad_records': 0,
+                'stage_seconds': {}, 'cardinality': {},
+            })
+            totals['runs'] += 1
+            for name in ('seconds', 'bytes', 'records', 'emojis', 'bad_records'):
+                totals[name] += metrics.get(name) or 0
+            for stage, seconds in metrics.get('stage_seconds', {}).items():
+                totals['stage_seconds'][stage] = totals['stage_seconds'].get(stage, 0.0) + seconds
+            # Las claves de cada agregación son las de la última ejecución.
+            totals['cardinality'].update(metrics.get('cardinality', {}))
+
+    def prometheus(self) -> str:
+        """
+        Devuelve el estado actual en el formato de texto de Prometheus.
+        """
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, description: str, samples: List[Any]) -> None:
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {description}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{METRIC_PREFIX}_{name}{_labels(**labels)} {value}")
+
+        with self.lock:
+            queries = sorted(self.queries.items())
+            counters = [
+                ('runs_total', 'Consultas ejecutadas (sin contar las respondidas desde la caché).', 'runs'),
+                ('seconds_total', 'Segundos de ejecución de las consultas.', 'seconds'),
+                ('bytes_total', 'Bytes leídos.', 'bytes'),
+                ('records_total', 'Registros (líneas) leídos.', 'records'),
+                ('emojis_total', 'Emojis extraídos.', 'emojis'),
+                ('bad_records_total', 'Registros descartados.', 'bad_records'),
+            ]
+            for name, description, key in counters:
+                metric(name, 'counter', description, [({'query': query}, totals[key]) for query, totals in queries])
+            metric('stage_seconds_total', 'counter', 'Segundos por etapa (descarga, decodificación, emojis, agregación, ranking).', [
+                ({'query': query, 'stage': stage}, round(seconds, 6))
+                for query, totals in queries for stage, seconds in sorted(totals['stage_seconds'].items())
+            ])
+            metric('keys', 'gauge', 'Claves distintas de cada agregación en la última ejecución.', [
+                ({'query': query, 'field': field, 'kind': kind}, value)
+                for query, totals in queries for field, kinds in sorted(totals['cardinality'].items())
+                for kind, value in sorted(kinds.items())
+            ])
+        metric('peak_rss_megabytes', 'gauge', 'Memoria máxima del proceso (RSS) en MB.', [({}, peak_rss_mb())])
+        return '\n'.join(lines) + '\n'
+
+
+# Se crea al cargar el módulo, por lo que se conserva entre invocaciones de una instancia caliente.
+registry = MetricsRegistry()
@@ -0,0 +1,102 @@
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import utils.config as config
+
+
+class ResultCache:
+    """
+    Caché LRU de respuestas que vive mientras la instancia de la Cloud Function siga caliente.
+
+    Las entradas más recientes se guardan en memoria; las que se desalojan se vuelcan como JSON a
+    /tmp, también con desalojo LRU (por fecha de último uso del archivo) según un máximo de bytes.
+    Las claves incluyen la generación del objeto de GCS, por lo que una reescritura del archivo
+    nunca devuelve un resultado viejo: la entrada anterior simplemente deja de consultarse.
+    """
+
+    def __init__(self, max_entries: int = config.RESULT_CACHE_ENTRIES, spill_dir: Optional[str] = config.RESULT_CACHE_DIR,
+                 max_spill_bytes: int = config.RESULT_CACHE_SPILL_BYTES):
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self.entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+
+    @staticmethod
+    def make_key(bucket: str, object_name: str, generation: Any, query: str, params: Dict[str, Any]) -> str:
+        """
+        Arma la clave de una consulta a partir del objeto (bucket, nombre y generación, o las
+        generaciones de cada objeto si es un prefijo o patrón), la consulta y sus parámetros.
+        """
+        raw = json.dumps([bucket, object_name, generation, query, params], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _spill_path(self, key: str) -> str:
+        """
+        Ruta del archivo en /tmp de una entrada desalojada.
+        """
+        return os.path.join(self.spill_dir, key + '.json')
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve la respuesta guardada para la clave (buscando en memoria y luego en /tmp) o None.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.spill_dir is None:
+            return None
+
+        try:
+            with open(self._spill_path(key), 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Se vuelve a traer a memoria; el archivo queda como copia y se elimina si se desaloja por espacio.
+        self.put(key, value)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Guarda una respuesta (serializable a JSON), desalojando a /tmp las menos usadas recientemente.
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            evicted_key, evicted = self.entries.popitem(last=False)
+            self._spill(evicted_key, evicted)
+
+    def _spill(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Vuelca una entrada a /tmp y libera espacio eliminando los archivos usados hace más tiempo.
+        Un error de escritura solo hace que la entrada se pierda.
+        """
+        if self.spill_dir is None:
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = self._spill_path(key)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(path + '.tmp', path)
+            self._trim_spill()
+        except OSError as e:
+            print(f"Error al guardar en la caché de resultados: {e}")
+
+    def _trim_spill(self) -> None:
+        """
+        Elimina los archivos volcados más antiguos hasta respetar el máximo de bytes.
+        """
+        files = []
+        for name in os.listdir(self.spill_dir):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(self.spill_dir, name))
+                files.append((stat.st_mtime_ns, stat.st_size, name))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_spill_bytes:
+                break
+            os.remove(os.path.join(self.spill_dir, name))
+            total -= size
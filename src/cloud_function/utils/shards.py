@@ -0,0 +1,103 @@
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+import utils.config as config
+from utils.bad_records import BadRecords
+from utils.engine import AggregationSpec, Aggregator, scan_lines
+from utils.timing import StageTimer
+from utils.utils import GLOB_CHARS
+import utils.utils as helper
+
+
+def is_pattern(file_path: str) -> bool:
+    """
+    Indica si la ruta es un prefijo terminado en '/' o un patrón glob en lugar de un único objeto.
+    """
+    return file_path.endswith('/') or GLOB_CHARS.search(file_path) is not None
+
+
+def shard_bytes(blob) -> int:
+    """
+    Bytes que ocupa como máximo el buffer de descarga de un objeto mientras se lee.
+    """
+    return min(blob.size, (config.GCS_CONCURRENCY + 1) * config.CHUNK_SIZE)
+
+
+def bounded_map(executor: Executor, fn: Callable[[Any], Any], shards: Sequence[Tuple[Any, int]],
+                max_workers: int, max_bytes: int = config.SHARD_BYTES_IN_FLIGHT) -> Iterator[Any]:
+    """
+    Aplica fn a cada shard en el executor y entrega los resultados en el orden de los shards. A la
+    vez hay como máximo max_workers shards en curso y, entre todos, max_bytes bytes; un shard que
+    supera el límite por sí solo se procesa cuando no hay otro en curso.
+    """
+    pending = deque(shards)
+    in_flight = deque()
+    in_flight_bytes = 0
+    while pending or in_flight:
+        while pending and len(in_flight) < max_workers and (not in_flight or in_flight_bytes + pending[0][1] <= max_bytes):
+            shard, size = pending.popleft()
+            in_flight.append((executor.submit(fn, shard), size))
+            in_flight_bytes += size
+        future, size = in_flight.popleft()
+        in_flight_bytes -= size
+        yield future.result()
+
+
+def scan_blob(blob, specs: List[AggregationSpec], projected: bool = True,
+              date_range: Optional[Tuple[Any, Any]] = None) -> Tuple[List[Aggregator], StageTimer, BadRecords]:
+    """
+    Recorre un objeto completo y devuelve los agregadores con sus conteos parciales, el tiempo de
+    cada etapa del objeto y sus registros descartados.
+    """
+    stages = StageTimer()
+    errors = BadRecords(log_interval=None)
+    aggregators = scan_lines(helper.iter_lines_from_blob(blob), [Aggregator(spec) for spec in specs],
+                             projected, date_range, stages, errors, start=0)
+    return aggregators, stages, errors
+
+
+def run_sharded(pattern: str, specs: List[AggregationSpec], projected: bool = True,
+                date_range: Optional[Tuple[Any, Any]] = None, timer: Optional[StageTimer] = None,
+                concurrency: int = config.SHARD_CONCURRENCY, max_bytes: int = config.SHARD_BYTES_IN_FLIGHT,
+                client=None, errors: Optional[BadRecords] = None) -> List[Aggregator]:
+    """
+    Resuelve las agregaciones sobre todos los objetos que coinciden con un prefijo o patrón (por
+    ejemplo un shard por día), como si fueran un único archivo con los objetos concatenados en orden
+    de nombre.
+
+    Los objetos se leen en threads (la descarga libera el GIL, por lo que la de un objeto avanza
+    mientras se decodifica otro) y los conteos parciales se mezclan en el orden de los objetos, por
+    lo que el resultado es idéntico al del recorrido secuencial.
+
+    Args:
+        pattern (str): Prefijo terminado en '/' o patrón glob de los objetos dentro del bucket.
+        specs (List[AggregationSpec]): Agregaciones a calcular.
+        projected (bool): Si es True solo se decodifican las claves que usan las agregaciones.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, a considerar.
+        timer (Optional[StageTimer]): Si se indica, acumula el tiempo de cada etapa sumado entre los
+            objetos (con objetos en paralelo la suma puede superar el tiempo transcurrido).
+        concurrency (int): Cantidad máxima de objetos leídos a la vez.
+        max_bytes (int): Tope de los buffers de descarga sumados de los objetos en curso (ver shard_bytes).
+        client (storage.Client): Cliente de GCS a utilizar (por defecto el de la instancia).
+        errors (Optional[BadRecords]): Si se indica, se le suman los registros descartados de cada
+            objeto; los offsets de la muestra quedan como 'objeto:offset'.
+
+    Returns:
+        List[Aggregator]: Un agregador con los conteos totales por cada especificación.
+    """
+    blobs = helper.list_objects(pattern, client)
+    merged = [Aggregator(spec) for spec in specs]
+    scan = partial(scan_blob, specs=specs, projected=projected, date_range=date_range)
+    concurrency = max(1, min(concurrency, len(blobs)))
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='gcs-shard') as executor:
+        scanned = bounded_map(executor, scan, [(blob, shard_bytes(blob)) for blob in blobs], concurrency, max_bytes)
+        for blob, (partials, stages, blob_errors) in zip(blobs, scanned):
+            for aggregator, counts in zip(merged, partials):
+                aggregator.merge(counts)
+            if timer is not None:
+                timer.merge(stages)
+            if errors is not None:
+                errors.merge(blob_errors, source=blob.name)
+    return merged
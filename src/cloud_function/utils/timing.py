@@ -0,0 +1,108 @@
+from typing import Callable, Dict, Iterable, Iterator, List, TypeVar
+from contextlib import contextmanager
+from time import perf_counter
+
+T = TypeVar('T')
+
+
+class StageTimer:
+    """
+    Acumula el tiempo (en segundos) de cada etapa de una consulta: descarga, decodificación,
+    agregación y ranking. Solo usa perf_counter, por lo que puede quedar activo en producción.
+
+    También acumula contadores (por ejemplo líneas y bytes leídos) y guarda valores puntuales
+    (gauges, por ejemplo la cantidad de claves de cada agregación) para las métricas (ver metrics.py).
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        """
+        Suma segundos a la etapa indicada.
+        """
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Suma amount al contador indicado.
+        """
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def set(self, name: str, value: float) -> None:
+        """
+        Guarda el valor puntual indicado, reemplazando el anterior.
+        """
+        self.gauges[name] = value
+
+    @contextmanager
+    def stage(self, stage: str):
+        """
+        Mide el bloque de código como parte de la etapa indicada.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, perf_counter() - start)
+
+    def iterate(self, iterable: Iterable[T], stage: str) -> Iterator[T]:
+        """
+        Recorre el iterable sumando a la etapa el tiempo que tarda en producir cada elemento. Si el
+        iterable consume a otro iterable medido, el tiempo de este queda incluido (ver subtract).
+        """
+        iterator = iter(iterable)
+        add = self.add
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                add(stage, perf_counter() - start)
+                return
+            add(stage, perf_counter() - start)
+            yield item
+
+    def timed(self, function: Callable[[T], List], stage: str, count: str) -> Callable[[T], List]:
+        """
+        Envuelve una función que devuelve una lista (por ejemplo un extractor de claves) para sumar
+        a la etapa el tiempo de cada llamada y al contador la cantidad de elementos devueltos.
+        """
+        add = self.add
+        counts = self.counts
+
+        def wrapper(item: T) -> List:
+            start = perf_counter()
+            try:
+                result = function(item)
+            finally:
+                add(stage, perf_counter() - start)
+            counts[count] = counts.get(count, 0) + len(result)
+            return result
+        return wrapper
+
+    def subtract(self, stage: str, inner: str) -> None:
+        """
+        Descuenta de una etapa el tiempo de otra incluida en ella, para informar tiempos exclusivos.
+        """
+        self.stages[stage] = self.stages.get(stage, 0.0) - self.stages.get(inner, 0.0)
+
+    def merge(self, other: 'StageTimer') -> None:
+        """
+        Suma los tiempos y los contadores de otro StageTimer y toma sus valores puntuales.
+        """
+        for stage, seconds in other.stages.items():
+            self.add(stage, seconds)
+        for name, amount in other.counts.items():
+            self.count(name, amount)
+        self.gauges.update(other.gauges)
+
+    def as_dict(self) -> Dict[str, float]:
+        """
+        Devuelve los segundos de cada etapa (redondeados a milisegundos) y el total.
+        """
+        timings = {stage: round(seconds, 3) for stage, seconds in self.stages.items()}
+        timings['total'] = round(sum(self.stages.values()), 3)
+        return timings
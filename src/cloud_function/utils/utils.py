@@ -1,25 +1,243 @@
-from google.cloud import storage
+from typing import TYPE_CHECKING, Iterator, List, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.compressed import compression, iter_compressed_lines
 import utils.config as config
+import fnmatch
+import io
+import re
 
-def download_file_from_gcs(file_path: str) -> str:
+if TYPE_CHECKING:
+    from google.cloud import storage
+
+# Caracteres que convierten una ruta en patrón glob.
+GLOB_CHARS = re.compile(r'[*?[]')
+
+# Cliente reutilizado entre invocaciones de una misma instancia (evita recrear la sesión HTTP).
+_client = None
+
+def get_client() -> 'storage.Client':
+    """
+    Devuelve el cliente de GCS de la instancia, creándolo en el primer uso. La librería de GCS se
+    importa recién aquí: las lecturas por rango solo necesitan un blob y no la cargan.
     """
-    Descarga el contenido de un archivo desde un bucket de Google Cloud Storage.
+    global _client
+    if _client is None:
+        from google.cloud import storage
+        _client = storage.Client()
+    return _client
+
+def get_object_generation(file_path: str, client: 'storage.Client' = None) -> int:
+    """
+    Obtiene la generación vigente de un objeto con una sola consulta de metadatos (sin leer su contenido).
+    La generación cambia cada vez que el objeto se reescribe.
 
     Args:
         file_path (str): La ruta al archivo dentro del bucket.
+        client (storage.Client): Cliente de GCS a utilizar (por defecto el de la instancia).
+
+    Returns:
+        int: La generación del objeto.
+    """
+    blob = (client or get_client()).bucket(config.BUCKET_NAME).get_blob(file_path)
+    if blob is None:
+        raise FileNotFoundError(file_path)
+    return blob.generation
+
+def list_objects(pattern: str, client: 'storage.Client' = None) -> list:
+    """
+    Lista los objetos del bucket que coinciden con un prefijo terminado en '/' (todos los objetos
+    bajo ese prefijo) o con un patrón glob como 'tweets/2021-02-*.json' ('*' también abarca '/').
+    Solo se listan los objetos bajo la parte fija del patrón.
+
+    Args:
+        pattern (str): Prefijo o patrón de los objetos dentro del bucket.
+        client (storage.Client): Cliente de GCS a utilizar (por defecto el de la instancia).
+
+    Returns:
+        list: Los blobs, con metadatos (size y generation), ordenados por nombre.
+    """
+    magic = GLOB_CHARS.search(pattern)
+    prefix = pattern[:magic.start()] if magic else pattern
+    blobs = [
+        blob for blob in (client or get_client()).list_blobs(config.BUCKET_NAME, prefix=prefix)
+        # Los objetos terminados en '/' son marcadores de carpeta de la consola; los de JOB_PREFIX
+        # guardan el estado de los trabajos (ver jobs.py).
+        if not blob.name.endswith('/') and not blob.name.startswith(config.JOB_PREFIX) and (magic is None or fnmatch.fnmatchcase(blob.name, pattern))
+    ]
+    if not blobs:
+        raise FileNotFoundError(pattern)
+    return sorted(blobs, key=lambda blob: blob.name)
+
+def iter_blob_lines(blob, chunk_size: int = config.CHUNK_SIZE, start: int = 0) -> Iterator[bytes]:
+    """
+    Recorre un blob línea por línea mediante lecturas por rango, manteniendo en memoria solo
+    el bloque en curso y la línea que quedó incompleta al final del bloque anterior.
+
+    Args:
+        blob: Blob con metadatos cargados (size y generation), por ejemplo el de bucket.get_blob().
+            Basta con un objeto que exponga size y download_as_bytes(start=, end=).
+        chunk_size (int): Cantidad de bytes pedida en cada lectura.
+        start (int): Offset desde el que se lee; debe ser el comienzo de una línea.
+
+    Returns:
+        Iterator[bytes]: Las líneas del archivo, sin el salto de línea final.
+    """
+    pending = b''
+    for offset in range(start, blob.size, chunk_size):
+        # El extremo final del rango es inclusivo.
+        end = min(offset + chunk_size, blob.size) - 1
+        lines = (pending + blob.download_as_bytes(start=offset, end=end)).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+
+    if pending:
+        yield pending
+
+def blob_ranges(size: int, chunk_size: int, start: int = 0) -> List[Tuple[int, int]]:
+    """
+    Divide el objeto, desde start, en rangos [inicio, fin] de hasta chunk_size bytes (el extremo
+    final es inclusivo, como en download_as_bytes).
+    """
+    return [(offset, min(offset + chunk_size, size) - 1) for offset in range(start, size, chunk_size)]
+
+def iter_blob_chunks_parallel(blob, chunk_size: int = config.CHUNK_SIZE,
+                              concurrency: int = config.GCS_CONCURRENCY, start: int = 0) -> Iterator[bytes]:
+    """
+    Descarga los bloques del blob con varias lecturas por rango simultáneas (un pool de threads;
+    la descarga libera el GIL) y los entrega en orden. Mientras se consume un bloque ya se están
+    descargando los siguientes, hasta concurrency a la vez, por lo que en memoria hay como máximo
+    concurrency + 1 bloques.
+
+    Args:
+        blob: Blob con metadatos cargados (size y generation), por ejemplo el de bucket.get_blob().
+            Basta con un objeto que exponga size y download_as_bytes(start=, end=).
+        chunk_size (int): Cantidad de bytes pedida en cada lectura.
+        concurrency (int): Cantidad máxima de lecturas en curso.
+        start (int): Offset desde el que se lee.
 
     Returns:
-        str: El contenido del archivo como una cadena de texto.
+        Iterator[bytes]: Los bloques del archivo, en orden.
     """
+    ranges = iter(blob_ranges(blob.size, chunk_size, start))
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='gcs-range')
+    in_flight = deque()
     try:
-        # Inicializar el cliente de GCS
-        client = storage.Client()
-        bucket = client.bucket(config.BUCKET_NAME)
-        blob = bucket.blob(file_path)
-        
-        # Descargar el contenido del archivo
-        content = blob.download_as_text(encoding='utf-8')
-        return content
-    except Exception as e:
-        print(f"Error al descargar el archivo desde GCS: {e}")
-        return ""
\ No newline at end of file
+        for range_start, range_end in ranges:
+            in_flight.append(pool.submit(blob.download_as_bytes, start=range_start, end=range_end))
+            if len(in_flight) == concurrency:
+                break
+        while in_flight:
+            chunk = in_flight.popleft().result()
+            # Se pide el rango siguiente antes de entregar el bloque, así la descarga avanza mientras se procesa.
+            for range_start, range_end in ranges:
+                in_flight.append(pool.submit(blob.download_as_bytes, start=range_start, end=range_end))
+                break
+            yield chunk
+    finally:
+        # Si el consumidor se detiene antes (o falla una lectura) no se espera a las descargas pendientes.
+        for future in in_flight:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+def iter_blob_lines_parallel(blob, chunk_size: int = config.CHUNK_SIZE,
+                             concurrency: int = config.GCS_CONCURRENCY, start: int = 0) -> Iterator[bytes]:
+    """
+    Recorre un blob línea por línea como iter_blob_lines, pero descargando los bloques siguientes
+    en paralelo mientras se procesan las líneas del bloque en curso (ver iter_blob_chunks_parallel).
+    Las líneas que quedan cortadas entre dos bloques se vuelven a unir.
+
+    Args:
+        blob: Blob con metadatos cargados (size y generation).
+        chunk_size (int): Cantidad de bytes pedida en cada lectura.
+        concurrency (int): Cantidad máxima de lecturas en curso; con 1 la lectura es secuencial.
+        start (int): Offset desde el que se lee; debe ser el comienzo de una línea.
+
+    Returns:
+        Iterator[bytes]: Las líneas del archivo, sin el salto de línea final.
+    """
+    if concurrency <= 1 or blob.size - start <= chunk_size:
+        yield from iter_blob_lines(blob, chunk_size, start)
+        return
+
+    pending = b''
+    for chunk in iter_blob_chunks_parallel(blob, chunk_size, concurrency, start):
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+
+    if pending:
+        yield pending
+
+class BlobReader(io.RawIOBase):
+    """
+    Archivo de solo lectura sobre un blob, con seek, que obtiene cada bloque con una lectura por
+    rango. Permite descomprimir un objeto al vuelo (zip necesita seek para leer su índice, que
+    está al final del archivo).
+    """
+
+    def __init__(self, blob):
+        self.blob = blob
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.blob.size}[whence]
+        self.position = base + offset
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.blob.size:
+            return 0
+        # El extremo final del rango es inclusivo.
+        end = min(self.position + len(buffer), self.blob.size) - 1
+        data = self.blob.download_as_bytes(start=self.position, end=end)
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+def iter_lines_from_gcs(file_path: str, chunk_size: int = config.CHUNK_SIZE, client: 'storage.Client' = None,
+                        concurrency: int = config.GCS_CONCURRENCY) -> Iterator[bytes]:
+    """
+    Recorre un archivo de Google Cloud Storage línea por línea sin descargarlo completo. Los
+    objetos sin comprimir se leen con varias lecturas por rango simultáneas que se adelantan al
+    procesamiento de las líneas (ver iter_blob_lines_parallel).
+
+    La lectura queda fijada a la generación del objeto vigente al comenzar, por lo que una
+    reescritura concurrente no mezcla contenidos. Los objetos .gz, .zip y .zst se descomprimen a
+    medida que se leen (ver compressed.py). Para pruebas locales se puede inyectar un
+    cliente propio o apuntar el cliente por defecto a un emulador con STORAGE_EMULATOR_HOST.
+
+    Args:
+        file_path (str): La ruta al archivo dentro del bucket.
+        chunk_size (int): Cantidad de bytes pedida en cada lectura.
+        client (storage.Client): Cliente de GCS a utilizar (por defecto el de la instancia).
+        concurrency (int): Cantidad máxima de lecturas por rango en curso (ver config.GCS_CONCURRENCY).
+
+    Returns:
+        Iterator[bytes]: Las líneas del archivo, sin el salto de línea final.
+    """
+    client = client or get_client()
+    blob = client.bucket(config.BUCKET_NAME).get_blob(file_path)
+    if blob is None:
+        raise FileNotFoundError(file_path)
+    yield from iter_lines_from_blob(blob, chunk_size, concurrency)
+
+def iter_lines_from_blob(blob, chunk_size: int = config.CHUNK_SIZE, concurrency: int = config.GCS_CONCURRENCY) -> Iterator[bytes]:
+    """
+    Recorre las líneas de un blob ya obtenido (por ejemplo de list_objects), descomprimiéndolo al
+    vuelo si su nombre termina en .gz, .zip o .zst.
+    """
+    kind = compression(blob.name)
+    if kind is None:
+        yield from iter_blob_lines_parallel(blob, chunk_size, concurrency)
+    else:
+        yield from iter_compressed_lines(io.BufferedReader(BlobReader(blob), chunk_size), kind)
@@ -0,0 +1,302 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from array import array
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from bad_records import BadRecords
+from engine import SOURCE_KEYS, extract_date, extract_mentions, extract_username, parse_lines
+
+# Formato de la caché: MAGIC, largo del encabezado (uint64), encabezado JSON y luego las columnas.
+# El encabezado indica por cada columna su offset, tamaño en bytes y typecode de array (None si son bytes),
+# y los conteos y offsets de ejemplo de las líneas descartadas al generarla.
+MAGIC = b'TWCOL1\n'
+CACHE_SUFFIX = '.colcache'
+
+# Bits de la columna 'flags': campos que no se pudieron extraer del tweet original.
+MISSING_DATE = 1
+MISSING_USER = 2
+MISSING_CONTENT = 4
+MISSING_MENTIONS = 8
+
+
+def cache_path(file_path: str) -> str:
+    """
+    Devuelve la ruta de la caché columnar asociada al archivo (se guarda junto a los datos).
+    """
+    return file_path + CACHE_SUFFIX
+
+
+def _source_signature(file_path: str) -> Dict[str, int]:
+    """
+    Tamaño y fecha de modificación del archivo original, usados para invalidar la caché.
+    """
+    stat = os.stat(file_path)
+    return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+
+def _read_header(f) -> dict:
+    """
+    Lee el encabezado de una caché abierta en modo binario.
+    """
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("El archivo no es una caché columnar válida.")
+    header_length, = struct.unpack('<Q', f.read(8))
+    return json.loads(f.read(header_length))
+
+
+def _encode_strings(strings: List[str]) -> Tuple[array, bytes]:
+    """
+    Codifica una lista de strings como offsets + buffer UTF-8.
+    """
+    offsets = array('Q', [0])
+    buffer = bytearray()
+    for string in strings:
+        buffer += string.encode('utf-8')
+        offsets.append(len(buffer))
+    return offsets, bytes(buffer)
+
+
+def _decode_strings(offsets: array, buffer: bytes) -> List[str]:
+    """
+    Operación inversa de _encode_strings.
+    """
+    return [buffer[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+def build_cache(file_path: str) -> str:
+    """
+    Convierte el NDJSON de tweets en una caché columnar con solo los campos que usan q1, q2 y q3.
+
+    Las fechas (YYYY-MM-DD) y los usuarios (autores y mencionados) se codifican con diccionarios,
+    el contenido se guarda como offsets + bytes y las menciones como una lista aplanada de ids con
+    sus offsets. Las líneas que no son JSON válido se descartan y se registran en el encabezado,
+    para que las consultas que leen de la caché las informen igual que al leer el JSON.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets.
+
+    Returns:
+        str: La ruta de la caché generada.
+    """
+    signature = _source_signature(file_path)
+    date_ids, user_ids = {}, {}
+    date_column, user_column, flags = array('I'), array('I'), array('B')
+    content_offsets, mention_offsets, mention_column = array('Q', [0]), array('Q', [0]), array('I')
+    content_size = 0
+    errors = BadRecords()
+
+    # El contenido se vuelca a un archivo temporal para no retenerlo en memoria.
+    with open(file_path, 'rb') as f, tempfile.TemporaryFile() as content_buffer:
+        for tweet in parse_lines(f, list(SOURCE_KEYS.values()), errors=errors, start=0):
+            flag = 0
+            try:
+                date = extract_date(tweet)[0]
+                date_column.append(date_ids.setdefault(date, len(date_ids)))
+            except (KeyError, TypeError, AttributeError):
+                date_column.append(0)
+                flag |= MISSING_DATE
+
+            try:
+                username = extract_username(tweet)[0]
+                user_column.append(user_ids.setdefault(username, len(user_ids)))
+            except (KeyError, TypeError, AttributeError):
+                user_column.append(0)
+                flag |= MISSING_USER
+
+            content = tweet.get('content') if isinstance(tweet, dict) else None
+            if isinstance(content, str):
+                encoded = content.encode('utf-8')
+                content_buffer.write(encoded)
+                content_size += len(encoded)
+            else:
+                flag |= MISSING_CONTENT
+            content_offsets.append(content_size)
+
+            try:
+                mentions = extract_mentions(tweet)
+                mention_column.extend(user_ids.setdefault(name, len(user_ids)) for name in mentions)
+            except (KeyError, TypeError, AttributeError):
+                flag |= MISSING_MENTIONS
+            mention_offsets.append(len(mention_column))
+
+            flags.append(flag)
+
+        date_offsets, date_buffer = _encode_strings(list(date_ids))
+        user_offsets, user_buffer = _encode_strings(list(user_ids))
+        columns = [
+            ('flags', flags), ('date_ids', date_column), ('user_ids', user_column),
+            ('content_offsets', content_offsets), ('mention_offsets', mention_offsets), ('mention_ids', mention_column),
+            ('date_dict_offsets', date_offsets), ('date_dict', date_buffer),
+            ('user_dict_offsets', user_offsets), ('user_dict', user_buffer),
+        ]
+
+        # Ubicación de cada columna relativa al fin del encabezado; el contenido va al final.
+        layout, position = {}, 0
+        for name, column in columns:
+            if isinstance(column, array):
+                layout[name] = [position, len(column) * column.itemsize, column.typecode]
+            else:
+                layout[name] = [position, len(column), None]
+            position += layout[name][1]
+        layout['content'] = [position, content_size, None]
+
+        bad_records = {'counts': dict(errors.counts), 'sample_offsets': errors.samples}
+        header = json.dumps({**signature, 'records': len(flags), 'columns': layout, 'bad_records': bad_records}).encode('utf-8')
+
+        # Se escribe a un archivo temporal y se reemplaza al final para no dejar cachés a medio escribir.
+        target = cache_path(file_path)
+        with open(target + '.tmp', 'wb') as out:
+            out.write(MAGIC)
+            out.write(struct.pack('<Q', len(header)))
+            out.write(header)
+            for _, column in columns:
+                out.write(column.tobytes() if isinstance(column, array) else column)
+            content_buffer.seek(0)
+            shutil.copyfileobj(content_buffer, out)
+        os.replace(target + '.tmp', target)
+
+    return target
+
+
+def is_fresh(file_path: str) -> bool:
+    """
+    Indica si la caché existe y corresponde al tamaño y fecha de modificación actuales del archivo.
+    Las cachés sin registros descartados en el encabezado (de versiones anteriores) se regeneran.
+    """
+    try:
+        with open(cache_path(file_path), 'rb') as f:
+            header = _read_header(f)
+    except (FileNotFoundError, ValueError, struct.error):
+        return False
+    signature = _source_signature(file_path)
+    return 'bad_records' in header and all(header.get(key) == value for key, value in signature.items())
+
+
+def has_cache(file_path: str) -> bool:
+    """
+    Indica si el archivo tiene caché columnar, regenerándola si el archivo original cambió.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets.
+
+    Returns:
+        bool: True si hay una caché vigente para el archivo.
+    """
+    if not os.path.exists(cache_path(file_path)):
+        return False
+    if not is_fresh(file_path):
+        build_cache(file_path)
+    return True
+
+
+def _merge_bad_records(header: dict, errors: Optional[BadRecords]) -> None:
+    """
+    Suma a errors las líneas descartadas al generar la caché (ver build_cache).
+    """
+    if errors is None:
+        return
+    saved = BadRecords()
+    saved.counts.update(header.get('bad_records', {}).get('counts', {}))
+    saved.samples = header.get('bad_records', {}).get('sample_offsets', {})
+    errors.merge(saved)
+
+
+def _column(mm: mmap.mmap, header: dict, base: int, name: str):
+    """
+    Lee una columna de la caché mapeada: un array con su typecode o, si no tiene, los bytes.
+    """
+    offset, size, typecode = header['columns'][name]
+    start = base + offset
+    if typecode is None:
+        return mm[start:start + size]
+    values = array(typecode)
+    values.frombytes(mm[start:start + size])
+    return values
+
+
+def read_columns(file_path: str, names: List[str], errors: Optional[BadRecords] = None) -> Tuple[int, Dict[str, array]]:
+    """
+    Lee columnas completas de la caché, sin reconstruir los tweets. Los diccionarios ('date_dict' y
+    'user_dict') se devuelven ya decodificados como listas de strings indexadas por id.
+
+    Args:
+        file_path (str): La ruta al archivo JSON original (la caché se ubica a partir de ella).
+        names (List[str]): Nombres de las columnas (ver build_cache).
+        errors (Optional[BadRecords]): Si se indica, se le suman las líneas descartadas al generar la caché.
+
+    Returns:
+        Tuple[int, Dict[str, array]]: La cantidad de registros y cada columna pedida.
+    """
+    with open(cache_path(file_path), 'rb') as f:
+        header = _read_header(f)
+        _merge_bad_records(header, errors)
+        base = f.tell()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            columns = {}
+            for name in names:
+                if name.endswith('_dict'):
+                    columns[name] = _decode_strings(_column(mm, header, base, name + '_offsets'), _column(mm, header, base, name))
+                else:
+                    columns[name] = _column(mm, header, base, name)
+    return header['records'], columns
+
+
+def iter_records(file_path: str, keys: List[str], errors: Optional[BadRecords] = None) -> Iterator[dict]:
+    """
+    Reconstruye desde la caché tweets con solo las claves pedidas, con la misma forma que el JSON
+    original ('date', 'user.username', 'content' y 'mentionedUsers[].username'). Los campos que no
+    se pudieron extraer del tweet original se omiten.
+
+    Args:
+        file_path (str): La ruta al archivo JSON original (la caché se ubica a partir de ella).
+        keys (List[str]): Claves del tweet a reconstruir.
+        errors (Optional[BadRecords]): Si se indica, se le suman las líneas descartadas al generar la caché.
+
+    Returns:
+        Iterator[dict]: Un tweet proyectado por cada línea válida del archivo original.
+    """
+    with open(cache_path(file_path), 'rb') as f:
+        header = _read_header(f)
+        _merge_bad_records(header, errors)
+        base = f.tell()
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            def column(name: str):
+                return _column(mm, header, base, name)
+
+            flags = column('flags')
+            need_date, need_user = 'date' in keys, 'user' in keys
+            need_content, need_mentions = 'content' in keys, 'mentionedUsers' in keys
+
+            dates = _decode_strings(column('date_dict_offsets'), column('date_dict')) if need_date else None
+            users = _decode_strings(column('user_dict_offsets'), column('user_dict')) if need_user or need_mentions else None
+            date_ids = column('date_ids') if need_date else None
+            user_ids = column('user_ids') if need_user else None
+            content_offsets = column('content_offsets') if need_content else None
+            content_base = base + header['columns']['content'][0]
+            mention_offsets = column('mention_offsets') if need_mentions else None
+            mention_ids = column('mention_ids') if need_mentions else None
+
+            for i in range(header['records']):
+                flag = flags[i]
+                tweet = {}
+                if need_date and not flag & MISSING_DATE:
+                    tweet['date'] = dates[date_ids[i]]
+                if need_user and not flag & MISSING_USER:
+                    tweet['user'] = {'username': users[user_ids[i]]}
+                if need_content and not flag & MISSING_CONTENT:
+                    tweet['content'] = mm[content_base + content_offsets[i]:content_base + content_offsets[i + 1]].decode('utf-8')
+                if need_mentions and not flag & MISSING_MENTIONS:
+                    tweet['mentionedUsers'] = [
+                        {'username': users[user_id]} for user_id in mention_ids[mention_offsets[i]:mention_offsets[i + 1]]
+                    ]
+                yield tweet
+
+
+if __name__ == "__main__":
+    # Uso: python columnar.py farmers-protest-tweets-2021-2-4.json
+    print(build_cache(sys.argv[1]))
@@ -0,0 +1,161 @@
+from typing import Dict, Iterable, List, Tuple, Union
+from array import array
+import heapq
+
+# Un grupo pasa de dict a arrays cuando tiene al menos 1 subclave cada DENSE_RATIO ids existentes:
+# desde ahí uno o dos bytes por id (aunque no aparezca en el grupo) ocupan menos que una entrada de dict.
+DENSE_RATIO = 16
+# Tamaño mínimo de un grupo para pasarlo a arrays (los grupos chicos quedan como dict).
+DENSE_MIN = 256
+
+
+# Tipo de array siguiente cuando un conteo no entra en el actual (1, 2, 4 y 8 bytes por conteo).
+_WIDER = {'B': 'H', 'H': 'I', 'I': 'Q'}
+
+
+class _DenseRow:
+    """
+    Conteos de un grupo indexados por id de subclave, con los ids en orden de primera aparición
+    para conservar los desempates de Counter.most_common. Los conteos empiezan con un byte cada uno
+    y el array se ensancha solo cuando algún conteo lo desborda.
+    """
+    __slots__ = ('counts', 'order')
+
+    def __init__(self, row: Dict[int, int], size: int):
+        self.counts = array('B', bytes(size))
+        self.order = array('I', row)
+        for sub_id, count in row.items():
+            self._set(sub_id, count)
+
+    def _set(self, sub_id: int, count: int) -> None:
+        """
+        Asigna el conteo, ensanchando el array mientras no entre.
+        """
+        while True:
+            try:
+                self.counts[sub_id] = count
+                return
+            except OverflowError:
+                self.counts = array(_WIDER[self.counts.typecode], self.counts)
+
+    def add(self, sub_id: int, count: int, size: int) -> None:
+        counts = self.counts
+        if sub_id >= len(counts):
+            # Crece con margen para no extender el array con cada id nuevo.
+            counts.extend(array(counts.typecode, bytes(counts.itemsize * max(size - len(counts), len(counts) // 8))))
+        current = counts[sub_id]
+        if current == 0:
+            self.order.append(sub_id)
+        try:
+            counts[sub_id] = current + count
+        except OverflowError:
+            self._set(sub_id, current + count)
+
+    def items(self) -> Iterable[Tuple[int, int]]:
+        counts = self.counts
+        return ((sub_id, counts[sub_id]) for sub_id in self.order)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+
+class CompactCounts:
+    """
+    Conteos por grupo y por (grupo, subclave), por ejemplo tweets por fecha y por fecha y usuario,
+    con las claves internadas a ids enteros: cada string se guarda una sola vez aunque aparezca en
+    muchos grupos. Los totales son un array indexado por id de grupo y los conteos de cada grupo
+    un dict {id: conteo} que pasa a un array indexado por id cuando se vuelve denso. Los strings
+    solo se recuperan para los resultados del top.
+
+    Los grupos y las subclaves de cada grupo conservan el orden de primera aparición, por lo que
+    most_common desempata igual que Counter.
+    """
+
+    def __init__(self):
+        self.group_ids: Dict[str, int] = {}
+        self.groups: List[str] = []
+        self.sub_ids: Dict[str, int] = {}
+        self.subs: List[str] = []
+        self.totals = array('Q')
+        self.rows: List[Union[Dict[int, int], _DenseRow]] = []
+
+    def _group(self, key: str) -> int:
+        """
+        Devuelve el id del grupo, registrándolo si es nuevo.
+        """
+        group_id = self.group_ids.get(key)
+        if group_id is None:
+            group_id = self.group_ids[key] = len(self.groups)
+            self.groups.append(key)
+            self.totals.append(0)
+            self.rows.append({})
+        return group_id
+
+    def _sub(self, key: str) -> int:
+        """
+        Devuelve el id de la subclave, registrándola si es nueva.
+        """
+        sub_id = self.sub_ids.get(key)
+        if sub_id is None:
+            sub_id = self.sub_ids[key] = len(self.subs)
+            self.subs.append(key)
+        return sub_id
+
+    def _add_sub(self, group_id: int, sub_id: int, count: int) -> None:
+        """
+        Suma count a la subclave dentro del grupo, pasando el grupo a arrays si se volvió denso.
+        """
+        row = self.rows[group_id]
+        if type(row) is dict:
+            row[sub_id] = row.get(sub_id, 0) + count
+            if len(row) >= DENSE_MIN and len(row) * DENSE_RATIO >= len(self.subs):
+                self.rows[group_id] = _DenseRow(row, len(self.subs))
+        else:
+            row.add(sub_id, count, len(self.subs))
+
+    def update(self, keys: Iterable[str], sub_keys: Iterable[str]) -> None:
+        """
+        Cuenta un elemento (por ejemplo un tweet) en cada grupo de keys y, dentro de cada uno, cada
+        subclave de sub_keys.
+        """
+        known = self.sub_ids
+        sub_ids = [known[key] if key in known else self._sub(key) for key in sub_keys]
+        for key in keys:
+            group_id = self.group_ids.get(key)
+            if group_id is None:
+                group_id = self._group(key)
+            self.totals[group_id] += 1
+            row = self.rows[group_id]
+            for sub_id in sub_ids:
+                if type(row) is dict:
+                    self._add_sub(group_id, sub_id, 1)
+                    row = self.rows[group_id]
+                else:
+                    row.add(sub_id, 1, len(self.subs))
+
+    def merge(self, other: 'CompactCounts') -> None:
+        """
+        Suma los conteos de otro CompactCounts (con sus propios ids), en el orden de primera
+        aparición del otro.
+        """
+        sub_ids = [self._sub(key) for key in other.subs]
+        for other_id, key in enumerate(other.groups):
+            group_id = self._group(key)
+            self.totals[group_id] += other.totals[other_id]
+            for other_sub, count in other.rows[other_id].items():
+                self._add_sub(group_id, sub_ids[other_sub], count)
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        """
+        Los n grupos con más elementos, con su conteo (heap de n elementos; desempata por orden de
+        primera aparición).
+        """
+        top = heapq.nlargest(n, range(len(self.groups)), key=self.totals.__getitem__)
+        return [(self.groups[group_id], self.totals[group_id]) for group_id in top]
+
+    def sub_most_common(self, key: str, n: int) -> List[Tuple[str, int]]:
+        """
+        Las n subclaves más frecuentes dentro del grupo, con su conteo.
+        """
+        top = heapq.nlargest(n, self.rows[self.group_ids[key]].items(), key=lambda item: item[1])
+        return [(self.subs[sub_id], count) for sub_id, count in top]
@@ -0,0 +1,142 @@
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from datetime import date
+import json
+import os
+import sys
+from engine import extract_date
+from projection import loads_projected
+
+# El índice se guarda junto a los datos: <archivo>.dateidx (JSON).
+INDEX_SUFFIX = '.dateidx'
+INDEX_VERSION = 1
+
+DateLike = Union[str, date]
+
+
+def index_path(file_path: str) -> str:
+    """
+    Devuelve la ruta del índice por fecha asociado al archivo.
+    """
+    return file_path + INDEX_SUFFIX
+
+
+def _source_signature(file_path: str) -> Dict[str, int]:
+    """
+    Tamaño y fecha de modificación del archivo original, usados para invalidar el índice.
+    """
+    stat = os.stat(file_path)
+    return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+
+def build_index(file_path: str) -> Dict[str, List[List[int]]]:
+    """
+    Recorre el archivo una vez y registra, por cada fecha (YYYY-MM-DD del campo 'date'), los rangos
+    de bytes [inicio, fin) de sus líneas. Las líneas consecutivas de una misma fecha forman un único
+    rango. Las líneas sin fecha legible no se indexan, ya que no pertenecen a ninguna fecha.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets.
+
+    Returns:
+        Dict[str, List[List[int]]]: Los rangos de cada fecha, en el orden del archivo.
+    """
+    signature = _source_signature(file_path)
+    dates: Dict[str, List[List[int]]] = {}
+    previous, offset = None, 0
+
+    with open(file_path, 'rb') as f:
+        for line in f:
+            try:
+                day = extract_date(loads_projected(line, ['date']))[0]
+            except (ValueError, KeyError, TypeError, AttributeError):
+                day = None
+
+            if day is not None:
+                if day == previous:
+                    dates[day][-1][1] = offset + len(line)
+                else:
+                    dates.setdefault(day, []).append([offset, offset + len(line)])
+            previous = day
+            offset += len(line)
+
+    # Se escribe a un archivo temporal y se reemplaza al final para no dejar índices a medio escribir.
+    target = index_path(file_path)
+    with open(target + '.tmp', 'w', encoding='utf-8') as out:
+        json.dump({'version': INDEX_VERSION, **signature, 'dates': dates}, out)
+    os.replace(target + '.tmp', target)
+    return dates
+
+
+def load_index(file_path: str) -> Dict[str, List[List[int]]]:
+    """
+    Devuelve el índice por fecha del archivo, generándolo si no existe o si el archivo cambió de
+    tamaño o de fecha de modificación.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets.
+
+    Returns:
+        Dict[str, List[List[int]]]: Los rangos de bytes [inicio, fin) de cada fecha.
+    """
+    try:
+        with open(index_path(file_path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return build_index(file_path)
+
+    signature = _source_signature(file_path)
+    if index.get('version') != INDEX_VERSION or any(index.get(key) != value for key, value in signature.items()):
+        return build_index(file_path)
+    return index['dates']
+
+
+def date_ranges(file_path: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> List[Tuple[int, int]]:
+    """
+    Devuelve los rangos de bytes de las líneas con fecha entre start y end (ambas inclusive; None
+    deja el extremo abierto), ordenados por posición para recorrerlos en el orden del archivo. Los
+    rangos contiguos se unen para reducir la cantidad de saltos.
+    """
+    start = str(start) if start is not None else None
+    end = str(end) if end is not None else None
+    merged: List[Tuple[int, int]] = []
+    for first, last in sorted(
+        (first, last)
+        for day, day_ranges in load_index(file_path).items()
+        if (start is None or day >= start) and (end is None or day <= end)
+        for first, last in day_ranges
+    ):
+        if merged and merged[-1][1] == first:
+            merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def iter_date_lines(file_path: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> Iterator[bytes]:
+    """
+    Itera, en el orden del archivo, solo las líneas cuya fecha está entre start y end (inclusive),
+    saltando directamente a sus rangos de bytes en lugar de recorrer el archivo completo.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets.
+        start (Optional[DateLike]): Primera fecha (YYYY-MM-DD o datetime.date); None para no acotar.
+        end (Optional[DateLike]): Última fecha (YYYY-MM-DD o datetime.date); None para no acotar.
+
+    Returns:
+        Iterator[bytes]: Las líneas NDJSON de esas fechas.
+    """
+    ranges = date_ranges(file_path, start, end)
+    with open(file_path, 'rb') as f:
+        for first, last in ranges:
+            f.seek(first)
+            # Los rangos terminan en un fin de línea, por lo que se leen líneas completas.
+            for line in iter(f.readline, b''):
+                yield line
+                first += len(line)
+                if first >= last:
+                    break
+
+
+if __name__ == "__main__":
+    # Uso: python date_index.py farmers-protest-tweets-2021-2-4.json
+    print({day: len(ranges) for day, ranges in build_index(sys.argv[1]).items()})
@@ -0,0 +1,148 @@
+from typing import Dict, Iterator, List
+import re
+from emoji import EMOJI_DATA
+from emoji.unicode_codes import STATUS
+
+_ZWJ = '\u200D'
+
+# Marca de fin de emoji dentro del árbol; None nunca coincide con un carácter del texto.
+_END = None
+
+
+def _build_tree() -> Dict:
+    """
+    Construye el árbol de búsqueda por codepoint a partir de la base de emojis.
+    """
+    tree = {}
+    for emj in EMOJI_DATA:
+        sub_tree = tree
+        for char in emj:
+            sub_tree = sub_tree.setdefault(char, {})
+        sub_tree[_END] = True
+    return tree
+
+
+_TREE = _build_tree()
+_COMPONENTS = frozenset(emj for emj, data in EMOJI_DATA.items() if data['status'] == STATUS['component'])
+
+
+def _char_class(chars: str) -> str:
+    """
+    Arma una clase de caracteres agrupando codepoints consecutivos en rangos, ya que re recorre
+    de forma lineal los caracteres sueltos fuera del plano básico.
+    """
+    ranges = []
+    for codepoint in sorted({ord(char) for char in chars}):
+        if ranges and ranges[-1][1] == codepoint - 1:
+            ranges[-1][1] = codepoint
+        else:
+            ranges.append([codepoint, codepoint])
+    return '[%s]' % ''.join(
+        re.escape(chr(first)) if first == last else '%s-%s' % (re.escape(chr(first)), re.escape(chr(last)))
+        for first, last in ranges
+    )
+
+
+# Tramos máximos de caracteres que aparecen en algún emoji. Un carácter fuera de este conjunto
+# corta cualquier coincidencia, así que cada tramo se puede analizar de forma independiente.
+_RUN = re.compile(_char_class(''.join(EMOJI_DATA)) + '+')
+
+
+def _match_run(run: str) -> List[str]:
+    """
+    Encuentra los emojis de un tramo replicando el recorrido de emoji.tokenizer.tokenize
+    (keep_zwj=False): avance codicioso por el árbol sin retroceso y reanálisis de las
+    secuencias ZWJ que no son RGI, para que el resultado coincida exactamente con emoji_list.
+    """
+    emojis = []
+    # Tokens pendientes (caracteres, es_emoji); se vuelcan al llegar a un carácter sin coincidencia.
+    pending = []
+    ignore = set()
+    length = len(run)
+    i = 0
+
+    while i < length:
+        char = run[i]
+        consumed = False
+
+        if i in ignore:
+            i += 1
+            continue
+
+        elif char in _TREE:
+            j = i + 1
+            sub_tree = _TREE[char]
+            while j < length and run[j] in sub_tree:
+                if j in ignore:
+                    break
+                sub_tree = sub_tree[run[j]]
+                j += 1
+            if _END in sub_tree:
+                pending.append((run[i:j], True))
+                i = j - 1
+                consumed = True
+
+        elif char == _ZWJ and pending and pending[-1][0] in EMOJI_DATA and i > 0 and run[i - 1] in _TREE:
+            # ZWJ después de un emoji: se ignora el ZWJ y se vuelve a analizar desde el emoji anterior.
+            ignore.add(i)
+            if pending[-1][0] in _COMPONENTS:
+                i -= sum(len(chars) for chars, _ in pending[-2:])
+                if run[i] == _ZWJ:
+                    i += 1
+                    del pending[-1]
+                else:
+                    del pending[-2:]
+            else:
+                i -= len(pending[-1][0])
+                del pending[-1]
+            continue
+
+        elif pending:
+            emojis.extend(chars for chars, is_emoji in pending if is_emoji)
+            pending = []
+
+        if not consumed and char != '\uFE0E' and char != '\uFE0F':
+            pending.append((char, False))
+        i += 1
+
+    emojis.extend(chars for chars, is_emoji in pending if is_emoji)
+    return emojis
+
+
+def iter_emojis(text: str) -> Iterator[str]:
+    """
+    Recorre los emojis de un texto en orden, con el mismo resultado que
+    [e['emoji'] for e in emoji_list(text)] pero sin construir posiciones ni diccionarios.
+
+    Args:
+        text (str): El texto del cual extraer los emojis.
+
+    Returns:
+        Iterator[str]: Los emojis encontrados, incluidas secuencias ZWJ y modificadores de tono de piel.
+    """
+    # Ningún emoji está formado solo por caracteres ASCII.
+    if text.isascii():
+        return
+
+    for run in _RUN.findall(text):
+        if run in EMOJI_DATA:
+            # Caso más común: el tramo es un único emoji completo.
+            yield run
+        elif not run.isascii():
+            # Los dígitos, '#' y '*' solos nunca forman un emoji.
+            yield from _match_run(run)
+
+
+def extract_emojis(text: str) -> List[str]:
+    """
+    Extrae todos los emojis de un texto.
+
+    Args:
+        text (str): El texto del cual extraer los emojis.
+
+    Returns:
+        List[str]: Una lista de emojis encontrados en el texto.
+    """
+    if text.isascii():
+        return []
+    return list(iter_emojis(text))
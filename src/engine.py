@@ -0,0 +1,526 @@
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from datetime import datetime
+from functools import partial
+from itertools import chain
+from collections import Counter, defaultdict
+from bad_records import INVALID_JSON, MISSING_KEYS, BadRecords
+from compact import CompactCounts
+from json_backend import get_backend
+from projection import loads_projected
+from sketch import SpaceSaving
+
+
+def extract_date(tweet: dict) -> List[str]:
+    """
+    Obtiene la fecha (YYYY-MM-DD) en la que se publicó el tweet.
+    """
+    return [tweet['date'].split('T')[0]]
+
+
+def extract_username(tweet: dict) -> List[str]:
+    """
+    Obtiene el usuario que publicó el tweet.
+    """
+    return [tweet['user']['username']]
+
+
+# Se importa en el primer uso: la base de emojis tarda en cargarse y solo la necesita q2.
+_emoji_matcher = None
+
+
+def _load_emoji_matcher():
+    """
+    Importa el módulo de emojis la primera vez que se necesita.
+    """
+    global _emoji_matcher
+    import emoji_matcher as _emoji_matcher
+    return _emoji_matcher
+
+
+def extract_emojis(tweet: dict) -> List[str]:
+    """
+    Obtiene todos los emojis presentes en el contenido del tweet.
+    """
+    return (_emoji_matcher or _load_emoji_matcher()).extract_emojis(tweet['content'])
+
+
+def extract_mentions(tweet: dict) -> List[str]:
+    """
+    Obtiene los usuarios mencionados en el tweet (lista vacía si no hay menciones).
+    """
+    return [user['username'] for user in tweet.get('mentionedUsers') or []]
+
+
+# Campos por los que se puede agrupar. Cada extractor devuelve la lista de claves que aporta un tweet.
+FIELDS: Dict[str, Callable[[dict], List[str]]] = {
+    'date': extract_date,
+    'username': extract_username,
+    'emoji': extract_emojis,
+    'mention': extract_mentions,
+}
+
+
+# Clave del tweet de la que depende cada campo; permite leer solo lo necesario de fuentes proyectadas.
+SOURCE_KEYS: Dict[str, str] = {
+    'date': 'date',
+    'username': 'user',
+    'emoji': 'content',
+    'mention': 'mentionedUsers',
+}
+
+
+class AggregationSpec(NamedTuple):
+    """
+    Describe una agregación top-k que el motor resuelve durante el recorrido del archivo.
+
+    Attributes:
+        group_by (str): Campo por el que se agrupa (una de las claves de FIELDS).
+        sub_group (Optional[str]): Campo secundario contado dentro de cada grupo.
+        top_k (int): Cantidad de grupos a devolver.
+        sub_top_k (int): Cantidad de subgrupos a devolver por cada grupo.
+        capacity (Optional[int]): Si se indica, el conteo es aproximado con memoria acotada a esa
+            cantidad de contadores (ver sketch.py). Solo para agregaciones sin subgrupo.
+        compact (bool): Si es True los conteos por grupo y subgrupo se guardan con las claves
+            internadas a ids enteros y en arrays (ver compact.py); el resultado es el mismo con
+            menos memoria. Solo para agregaciones con subgrupo.
+        vectorized (bool): Si es True las claves se convierten a ids enteros y se cuentan por lotes
+            con NumPy (ver vectorized.py); el resultado es el mismo. No admite capacity ni compact.
+    """
+    group_by: str
+    sub_group: Optional[str] = None
+    top_k: int = 10
+    sub_top_k: int = 1
+    capacity: Optional[int] = None
+    compact: bool = False
+    vectorized: bool = False
+
+
+class Aggregator:
+    """
+    Acumula los conteos de una AggregationSpec a medida que recibe tweets.
+    """
+
+    def __init__(self, spec: AggregationSpec):
+        if spec.group_by not in FIELDS or (spec.sub_group is not None and spec.sub_group not in FIELDS):
+            raise ValueError(f"Campo de agregación no soportado: {spec}")
+        if spec.capacity is not None and spec.sub_group is not None:
+            raise ValueError(f"El conteo aproximado no admite subgrupos: {spec}")
+        if spec.compact and spec.sub_group is None:
+            raise ValueError(f"El conteo compacto requiere un subgrupo: {spec}")
+        if spec.vectorized and (spec.capacity is not None or spec.compact):
+            raise ValueError(f"El conteo vectorizado no admite capacity ni compact: {spec}")
+        self.spec = spec
+        self.group = FIELDS[spec.group_by]
+        self.sub_group = FIELDS[spec.sub_group] if spec.sub_group else None
+        self.totals = Counter() if spec.capacity is None else SpaceSaving(spec.capacity)
+        self.sub_counters = defaultdict(Counter)
+        self.compact = CompactCounts() if spec.compact else None
+        self.vector = None
+        if spec.vectorized:
+            from vectorized import VectorCounts
+            self.vector = VectorCounts(sub_keys=spec.sub_group is not None)
+
+    def add(self, tweet: dict) -> None:
+        """
+        Incorpora un tweet al conteo. Las claves se extraen antes de contar para que un
+        KeyError no deje el tweet contado a medias.
+        """
+        keys = self.group(tweet)
+        if self.sub_group is None:
+            if self.vector is not None:
+                self.vector.update(keys)
+                return
+            self.totals.update(keys)
+            return
+
+        sub_keys = self.sub_group(tweet)
+        if self.vector is not None:
+            self.vector.update(keys, sub_keys)
+            return
+        if self.compact is not None:
+            self.compact.update(keys, sub_keys)
+            return
+        for key in keys:
+            self.totals[key] += 1
+            self.sub_counters[key].update(sub_keys)
+
+    def _engine(self) -> Tuple[str, Optional[str], Optional[int], bool, bool]:
+        # Campos y modo de conteo efectivos: los estados de dos agregadores solo se mezclan si coinciden.
+        return (self.spec.group_by, self.spec.sub_group, self.spec.capacity, self.compact is not None, self.vector is not None)
+
+    def merge(self, other: 'Aggregator') -> None:
+        """
+        Suma los conteos parciales de otro agregador de la misma especificación. Los conteos
+        parciales deben mezclarse en el orden del archivo para conservar los desempates de
+        most_common (primera aparición).
+
+        Raises:
+            ValueError: Si los agregadores agrupan otros campos o usan otro modo de conteo.
+        """
+        if self._engine() != other._engine():
+            raise ValueError(f"No se pueden mezclar agregadores de distinto tipo: {self.spec} y {other.spec}")
+        if self.spec.capacity is not None:
+            self.totals.merge(other.totals)
+            return
+        if self.compact is not None:
+            self.compact.merge(other.compact)
+            return
+        if self.vector is not None:
+            self.vector.merge(other.vector)
+            return
+        self.totals.update(other.totals)
+        for key, counter in other.sub_counters.items():
+            self.sub_counters[key].update(counter)
+
+    def result(self) -> List[Any]:
+        """
+        Devuelve el top-k de la agregación.
+
+        Returns:
+            List[Any]: Tuplas (clave, conteo) si no hay subgrupo, o (clave, conteo, top de subgrupos)
+            donde el top de subgrupos es una lista de tuplas (subclave, conteo). En el conteo
+            aproximado las tuplas son (clave, conteo estimado, error máximo): el conteo real está
+            entre conteo - error y conteo.
+        """
+        if self.compact is not None:
+            return [(key, count, self.compact.sub_most_common(key, self.spec.sub_top_k))
+                    for key, count in self.compact.most_common(self.spec.top_k)]
+        if self.vector is not None:
+            top = self.vector.most_common(self.spec.top_k)
+            if self.sub_group is None:
+                return top
+            return [(key, count, self.vector.sub_most_common(key, self.spec.sub_top_k)) for key, count in top]
+        top = self.totals.most_common(self.spec.top_k)
+        if self.spec.capacity is not None:
+            return [(key, count, self.totals.error(key)) for key, count in top]
+        if self.sub_group is None:
+            return top
+        return [(key, count, self.sub_counters[key].most_common(self.spec.sub_top_k)) for key, count in top]
+
+
+def parse_lines(lines: Iterable[bytes], keys: Optional[List[str]] = None, backend: Optional[str] = None,
+                errors: Optional[BadRecords] = None, start: Optional[int] = None) -> Iterable[dict]:
+    """
+    Decodifica cada línea NDJSON una única vez, omitiendo las que no son JSON válido. Acepta
+    líneas en bytes UTF-8 (lectura en modo binario) o en str.
+
+    Args:
+        lines (Iterable[bytes]): Líneas NDJSON, una por tweet.
+        keys (Optional[List[str]]): Claves de primer nivel a decodificar (ver projection.py). Si es
+            None, o si el backend decodifica más rápido la línea completa, se decodifica el tweet completo.
+        backend (Optional[str]): Parser de JSON a utilizar (ver json_backend.py). Por defecto, el
+            más rápido de los instalados.
+        errors (Optional[BadRecords]): Donde se cuentan las líneas descartadas (ver bad_records.py).
+        start (Optional[int]): Offset de la primera línea, si las líneas son consecutivas en el
+            archivo; con él se lleva el offset de cada línea para la muestra de errors.
+
+    Returns:
+        Iterable[dict]: Los tweets decodificados.
+    """
+    parser = get_backend(backend)
+    loads = partial(loads_projected, keys=keys) if keys is not None and parser.projectable else parser.loads
+    errors = errors if errors is not None else BadRecords()
+
+    if start is None:
+        # Sin offsets: la muestra no debe tomar la posición de una lectura anterior.
+        errors.position = None
+        for line in lines:
+            try:
+                yield loads(line)
+            except ValueError:
+                # Incluye json.JSONDecodeError, los errores de los otros backends y el UTF-8 inválido.
+                errors.record(INVALID_JSON)
+        return
+
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    # Las líneas de un archivo abierto conservan el salto de línea; las de los otros lectores no.
+    newline = 0 if first.endswith(b'\n' if isinstance(first, bytes) else '\n') else 1
+    position = start
+    for line in chain((first,), lines):
+        errors.position = position
+        position += len(line) + newline
+        try:
+            yield loads(line)
+        except ValueError:
+            errors.record(INVALID_JSON)
+
+
+def aggregate(tweets: Iterable[dict], aggregators: List[Aggregator], errors: Optional[BadRecords] = None) -> List[Aggregator]:
+    """
+    Alimenta todos los agregadores con cada tweet en un único recorrido.
+
+    Args:
+        tweets (Iterable[dict]): Tweets ya decodificados.
+        aggregators (List[Aggregator]): Agregadores a alimentar.
+        errors (Optional[BadRecords]): Donde se cuentan los tweets sin las claves esperadas (una vez
+            por tweet aunque falle en varios agregadores).
+
+    Returns:
+        List[Aggregator]: Los mismos agregadores, ya actualizados.
+    """
+    errors = errors if errors is not None else BadRecords()
+    failed = None
+    for tweet in tweets:
+        for aggregator in aggregators:
+            try:
+                aggregator.add(tweet)
+            except (KeyError, TypeError, AttributeError):
+                if failed is not tweet:
+                    errors.record(MISSING_KEYS)
+                    failed = tweet
+    return aggregators
+
+
+def required_keys(specs: List[AggregationSpec]) -> List[str]:
+    """
+    Devuelve las claves del tweet que necesitan las agregaciones indicadas.
+    """
+    fields = {spec.group_by for spec in specs} | {spec.sub_group for spec in specs if spec.sub_group}
+    return [key for field, key in SOURCE_KEYS.items() if field in fields]
+
+
+def filter_dates(tweets: Iterable[dict], start: Optional[Any] = None, end: Optional[Any] = None,
+                 errors: Optional[BadRecords] = None) -> Iterable[dict]:
+    """
+    Deja pasar solo los tweets con fecha entre start y end (YYYY-MM-DD o datetime.date, ambas
+    inclusive; None deja el extremo abierto). Se usa en las fuentes que no tienen índice por fecha.
+    Los tweets sin fecha se cuentan en errors.
+    """
+    start = str(start) if start is not None else None
+    end = str(end) if end is not None else None
+    errors = errors if errors is not None else BadRecords()
+    for tweet in tweets:
+        try:
+            day = tweet['date'].split('T')[0]
+        except (KeyError, TypeError, AttributeError):
+            errors.record(MISSING_KEYS)
+            continue
+        if (start is None or day >= start) and (end is None or day <= end):
+            yield tweet
+
+
+def scan_lines(lines: Iterable[bytes], aggregators: List[Aggregator], projected: bool = True,
+               date_range: Optional[Tuple[Any, Any]] = None, backend: Optional[str] = None,
+               errors: Optional[BadRecords] = None, start: Optional[int] = None) -> List[Aggregator]:
+    """
+    Decodifica las líneas y alimenta los agregadores, filtrando por fecha si se indica date_range.
+    Los registros descartados se cuentan en errors (start es el offset de la primera línea, si se conoce).
+    """
+    keys = required_keys([aggregator.spec for aggregator in aggregators]) if projected else None
+    if keys is not None and date_range is not None and 'date' not in keys:
+        keys.append('date')
+    errors = errors if errors is not None else BadRecords()
+    tweets = parse_lines(lines, keys, backend, errors, start)
+    return aggregate(tweets if date_range is None else filter_dates(tweets, *date_range, errors=errors), aggregators, errors)
+
+
+def run_lines(lines: Iterable[bytes], specs: List[AggregationSpec], projected: bool = True,
+              date_range: Optional[Tuple[Any, Any]] = None, errors: Optional[BadRecords] = None,
+              start: Optional[int] = None) -> List[List[Any]]:
+    """
+    Resuelve todas las agregaciones sobre un iterable de líneas NDJSON en un único recorrido.
+
+    Args:
+        lines (Iterable[bytes]): Líneas NDJSON (bytes o str), una por tweet.
+        specs (List[AggregationSpec]): Agregaciones a calcular.
+        projected (bool): Si es True solo se decodifican las claves que usan las agregaciones.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive; solo se
+            agregan los tweets de esas fechas (ver filter_dates).
+        errors (Optional[BadRecords]): Donde se cuentan los registros descartados.
+        start (Optional[int]): Offset de la primera línea en el archivo, si se conoce.
+
+    Returns:
+        List[List[Any]]: El resultado de cada agregación, en el mismo orden que specs.
+    """
+    aggregators = scan_lines(lines, [Aggregator(spec) for spec in specs], projected, date_range, errors=errors, start=start)
+    return [aggregator.result() for aggregator in aggregators]
+
+
+def run_query(file_path: str, specs: List[AggregationSpec], workers: int = 1, projected: bool = True,
+              incremental: bool = False, date_range: Optional[Tuple[Any, Any]] = None, mapped: bool = False,
+              errors: Optional[BadRecords] = None) -> List[List[Any]]:
+    """
+    Resuelve todas las agregaciones leyendo el archivo una sola vez.
+
+    Archivos .gz, .zip y .zst se descomprimen al vuelo (ver compressed.py); con más de un proceso
+    se reparten los archivos de un zip o los frames de un zstd. En ese caso date_range se aplica
+    como filtro durante el recorrido y no se admite incremental.
+
+    Si file_path es un patrón glob (por ejemplo 'tweets/2021-02-*.json') se recorren todos los
+    archivos que coinciden, repartidos entre workers procesos, y se mezclan sus conteos (ver shards.py).
+
+    La caché columnar (ver columnar.py) nunca se genera desde aquí: se usa solo si antes se creó
+    explícitamente con columnar.build_cache o `python columnar.py <archivo>`, y desde entonces se
+    regenera sola si el archivo cambia. Las líneas descartadas de esa lectura, con sus offsets de
+    ejemplo, son las registradas al generar la caché.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets, o un patrón glob de varios archivos.
+        specs (List[AggregationSpec]): Agregaciones a calcular.
+        workers (int): Cantidad de procesos. Con más de uno el archivo se divide en rangos de bytes
+            que se procesan en paralelo (ver parallel.py). No aplica si el archivo tiene caché columnar
+            (ver columnar.py), que se lee siempre en un único proceso.
+        projected (bool): Si es True solo se decodifican las claves que usan las agregaciones.
+        incremental (bool): Si es True se retoman los conteos guardados en la ejecución anterior y
+            solo se leen las líneas agregadas desde entonces (ver checkpoint.py).
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, en formato
+            YYYY-MM-DD o datetime.date; None en un extremo lo deja abierto. Solo se leen los tweets de
+            esas fechas usando el índice por fecha del archivo (ver date_index.py). Con incremental,
+            workers o mapped, y en archivos comprimidos, se aplica como filtro durante el recorrido.
+            No usa la caché columnar.
+        mapped (bool): Si es True el recorrido completo (secuencial o por rangos de bytes) lee el
+            archivo mapeado en memoria y entrega cada línea al parser como slice de bytes (ver
+            mmap_reader.py).
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados (por
+            categoría y con offsets de ejemplo) para informarlos junto al resultado; al terminar se
+            imprime su total.
+
+    Returns:
+        List[List[Any]]: El resultado de cada agregación, en el mismo orden que specs.
+    """
+    errors = errors if errors is not None else BadRecords()
+    try:
+        from shards import is_pattern
+        if is_pattern(file_path):
+            if incremental:
+                raise ValueError("La ejecución incremental no admite varios archivos.")
+            from shards import run_sharded
+            return [aggregator.result() for aggregator in run_sharded(file_path, specs, workers, projected, date_range, mapped, errors=errors)]
+
+        from compressed import compression
+        if compression(file_path):
+            # El índice por fecha, los checkpoints y la caché columnar usan offsets del archivo sin comprimir.
+            if incremental:
+                raise ValueError("La ejecución incremental no admite archivos comprimidos.")
+            if workers > 1:
+                from parallel import run_parallel_compressed
+                return [aggregator.result() for aggregator in run_parallel_compressed(file_path, specs, workers, projected, date_range, errors)]
+            from compressed import iter_file_lines
+            # Los offsets de la muestra son posiciones en el contenido descomprimido.
+            return run_lines(iter_file_lines(file_path), specs, projected, date_range, errors, start=0)
+
+        if date_range is not None and not (incremental or mapped or workers > 1):
+            # El índice por fecha lee solo los rangos de bytes de esas fechas, en un único proceso.
+            # En los demás recorridos date_range se aplica como filtro.
+            from date_index import iter_date_lines
+            return run_lines(iter_date_lines(file_path, *date_range), specs, projected, errors=errors)
+
+        if incremental:
+            from checkpoint import run_incremental
+            return [aggregator.result() for aggregator in run_incremental(file_path, specs, projected, errors, date_range)]
+
+        from columnar import has_cache, iter_records
+        if date_range is None and has_cache(file_path):
+            # Existe una caché columnar del archivo: se lee de ella en lugar de decodificar el JSON.
+            aggregators = [Aggregator(spec) for spec in specs]
+            from vectorized import scan_cache, supports_cache
+            if all(spec.vectorized and supports_cache(spec) for spec in specs):
+                # Las agregaciones vectorizadas cuentan directamente las columnas de ids de la caché.
+                scan_cache(file_path, aggregators, errors)
+                return [aggregator.result() for aggregator in aggregators]
+            aggregate(iter_records(file_path, required_keys(specs), errors), aggregators, errors)
+            return [aggregator.result() for aggregator in aggregators]
+
+        if workers > 1:
+            from parallel import run_parallel
+            return [aggregator.result() for aggregator in run_parallel(file_path, specs, workers, projected, mapped, errors, date_range)]
+
+        if mapped:
+            from mmap_reader import iter_mapped_lines
+            return run_lines(iter_mapped_lines(file_path), specs, projected, date_range, errors, start=0)
+
+        # Se lee en modo binario: los parsers aceptan bytes UTF-8 y se evita decodificar cada línea a str.
+        with open(file_path, 'rb') as f:
+            return run_lines(f, specs, projected, errors=errors, start=0)
+    finally:
+        errors.log_summary()
+
+
+# Consultas del challenge expresadas como agregaciones del motor.
+Q1_SPEC = AggregationSpec(group_by='date', sub_group='username')
+Q2_SPEC = AggregationSpec(group_by='emoji')
+Q3_SPEC = AggregationSpec(group_by='mention')
+
+# Contadores del modo aproximado de q2 y q3: acota la memoria sin importar la cantidad de emojis o usuarios distintos.
+APPROX_CAPACITY = 10000
+
+
+def approximate_spec(spec: AggregationSpec, capacity: int = APPROX_CAPACITY) -> AggregationSpec:
+    """
+    Devuelve la versión aproximada (memoria acotada) de una agregación sin subgrupo.
+    """
+    return spec._replace(capacity=capacity)
+
+
+def compact_spec(spec: AggregationSpec) -> AggregationSpec:
+    """
+    Devuelve la versión compacta (claves internadas a ids enteros) de una agregación con subgrupo.
+    """
+    return spec._replace(compact=True)
+
+
+def vectorized_spec(spec: AggregationSpec) -> AggregationSpec:
+    """
+    Devuelve la versión vectorizada (conteo por lotes con NumPy) de una agregación exacta.
+    """
+    return spec._replace(vectorized=True)
+
+
+def top_spec(spec: AggregationSpec, k: int = 10, sub_k: Optional[int] = None) -> AggregationSpec:
+    """
+    Devuelve la agregación con otra cantidad de grupos (k) y, si se indica, de subgrupos por grupo.
+    La selección se hace con un heap de k elementos sobre los conteos acumulados (most_common), sin
+    ordenar todas las claves.
+    """
+    for name, value in (('k', k), ('sub_k', sub_k)):
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+            raise ValueError(f"{name} debe ser un entero positivo: {value!r}")
+    return spec._replace(top_k=k, sub_top_k=spec.sub_top_k if sub_k is None else sub_k)
+
+
+def format_q1(result: List[Any], counts: bool = False) -> List[Tuple[Any, ...]]:
+    """
+    Convierte el resultado de Q1_SPEC al formato de q1: (fecha, usuario con más tweets ese día), o
+    (fecha, [usuarios]) si se pidió más de un usuario por fecha.
+
+    Args:
+        result (List[Any]): Resultado de la agregación por fecha y usuario.
+        counts (bool): Si es True cada tupla es (fecha, tweets de la fecha, [(usuario, tweets), ...]).
+
+    Returns:
+        List[Tuple[Any, ...]]: Una tupla por fecha, de la de más tweets a la de menos.
+    """
+    formatted = []
+    for date, total, top_users in result:
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+        if counts:
+            formatted.append((day, total, top_users))
+        elif len(top_users) == 1:
+            formatted.append((day, top_users[0][0]))
+        else:
+            formatted.append((day, [user for user, _ in top_users]))
+    return formatted
+
+
+def run_all(file_path: str, workers: int = 1, incremental: bool = False,
+            date_range: Optional[Tuple[Any, Any]] = None, k: int = 10, errors: Optional[BadRecords] = None) -> Dict[str, List[Any]]:
+    """
+    Resuelve q1, q2 y q3 leyendo y decodificando el archivo una sola vez.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets.
+        workers (int): Cantidad de procesos a utilizar.
+        incremental (bool): Si es True solo se leen las líneas agregadas desde la ejecución anterior.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, a considerar.
+        k (int): Cantidad de fechas, emojis y usuarios a devolver en cada consulta.
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados.
+
+    Returns:
+        Dict[str, List[Any]]: El resultado de cada consulta con el mismo formato que q1, q2 y q3.
+    """
+    specs = [top_spec(spec, k) for spec in (Q1_SPEC, Q2_SPEC, Q3_SPEC)]
+    q1_result, q2_result, q3_result = run_query(file_path, specs, workers, incremental=incremental, date_range=date_range, errors=errors)
+    return {'q1': format_q1(q1_result), 'q2': q2_result, 'q3': q3_result}
@@ -0,0 +1,38 @@
+from typing import Iterator, Optional
+import mmap
+import os
+
+
+def iter_mapped_lines(file_path: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Recorre las líneas del archivo mapeándolo en memoria (mmap). Los saltos de línea se buscan
+    directamente en el mapeo y cada línea se entrega al parser como un slice de bytes, sin pasar por
+    el buffer de un objeto archivo ni decodificarla a str. Las páginas quedan en la caché del
+    sistema operativo, por lo que las ejecuciones repetidas (o los procesos que leen otros rangos
+    del mismo archivo) no vuelven a leer el disco.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets.
+        start (int): Offset de la primera línea a leer; debe ser el comienzo de una línea (ver
+            parallel.split_ranges).
+        end (Optional[int]): Se leen las líneas que comienzan antes de este offset (por defecto
+            hasta el final del archivo).
+
+    Returns:
+        Iterator[bytes]: Las líneas, sin el salto de línea final.
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            # No se puede mapear un archivo vacío.
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = size if end is None else min(end, size)
+            find = mapped.find
+            position = start
+            while position < end:
+                newline = find(b'\n', position)
+                if newline == -1:
+                    newline = size
+                yield mapped[position:newline]
+                position = newline + 1
@@ -0,0 +1,251 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from bad_records import BadRecords
+from compressed import compression, read_chunks, split_lines, zip_members, zstd_frames, zstd_module
+from engine import AggregationSpec, Aggregator, scan_lines
+from json_backend import get_backend
+from mmap_reader import iter_mapped_lines
+
+# Cantidad de rangos por proceso: rangos más chicos reparten mejor la carga entre procesos.
+RANGES_PER_WORKER = 4
+
+
+def split_ranges(file_path: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    Divide el archivo en rangos de bytes [inicio, fin) alineados a saltos de línea.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets.
+        parts (int): Cantidad de rangos deseada.
+
+    Returns:
+        List[Tuple[int, int]]: Rangos contiguos que cubren el archivo completo; ninguna línea queda partida.
+    """
+    size = os.path.getsize(file_path)
+    boundaries = [0]
+
+    with open(file_path, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts - 1, boundaries[-1]))
+            # Se avanza hasta el final de la línea en curso para no partirla.
+            f.readline()
+            boundary = min(f.tell(), size)
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def read_range(file_path: str, start: int, end: int) -> Iterator[bytes]:
+    """
+    Itera las líneas (en bytes) que comienzan dentro del rango [start, end).
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        for line in f:
+            yield line
+            remaining -= len(line)
+            if remaining <= 0:
+                break
+
+
+def scan_range(file_path: str, start: int, end: int, specs: List[AggregationSpec], projected: bool = True,
+               backend: str = None, mapped: bool = False,
+               date_range: Optional[Tuple[Any, Any]] = None) -> Tuple[List[Aggregator], BadRecords]:
+    """
+    Procesa un rango del archivo y devuelve los agregadores con los conteos parciales del rango y
+    los registros descartados. Con mapped=True el rango se lee del archivo mapeado en memoria (ver
+    mmap_reader.py); con date_range solo se cuentan los tweets de esas fechas.
+    """
+    aggregators = [Aggregator(spec) for spec in specs]
+    errors = BadRecords(log_interval=None)
+    # El parser acepta bytes UTF-8, por lo que no hace falta decodificar cada línea a str.
+    lines = iter_mapped_lines(file_path, start, end) if mapped else read_range(file_path, start, end)
+    scan_lines(lines, aggregators, projected, date_range, backend, errors, start)
+    return aggregators, errors
+
+
+def run_parallel(file_path: str, specs: List[AggregationSpec], workers: int = None, projected: bool = True,
+                 mapped: bool = False, errors: Optional[BadRecords] = None,
+                 date_range: Optional[Tuple[Any, Any]] = None) -> List[Aggregator]:
+    """
+    Resuelve las agregaciones repartiendo rangos de bytes del archivo entre varios procesos.
+
+    Cada proceso devuelve sus conteos parciales (totales por fecha, usuarios por fecha, emojis,
+    menciones) y el proceso principal los mezcla en el orden del archivo, por lo que el resultado
+    es idéntico al del recorrido secuencial.
+
+    Args:
+        file_path (str): La ruta al archivo JSON que contiene los tweets.
+        specs (List[AggregationSpec]): Agregaciones a calcular.
+        workers (int): Cantidad de procesos (por defecto, la cantidad de CPUs).
+        projected (bool): Si es True solo se decodifican las claves que usan las agregaciones.
+        mapped (bool): Si es True cada proceso lee su rango mapeando el archivo en memoria.
+        errors (Optional[BadRecords]): Si se indica, se le suman los registros descartados de cada rango.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive; cada proceso
+            filtra los tweets de su rango (ver engine.filter_dates).
+
+    Returns:
+        List[Aggregator]: Un agregador con los conteos totales por cada especificación.
+    """
+    workers = workers or os.cpu_count() or 1
+    ranges = split_ranges(file_path, workers * RANGES_PER_WORKER)
+    merged = [Aggregator(spec) for spec in specs]
+    # El backend elegido en este proceso se pasa explícitamente a los procesos hijos.
+    backend = get_backend().name
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(scan_range, file_path, start, end, specs, projected, backend, mapped, date_range) for start, end in ranges]
+        # Se mezcla en el orden de los rangos para conservar el orden de primera aparición.
+        for future in futures:
+            partials, range_errors = future.result()
+            for aggregator, partial in zip(merged, partials):
+                aggregator.merge(partial)
+            if errors is not None:
+                errors.merge(range_errors)
+
+    return merged
+
+
+def split_frames(file_path: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    Agrupa los frames consecutivos de un archivo zstd en hasta parts rangos de bytes [inicio, fin)
+    de tamaño similar. Cada rango se puede descomprimir por separado.
+    """
+    with open(file_path, 'rb') as f:
+        frames = zstd_frames(f)
+    target = os.path.getsize(file_path) / parts
+    ranges: List[Tuple[int, int]] = []
+    for start, end in frames:
+        if ranges and end - ranges[-1][0] <= target:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def _inner_lines(chunks: Iterable[bytes], edges: Dict[str, Optional[bytes]]) -> Iterator[bytes]:
+    """
+    Recorre las líneas completas de un rango descomprimido. Los frames no respetan los saltos de
+    línea, por lo que el texto anterior al primer salto ('head', None si no hay ninguno) y el
+    posterior al último ('tail') se guardan en edges para unirlos con los rangos vecinos.
+    """
+    edges['head'] = None
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        if lines and edges['head'] is None:
+            edges['head'] = lines.pop(0)
+        yield from lines
+    edges['tail'] = pending
+
+
+def scan_frames(file_path: str, start: int, end: int, specs: List[AggregationSpec], projected: bool = True,
+                backend: str = None, date_range: Optional[Tuple[Any, Any]] = None) -> Tuple[Optional[bytes], List[Aggregator], bytes, BadRecords]:
+    """
+    Descomprime un rango de frames zstd y devuelve el texto anterior al primer salto de línea (None
+    si el rango no tiene ninguno), los agregadores de las líneas completas, el texto posterior al
+    último salto de línea y los registros descartados (sin offsets: no se conoce la posición del
+    rango en el contenido descomprimido).
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    reader = zstd_module().ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True)
+
+    edges: Dict[str, Optional[bytes]] = {}
+    errors = BadRecords(log_interval=None)
+    aggregators = scan_lines(_inner_lines(read_chunks(reader), edges), [Aggregator(spec) for spec in specs],
+                             projected, date_range, backend, errors)
+    return edges['head'], aggregators, edges['tail'], errors
+
+
+def scan_member(file_path: str, name: str, specs: List[AggregationSpec], projected: bool = True,
+                backend: str = None, date_range: Optional[Tuple[Any, Any]] = None) -> Tuple[List[Aggregator], BadRecords]:
+    """
+    Descomprime un archivo de un zip y devuelve los agregadores con sus conteos parciales y los
+    registros descartados (con offsets dentro del archivo descomprimido).
+    """
+    errors = BadRecords(log_interval=None)
+    with zipfile.ZipFile(file_path) as archive, archive.open(name) as member:
+        aggregators = scan_lines(split_lines(read_chunks(member)), [Aggregator(spec) for spec in specs], projected,
+                                 date_range, backend, errors, start=0)
+    return aggregators, errors
+
+
+def run_parallel_compressed(file_path: str, specs: List[AggregationSpec], workers: int = None, projected: bool = True,
+                            date_range: Optional[Tuple[Any, Any]] = None, errors: Optional[BadRecords] = None) -> List[Aggregator]:
+    """
+    Resuelve las agregaciones sobre un archivo comprimido repartiendo entre procesos las partes que
+    se pueden descomprimir por separado: los archivos de un zip o los frames de un zstd. Un gzip (o
+    un zstd de un solo frame) se descomprime en un único flujo, porque sus miembros no indican su
+    tamaño y solo se pueden ubicar descomprimiendo.
+
+    Las partes se mezclan en el orden del archivo y las líneas partidas entre frames se unen antes
+    de contarlas, por lo que el resultado es idéntico al del recorrido secuencial.
+
+    Args:
+        file_path (str): La ruta al archivo .gz, .zip o .zst.
+        specs (List[AggregationSpec]): Agregaciones a calcular.
+        workers (int): Cantidad de procesos (por defecto, la cantidad de CPUs).
+        projected (bool): Si es True solo se decodifican las claves que usan las agregaciones.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, a considerar.
+        errors (Optional[BadRecords]): Si se indica, se le suman los registros descartados de cada parte.
+
+    Returns:
+        List[Aggregator]: Un agregador con los conteos totales por cada especificación.
+    """
+    from compressed import iter_file_lines
+
+    errors = errors if errors is not None else BadRecords()
+    workers = workers or os.cpu_count() or 1
+    kind = compression(file_path)
+    merged = [Aggregator(spec) for spec in specs]
+    backend = get_backend().name
+
+    if kind == 'zip':
+        with zipfile.ZipFile(file_path) as archive:
+            parts = [info.filename for info in zip_members(archive)]
+    elif kind == 'zstd':
+        parts = split_frames(file_path, workers * RANGES_PER_WORKER)
+    else:
+        parts = []
+    if len(parts) <= 1:
+        return scan_lines(iter_file_lines(file_path), merged, projected, date_range, backend, errors, start=0)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if kind == 'zip':
+            futures = [executor.submit(scan_member, file_path, name, specs, projected, backend, date_range) for name in parts]
+            for name, future in zip(parts, futures):
+                partials, member_errors = future.result()
+                for aggregator, partial in zip(merged, partials):
+                    aggregator.merge(partial)
+                errors.merge(member_errors, source=name)
+            return merged
+
+        futures = [executor.submit(scan_frames, file_path, start, end, specs, projected, backend, date_range)
+                   for start, end in parts]
+        # Texto de una línea que empezó en un rango anterior y todavía no terminó.
+        pending = b''
+        for future in futures:
+            head, partials, tail, range_errors = future.result()
+            errors.merge(range_errors)
+            if head is None:
+                pending += tail
+                continue
+            # La línea que cruza el borde se cuenta en su posición para conservar el orden de primera aparición.
+            scan_lines([pending + head], merged, projected, date_range, backend, errors)
+            for aggregator, partial in zip(merged, partials):
+                aggregator.merge(partial)
+            pending = tail
+
+    if pending:
+        scan_lines([pending], merged, projected, date_range, backend, errors)
+    return merged
@@ -0,0 +1,191 @@
+from typing import Any, List, Tuple, Union
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+_USERNAME_FIRST = re.compile(r'\{\s*"username"\s*:\s*')
+# Clave sin escapes seguida de ':' (una clave con escapes corta el recorrido) y separador entre pares.
+_KEY = re.compile(r'\s*"([^"\\]*)"\s*:\s*')
+_COMMA = re.compile(r'\s*,')
+
+# Distancia máxima (en caracteres) entre una clave buscada desde el final y el cierre de la línea.
+_MAX_TAIL = 2048
+
+
+class _NotProjectable(Exception):
+    """
+    La línea no tiene la forma esperada y debe decodificarse completa.
+    """
+
+
+def _skip_whitespace(line: str, index: int) -> int:
+    """
+    Avanza index hasta el siguiente carácter que no sea espacio en blanco.
+    """
+    while index < len(line) and line[index] in _WHITESPACE:
+        index += 1
+    return index
+
+
+def _skip_string(line: str, index: int) -> int:
+    """
+    Devuelve la posición siguiente al string JSON que empieza en index, sin decodificarlo.
+    """
+    end = line.find('"', index + 1)
+    while end != -1:
+        if line[end - 1] != '\\':
+            return end + 1
+        # Una comilla precedida por una cantidad impar de barras está escapada.
+        backslashes = 1
+        while line[end - 1 - backslashes] == '\\':
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return end + 1
+        end = line.find('"', end + 1)
+    raise _NotProjectable()
+
+
+def _expect(line: str, index: int, char: str) -> int:
+    """
+    Verifica que en index (ignorando espacios) esté char y devuelve la posición siguiente.
+    """
+    index = _skip_whitespace(line, index)
+    if index >= len(line) or line[index] != char:
+        raise _NotProjectable()
+    return _skip_whitespace(line, index + 1)
+
+
+def _decode_value(line: str, key: str, start: int) -> Tuple[Any, int, bool]:
+    """
+    Decodifica el valor de una clave. Para 'user' solo se decodifica 'username' cuando es la
+    primera clave del objeto, evitando construir el resto del perfil.
+
+    Returns:
+        Tuple[Any, int, bool]: (valor, posición final, si el valor se recorrió completo).
+    """
+    if key == 'user':
+        match = _USERNAME_FIRST.match(line, start)
+        if match:
+            username, end = _decoder.raw_decode(line, match.end())
+            if isinstance(username, str):
+                return {'username': username}, end, False
+    value, end = _decoder.raw_decode(line, start)
+    return value, end, True
+
+
+def _leading_values(line: str, keys: set, tweet: dict) -> None:
+    """
+    Recorre en orden los pares clave-valor del primer nivel mientras los valores que no se piden
+    sean escalares, guardando en tweet las claves pedidas. Los strings que no se piden se saltan
+    sin decodificarlos, y el recorrido se detiene ante el primer objeto o lista que habría que
+    saltar (user, quotedTweet, ...), ya que saltarlo costaría decodificarlo.
+    """
+    position = 1
+    while keys:
+        match = _KEY.match(line, position)
+        if not match:
+            return
+        key, position = match.group(1), match.end()
+
+        if key in keys:
+            tweet[key], position, complete = _decode_value(line, key, position)
+            keys.discard(key)
+            if not complete:
+                return
+        elif line[position] == '"':
+            position = _skip_string(line, position)
+        elif line[position] in '{[':
+            return
+        else:
+            _, position = _decoder.raw_decode(line, position)
+
+        match = _COMMA.match(line, position)
+        if not match:
+            return
+        position = match.end()
+
+
+def _trailing_value(line: str, key: str, end_of_object: int) -> Tuple[bool, Any]:
+    """
+    Busca la clave entre las últimas del objeto principal (como 'mentionedUsers', que va después de
+    quotedTweet). Su última aparición se acepta si lo que sigue a su valor son pares del mismo nivel
+    hasta la '}' final de la línea; una aparición dentro de un tweet anidado choca antes con la '}'
+    que cierra ese tweet.
+
+    Returns:
+        Tuple[bool, Any]: (encontrada, valor).
+    """
+    token = '"%s"' % key
+    index = line.rfind(token)
+    if index == -1 or end_of_object - index > _MAX_TAIL:
+        return False, None
+
+    before = index - 1
+    while before >= 0 and line[before] in _WHITESPACE:
+        before -= 1
+    if before < 0 or line[before] not in '{,':
+        return False, None
+
+    value, position, complete = _decode_value(line, key, _expect(line, index + len(token), ':'))
+    if not complete:
+        return False, None
+
+    # Se recorren los pares restantes; la cota de largo evita recorrer medio tweet.
+    position = _skip_whitespace(line, position)
+    while position < end_of_object and line[position] == ',':
+        _, position = _decoder.raw_decode(line, _skip_whitespace(line, position + 1))
+        _, position = _decoder.raw_decode(line, _expect(line, position, ':'))
+        position = _skip_whitespace(line, position)
+    return position == end_of_object, value
+
+
+def loads_projected(line: Union[str, bytes], keys: List[str]) -> dict:
+    """
+    Decodifica de una línea NDJSON solo las claves de primer nivel indicadas.
+
+    Las claves se ubican recorriendo los primeros pares del objeto o entre sus últimos pares; así
+    nunca se toman las claves homónimas de los tweets anidados.
+    Si la línea no tiene la forma esperada (no empieza con '{' o no termina en '}', o alguna clave
+    no se puede ubicar con certeza) se decodifica completa con json.loads, por lo que ante líneas
+    inválidas se lanza el mismo json.JSONDecodeError. Las claves ubicadas no validan el resto de la línea.
+
+    Args:
+        line (Union[str, bytes]): Una línea NDJSON con un tweet.
+        keys (List[str]): Claves de primer nivel requeridas (por ejemplo 'date', 'user').
+
+    Returns:
+        dict: Un tweet con las claves pedidas (para 'user' puede contener solo 'username').
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8')
+
+    end = len(line)
+    while end and line[end - 1] in _WHITESPACE:
+        end -= 1
+
+    if line.startswith('{') and end and line[end - 1] == '}':
+        tweet = {}
+        pending = set(keys)
+        try:
+            # Las claves que aparecen recién después del primer objeto anidado se buscan primero desde
+            # el final, ya que el recorrido inicial se detiene en ese objeto.
+            first_nested = line.find('{', 1)
+            for key in keys:
+                if first_nested != -1 and line.find('"%s"' % key) > first_nested:
+                    found, value = _trailing_value(line, key, end - 1)
+                    if found:
+                        tweet[key] = value
+                        pending.discard(key)
+
+            _leading_values(line, pending, tweet)
+            for key in pending:
+                found, tweet[key] = _trailing_value(line, key, end - 1)
+                if not found:
+                    break
+            else:
+                return tweet
+        except (_NotProjectable, json.JSONDecodeError):
+            pass
+
+    return json.loads(line)
@@ -1,54 +1,32 @@
-from typing import List, Tuple
-from datetime import datetime
-import json
-from collections import Counter
-import cProfile
-import pstats
-from memory_profiler import memory_usage
+from typing import Any, List, Optional, Tuple
+from bad_records import BadRecords
+from engine import Q1_SPEC, compact_spec, format_q1, run_query, top_spec
 
-def q1_memory(file_path: str) -> List[Tuple[datetime.date, str]]:
+def q1_memory(file_path: str, workers: int = 1, incremental: bool = False, date_range: Optional[Tuple[Any, Any]] = None,
+              k: int = 10, top_users: int = 1, counts: bool = False,
+              errors: Optional[BadRecords] = None) -> List[Tuple[Any, ...]]:
     """
-    Encuentra las top 10 fechas con más tweets y menciona el usuario con más publicaciones en cada una de esas fechas.
+    Encuentra las top k fechas con más tweets y menciona el usuario con más publicaciones en cada una de esas fechas.
     
     Args:
         file_path (str): La ruta al archivo JSON que contiene los tweets.
+        workers (int): Cantidad de procesos; con más de uno el archivo se procesa en paralelo por rangos de bytes.
+        incremental (bool): Si es True solo se leen las líneas agregadas al archivo desde la ejecución anterior.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, en formato YYYY-MM-DD o datetime.date; solo se consideran los tweets de esas fechas.
+        k (int): Cantidad de fechas a devolver (10 por defecto).
+        top_users (int): Cantidad de usuarios a devolver por fecha.
+        counts (bool): Si es True se devuelven también los conteos: (fecha, tweets de la fecha, [(usuario, tweets), ...]).
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados (por categoría, con offsets de ejemplo) para informarlos junto al resultado.
     
     Returns:
-        List[Tuple[datetime.date, str]]: Una lista de tuplas, cada una con una fecha y el usuario que más tweets publicó en esa fecha.
+        List[Tuple[Any, ...]]: Una lista de tuplas, cada una con una fecha y el usuario que más tweets publicó en esa fecha (o, con counts, la cantidad de tweets de la fecha y de cada usuario).
     """
-    date_counter = Counter()
-    user_counter_per_date = {}
-
     try:
-        # Leer y procesar cada línea una vez
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    tweet = json.loads(line)
-                    tweet_date = tweet['date'].split('T')[0]
-                    username = tweet['user']['username']
-
-                    # Contar fechas
-                    date_counter[tweet_date] += 1
-
-                    # Contar usuarios por fecha
-                    if tweet_date not in user_counter_per_date:
-                        user_counter_per_date[tweet_date] = Counter()
-                    user_counter_per_date[tweet_date][username] += 1
-                except json.JSONDecodeError:
-                    print("Error: No se pudo decodificar una línea del archivo JSON.")
-                except KeyError:
-                    print("Error: Una línea del archivo JSON no contiene las claves esperadas.")
-
-        # Obtener las 10 fechas más comunes
-        most_common_dates = date_counter.most_common(10)
+        # Se resuelve la consulta con el motor de agregaciones en una sola lectura del archivo. Los
+        # conteos se guardan con ids enteros: cada usuario se guarda una sola vez aunque publique en muchas fechas.
+        result, = run_query(file_path, [compact_spec(top_spec(Q1_SPEC, k, top_users))], workers, incremental=incremental, date_range=date_range, errors=errors)
+        return format_q1(result, counts)
 
-        # Obtener el usuario más común por cada una de las fechas más comunes
-        most_common_users = [user_counter_per_date[date[0]].most_common(1)[0][0] for date in most_common_dates]
-
-        # Convertir las fechas a formato datetime.date y agrupar resultados
-        return list(zip([datetime.strptime(date[0], "%Y-%m-%d").date() for date in most_common_dates], most_common_users))
-    
     except FileNotFoundError:
         print(f"Error: El archivo '{file_path}' no se encontró.")
         return []
@@ -60,6 +38,11 @@ def main():
     """
     Función principal que ejecuta el análisis de los tweets, midiendo el tiempo de ejecución y el uso de memoria.
     """
+    # Los profilers solo se cargan al ejecutar este diagnóstico, no al importar la consulta.
+    import cProfile
+    import pstats
+    from memory_profiler import memory_usage
+
     file_path = 'farmers-protest-tweets-2021-2-4.json'
 
     # Medir el tiempo de ejecución con cProfile
@@ -1,52 +1,35 @@
-from typing import List, Tuple
-from datetime import datetime
-import json
-from collections import defaultdict, Counter
-import cProfile
-import pstats
-from memory_profiler import memory_usage
+from typing import Any, List, Optional, Tuple
+from bad_records import BadRecords
+from engine import Q1_SPEC, format_q1, run_query, top_spec, vectorized_spec
 
-def q1_time(file_path: str) -> List[Tuple[datetime.date, str]]:
+def q1_time(file_path: str, workers: int = 1, date_range: Optional[Tuple[Any, Any]] = None,
+            k: int = 10, top_users: int = 1, counts: bool = False, vectorized: bool = False,
+            errors: Optional[BadRecords] = None) -> List[Tuple[Any, ...]]:
     """
-    Encuentra las top 10 fechas con mas tweets y menciona el usuario con mas publicaciones en cada una de esas fechas.
+    Encuentra las top k fechas con mas tweets y menciona el usuario con mas publicaciones en cada una de esas fechas.
     
     Args:
         file_path (str): La ruta al archivo JSON que contiene los tweets.
+        workers (int): Cantidad de procesos; con mas de uno el archivo se procesa en paralelo por rangos de bytes.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, en formato YYYY-MM-DD o datetime.date; solo se consideran los tweets de esas fechas.
+        k (int): Cantidad de fechas a devolver (10 por defecto).
+        top_users (int): Cantidad de usuarios a devolver por fecha.
+        counts (bool): Si es True se devuelven también los conteos: (fecha, tweets de la fecha, [(usuario, tweets), ...]).
+        vectorized (bool): Si es True las fechas y los usuarios se convierten a ids enteros y se cuentan por lotes con NumPy (mismo resultado; requiere numpy).
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados (por categoría, con offsets de ejemplo) para informarlos junto al resultado.
     
     Returns:
-        List[Tuple[datetime.date, str]]: Una lista de tuplas, cada una con una fecha y el usuario que mas tweets publico en esa fecha.
+        List[Tuple[Any, ...]]: Una lista de tuplas, cada una con una fecha y el usuario que mas tweets publico en esa fecha (o, con counts, la cantidad de tweets de la fecha y de cada usuario).
     """
     try:
-        # Se usa un solo diccionario para mantener el conteo de tweets por usuario y fecha.
-        dates_dict = defaultdict(Counter)
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            # Se analiza linea por linea para optimizar el uso de memoria.
-            for line in f:
-                tweet = json.loads(line)
-                tweet_date = tweet['date'].split('T')[0]
-                username = tweet['user']['username']
-                
-                # Se actualiza el contador de tweets escritos por un usuario en un dia.
-                dates_dict[tweet_date][username] += 1
-        
-        # Se ordenan las fechas segun el numero de tweets que se publicaron ese dia.
-        top_dates = sorted(dates_dict.keys(), key=lambda x: sum(dates_dict[x].values()), reverse=True)[:10]
-        
-        # Se obtiene el usuario con mayor cantidad de tweets para cada fecha segun el numero registrado en el contador.
-        top_users = [max(dates_dict[date], key=dates_dict[date].get) for date in top_dates]
-        
-        # Se pasan todas las fechas a formato datetime.date()
-        top_dates = [datetime.strptime(date_str, "%Y-%m-%d").date() for date_str in top_dates]
-        
-        return list(zip(top_dates, top_users))
-    
+        # Se resuelve la consulta con el motor de agregaciones en una sola lectura del archivo.
+        spec = top_spec(Q1_SPEC, k, top_users)
+        result, = run_query(file_path, [vectorized_spec(spec) if vectorized else spec], workers, date_range=date_range, errors=errors)
+        return format_q1(result, counts)
+
     except FileNotFoundError:
         print(f"Error: El archivo '{file_path}' no se encontro.")
         return []
-    except json.JSONDecodeError:
-        print("Error: No se pudo decodificar el archivo JSON.")
-        return []
     except Exception as e:
         print(f"Error: {e}")
         return []
@@ -55,6 +38,11 @@ def main():
     """
     Funcion principal que ejecuta el analisis de los tweets, midiendo el tiempo de ejecucion y el uso de memoria.
     """
+    # Los profilers solo se cargan al ejecutar este diagnóstico, no al importar la consulta.
+    import cProfile
+    import pstats
+    from memory_profiler import memory_usage
+
     file_path = 'farmers-protest-tweets-2021-2-4.json'
 
     # Medir el tiempo de ejecucion con cProfile
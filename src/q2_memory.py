@@ -1,43 +1,29 @@
-from typing import List, Tuple
-import json
-from collections import Counter
-from emoji import emoji_list
-import cProfile
-import pstats
-from memory_profiler import memory_usage
+from typing import Any, List, Optional, Tuple
+from bad_records import BadRecords
+from engine import Q2_SPEC, approximate_spec, run_query, top_spec
 
-def q2_memory(file_path: str) -> List[Tuple[str, int]]:
+def q2_memory(file_path: str, workers: int = 1, incremental: bool = False, approximate: bool = False, date_range: Optional[Tuple[Any, Any]] = None, k: int = 10, errors: Optional[BadRecords] = None) -> List[Tuple[str, int]]:
     """
-    Encuentra los top 10 emojis más usados con su respectivo conteo.
+    Encuentra los top k emojis más usados con su respectivo conteo.
     
     Args:
         file_path (str): La ruta al archivo JSON que contiene los tweets.
+        workers (int): Cantidad de procesos; con más de uno el archivo se procesa en paralelo por rangos de bytes.
+        incremental (bool): Si es True solo se leen las líneas agregadas al archivo desde la ejecución anterior.
+        approximate (bool): Si es True el conteo es aproximado con memoria acotada y cada tupla agrega el error máximo del conteo.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, en formato YYYY-MM-DD o datetime.date; solo se consideran los tweets de esas fechas.
+        k (int): Cantidad de emojis a devolver (10 por defecto).
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados (por categoría, con offsets de ejemplo) para informarlos junto al resultado.
     
     Returns:
         List[Tuple[str, int]]: Una lista de tuplas, cada una con un emoji y el número de veces que fue usado.
     """
-    emoji_counter = Counter()
-    
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    tweet_content = json.loads(line)['content']
-                    
-                    # Se obtienen los emojis de la línea analizada
-                    tweet_emojis = [emoji['emoji'] for emoji in emoji_list(tweet_content)]
-                    
-                    # Se actualiza el contador externo con los emojis encontrados en esta línea.
-                    emoji_counter.update(tweet_emojis)
-                
-                except json.JSONDecodeError:
-                    print("Error: No se pudo decodificar una línea del archivo JSON.")
-                except KeyError:
-                    print("Error: Una línea del archivo JSON no contiene las claves esperadas.")
-        
-        # Se devuelven los 10 emojis más presentes en todo el archivo.
-        return emoji_counter.most_common(10)
-    
+        spec = top_spec(Q2_SPEC, k)
+        # Se resuelve la consulta con el motor de agregaciones en una sola lectura del archivo.
+        result, = run_query(file_path, [approximate_spec(spec) if approximate else spec], workers, incremental=incremental, date_range=date_range, errors=errors)
+        return result
+
     except FileNotFoundError:
         print(f"Error: El archivo '{file_path}' no se encontró.")
         return []
@@ -49,6 +35,11 @@ def main():
     """
     Función principal que ejecuta el análisis de los tweets, midiendo el tiempo de ejecución y el uso de memoria.
     """
+    # Los profilers solo se cargan al ejecutar este diagnóstico, no al importar la consulta.
+    import cProfile
+    import pstats
+    from memory_profiler import memory_usage
+
     file_path = 'farmers-protest-tweets-2021-2-4.json'
 
     # Medir el tiempo de ejecución con cProfile
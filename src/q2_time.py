@@ -1,10 +1,7 @@
-from typing import List, Tuple
-import json
-from collections import Counter
-from emoji import emoji_list
-import cProfile
-import pstats
-from memory_profiler import memory_usage
+from typing import Any, List, Optional, Tuple
+import emoji_matcher
+from bad_records import BadRecords
+from engine import Q2_SPEC, approximate_spec, run_query, top_spec
 
 def extract_emojis(text: str) -> List[str]:
     """
@@ -16,38 +13,29 @@ def extract_emojis(text: str) -> List[str]:
     Returns:
         List[str]: Una lista de emojis encontrados en el texto.
     """
-    return [emoji['emoji'] for emoji in emoji_list(text)]
+    return emoji_matcher.extract_emojis(text)
 
-def q2_time(file_path: str) -> List[Tuple[str, int]]:
+def q2_time(file_path: str, workers: int = 1, approximate: bool = False, date_range: Optional[Tuple[Any, Any]] = None, k: int = 10, errors: Optional[BadRecords] = None) -> List[Tuple[str, int]]:
     """
-    Encuentra los top 10 emojis más usados con su respectivo conteo.
+    Encuentra los top k emojis más usados con su respectivo conteo.
     
     Args:
         file_path (str): La ruta al archivo JSON que contiene los tweets.
+        workers (int): Cantidad de procesos; con más de uno el archivo se procesa en paralelo por rangos de bytes.
+        approximate (bool): Si es True el conteo es aproximado con memoria acotada y cada tupla agrega el error máximo del conteo.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, en formato YYYY-MM-DD o datetime.date; solo se consideran los tweets de esas fechas.
+        k (int): Cantidad de emojis a devolver (10 por defecto).
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados (por categoría, con offsets de ejemplo) para informarlos junto al resultado.
     
     Returns:
         List[Tuple[str, int]]: Una lista de tuplas, cada una con un emoji y el número de veces que fue usado.
     """
-    emoji_counter = Counter()
-    
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    tweet_content = json.loads(line)['content']
-                    
-                    # Extraer y contar los emojis directamente
-                    emojis = extract_emojis(tweet_content)
-                    emoji_counter.update(emojis)
-                
-                except json.JSONDecodeError:
-                    print("Error: No se pudo decodificar una línea del archivo JSON.")
-                except KeyError:
-                    print("Error: Una línea del archivo JSON no contiene las claves esperadas.")
-        
-        # Devolver los 10 emojis más comunes
-        return emoji_counter.most_common(10)
-    
+        spec = top_spec(Q2_SPEC, k)
+        # Se resuelve la consulta con el motor de agregaciones en una sola lectura del archivo.
+        result, = run_query(file_path, [approximate_spec(spec) if approximate else spec], workers, date_range=date_range, errors=errors)
+        return result
+
     except FileNotFoundError:
         print(f"Error: El archivo '{file_path}' no se encontró.")
         return []
@@ -59,6 +47,11 @@ def main():
     """
     Función principal que ejecuta el análisis de los tweets, midiendo el tiempo de ejecución y el uso de memoria.
     """
+    # Los profilers solo se cargan al ejecutar este diagnóstico, no al importar la consulta.
+    import cProfile
+    import pstats
+    from memory_profiler import memory_usage
+
     file_path = 'farmers-protest-tweets-2021-2-4.json'
 
     # Medir el tiempo de ejecución con cProfile
@@ -1,41 +1,31 @@
-from typing import List, Tuple
-import json
-from collections import Counter
-import cProfile
-import pstats
-from memory_profiler import memory_usage
+from typing import Any, List, Optional, Tuple
+from bad_records import BadRecords
+from engine import Q3_SPEC, approximate_spec, run_query, top_spec, vectorized_spec
 
-def q3_time(file_path: str) -> List[Tuple[str, int]]:
+def q3_time(file_path: str, workers: int = 1, approximate: bool = False, date_range: Optional[Tuple[Any, Any]] = None, k: int = 10, vectorized: bool = False, errors: Optional[BadRecords] = None) -> List[Tuple[str, int]]:
     """
-    Encuentra los top 10 usuarios más mencionados en los tweets.
+    Encuentra los top k usuarios más mencionados en los tweets.
     
     Args:
         file_path (str): La ruta al archivo JSON que contiene los tweets.
+        workers (int): Cantidad de procesos; con más de uno el archivo se procesa en paralelo por rangos de bytes.
+        approximate (bool): Si es True el conteo es aproximado con memoria acotada y cada tupla agrega el error máximo del conteo.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, en formato YYYY-MM-DD o datetime.date; solo se consideran los tweets de esas fechas.
+        k (int): Cantidad de usuarios a devolver (10 por defecto).
+        vectorized (bool): Si es True las menciones se convierten a ids enteros y se cuentan por lotes con NumPy (mismo resultado; requiere numpy). No admite approximate.
+        errors (Optional[BadRecords]): Si se indica, acumula los registros descartados (por categoría, con offsets de ejemplo) para informarlos junto al resultado.
     
     Returns:
         List[Tuple[str, int]]: Una lista de tuplas, cada una con un usuario y el número de veces que fue mencionado.
     """
-    users_counter = Counter()
-
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    mentioned_users = json.loads(line).get('mentionedUsers', [])
-                    
-                    if not mentioned_users:
-                        continue
-                    
-                    usernames = [user['username'] for user in mentioned_users]
-                    users_counter.update(usernames)
-                
-                except json.JSONDecodeError:
-                    print("Error: No se pudo decodificar una línea del archivo JSON.")
-                except KeyError:
-                    print("Error: Una línea del archivo JSON no contiene las claves esperadas.")
-        
-        return users_counter.most_common(10)
-    
+        spec = top_spec(Q3_SPEC, k)
+        if vectorized:
+            spec = vectorized_spec(spec)
+        # Se resuelve la consulta con el motor de agregaciones en una sola lectura del archivo.
+        result, = run_query(file_path, [approximate_spec(spec) if approximate else spec], workers, date_range=date_range, errors=errors)
+        return result
+
     except FileNotFoundError:
         print(f"Error: El archivo '{file_path}' no se encontró.")
         return []
@@ -47,6 +37,11 @@ def main():
     """
     Función principal que ejecuta el análisis de los tweets, midiendo el tiempo de ejecución y el uso de memoria.
     """
+    # Los profilers solo se cargan al ejecutar este diagnóstico, no al importar la consulta.
+    import cProfile
+    import pstats
+    from memory_profiler import memory_usage
+
     file_path = 'farmers-protest-tweets-2021-2-4.json'
 
     # Medir el tiempo de ejecución con cProfile
@@ -0,0 +1,139 @@
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+import glob
+import os
+from checkpoint import CHECKPOINT_SUFFIX
+from columnar import CACHE_SUFFIX
+from date_index import INDEX_SUFFIX
+from bad_records import BadRecords
+from engine import AggregationSpec, Aggregator, aggregate, required_keys, scan_lines
+from json_backend import get_backend
+
+# Archivos que las consultas guardan junto a cada shard; no son datos aunque coincidan con el patrón.
+SIDECAR_SUFFIXES = (CHECKPOINT_SUFFIX, CACHE_SUFFIX, INDEX_SUFFIX)
+
+# Tamaño máximo sumado de los shards que se procesan a la vez (un shard más grande se procesa solo).
+MAX_BYTES_IN_FLIGHT = 2 * 1024 * 1024 * 1024
+
+
+def is_pattern(file_path: str) -> bool:
+    """
+    Indica si la ruta es un patrón glob (por ejemplo 'tweets/2021-02-*.json') en lugar de un archivo.
+    """
+    return glob.has_magic(file_path)
+
+
+def list_shards(pattern: str) -> List[Tuple[str, int]]:
+    """
+    Devuelve los archivos que coinciden con el patrón, ordenados por nombre, con su tamaño.
+    """
+    shards = [
+        (path, os.path.getsize(path)) for path in sorted(glob.glob(pattern))
+        if os.path.isfile(path) and not path.endswith(SIDECAR_SUFFIXES)
+    ]
+    if not shards:
+        raise FileNotFoundError(pattern)
+    return shards
+
+
+def bounded_map(executor: Executor, fn: Callable[[str], Any], shards: Sequence[Tuple[str, int]],
+                max_workers: int, max_bytes: int = MAX_BYTES_IN_FLIGHT) -> Iterator[Any]:
+    """
+    Aplica fn a cada shard en el executor y entrega los resultados en el orden de los shards. A la
+    vez hay como máximo max_workers shards en curso y, entre todos, max_bytes bytes; un shard que
+    supera el límite por sí solo se procesa cuando no hay otro en curso.
+    """
+    pending = deque(shards)
+    in_flight = deque()
+    in_flight_bytes = 0
+    while pending or in_flight:
+        while pending and len(in_flight) < max_workers and (not in_flight or in_flight_bytes + pending[0][1] <= max_bytes):
+            path, size = pending.popleft()
+            in_flight.append((executor.submit(fn, path), size))
+            in_flight_bytes += size
+        future, size = in_flight.popleft()
+        in_flight_bytes -= size
+        yield future.result()
+
+
+def scan_shard(file_path: str, specs: List[AggregationSpec], projected: bool = True,
+               date_range: Optional[Tuple[Any, Any]] = None, backend: str = None,
+               mapped: bool = False) -> Tuple[List[Aggregator], BadRecords]:
+    """
+    Recorre un shard completo y devuelve los agregadores con sus conteos parciales y los registros
+    descartados. Cada shard se lee como en run_query: descomprimido al vuelo, por su índice por
+    fecha, desde su caché columnar o mapeado en memoria según corresponda.
+    """
+    from compressed import compression
+    aggregators = [Aggregator(spec) for spec in specs]
+    errors = BadRecords(log_interval=None)
+    if compression(file_path):
+        from compressed import iter_file_lines
+        return scan_lines(iter_file_lines(file_path), aggregators, projected, date_range, backend, errors, start=0), errors
+
+    if date_range is not None:
+        from date_index import iter_date_lines
+        return scan_lines(iter_date_lines(file_path, *date_range), aggregators, projected, backend=backend, errors=errors), errors
+
+    from columnar import has_cache, iter_records
+    if has_cache(file_path):
+        return aggregate(iter_records(file_path, required_keys(specs), errors), aggregators, errors), errors
+
+    if mapped:
+        from mmap_reader import iter_mapped_lines
+        return scan_lines(iter_mapped_lines(file_path), aggregators, projected, backend=backend, errors=errors, start=0), errors
+
+    with open(file_path, 'rb') as f:
+        return scan_lines(f, aggregators, projected, backend=backend, errors=errors, start=0), errors
+
+
+def run_sharded(pattern: str, specs: List[AggregationSpec], workers: int = 1, projected: bool = True,
+                date_range: Optional[Tuple[Any, Any]] = None, mapped: bool = False,
+                max_bytes: int = MAX_BYTES_IN_FLIGHT, errors: Optional[BadRecords] = None) -> List[Aggregator]:
+    """
+    Resuelve las agregaciones sobre todos los archivos que coinciden con un patrón glob (por ejemplo
+    un shard por día), como si fueran un único archivo con los shards concatenados en orden de nombre.
+
+    Con más de un proceso cada shard se procesa en un proceso y el proceso principal mezcla los
+    conteos parciales en el orden de los shards, por lo que el resultado es idéntico al del
+    recorrido secuencial.
+
+    Args:
+        pattern (str): Patrón glob de los archivos, por ejemplo 'tweets/2021-02-*.json.gz'.
+        specs (List[AggregationSpec]): Agregaciones a calcular.
+        workers (int): Cantidad máxima de shards procesados a la vez.
+        projected (bool): Si es True solo se decodifican las claves que usan las agregaciones.
+        date_range (Optional[Tuple[Any, Any]]): Fechas (inicio, fin), ambas inclusive, a considerar.
+        mapped (bool): Si es True los shards sin comprimir se leen mapeados en memoria.
+        max_bytes (int): Tamaño máximo sumado de los shards en proceso a la vez.
+        errors (Optional[BadRecords]): Si se indica, se le suman los registros descartados de cada
+            shard; los offsets de la muestra quedan como 'archivo:offset'.
+
+    Returns:
+        List[Aggregator]: Un agregador con los conteos totales por cada especificación.
+    """
+    shards = list_shards(pattern)
+    merged = [Aggregator(spec) for spec in specs]
+    # El backend elegido en este proceso se pasa explícitamente a los procesos hijos.
+    backend = get_backend().name
+
+    def merge(path: str, scanned: Tuple[List[Aggregator], BadRecords]) -> None:
+        partials, shard_errors = scanned
+        for aggregator, counts in zip(merged, partials):
+            aggregator.merge(counts)
+        if errors is not None:
+            errors.merge(shard_errors, source=path)
+
+    if workers <= 1 or len(shards) == 1:
+        for path, _ in shards:
+            merge(path, scan_shard(path, specs, projected, date_range, backend, mapped))
+        return merged
+
+    workers = min(workers, len(shards))
+    scan = partial(scan_shard, specs=specs, projected=projected, date_range=date_range, backend=backend, mapped=mapped)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for (path, _), scanned in zip(shards, bounded_map(executor, scan, shards, workers, max_bytes)):
+            merge(path, scanned)
+    return merged
@@ -0,0 +1,108 @@
+from typing import Dict, Hashable, Iterable, List, Tuple
+import heapq
+from operator import itemgetter
+
+
+class SpaceSaving:
+    """
+    Resumen Space-Saving (Metwally et al.) para encontrar los elementos más frecuentes de un flujo
+    con memoria acotada: guarda a lo sumo capacity contadores. Cuando llega un elemento nuevo y no
+    hay lugar, reemplaza al de menor conteo m y hereda ese conteo (m + 1), registrando m como su
+    error máximo.
+
+    Garantías: cada conteo estimado sobreestima el real en a lo sumo su error (real en
+    [conteo - error, conteo]), el error es como mucho N / capacity (N = elementos procesados) y todo
+    elemento con frecuencia real mayor que N / capacity está en el resumen. Mientras la cantidad
+    de elementos distintos no supere capacity los conteos son exactos.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"La capacidad debe ser positiva: {capacity}")
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # Min-heap de (conteo, clave); las entradas desactualizadas se corrigen al desalojar.
+        self._heap: List[Tuple[int, Hashable]] = []
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _pop_min(self) -> Tuple[int, Hashable]:
+        """
+        Quita del heap y devuelve el contador de menor conteo, corrigiendo las entradas desactualizadas.
+        """
+        while True:
+            count, key = heapq.heappop(self._heap)
+            current = self.counts[key]
+            if current == count:
+                return count, key
+            heapq.heappush(self._heap, (current, key))
+
+    def min_count(self) -> int:
+        """
+        Devuelve el menor conteo del resumen si está lleno (cota de la frecuencia de los ausentes), o 0.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        count, key = self._pop_min()
+        heapq.heappush(self._heap, (count, key))
+        return count
+
+    def update(self, keys: Iterable[Hashable]) -> None:
+        """
+        Cuenta una aparición de cada clave.
+        """
+        counts = self.counts
+        for key in keys:
+            if key in counts:
+                counts[key] += 1
+            elif len(counts) < self.capacity:
+                counts[key] = 1
+                self.errors[key] = 0
+                heapq.heappush(self._heap, (1, key))
+            else:
+                count, evicted = self._pop_min()
+                del counts[evicted], self.errors[evicted]
+                counts[key] = count + 1
+                self.errors[key] = count
+                heapq.heappush(self._heap, (count + 1, key))
+
+    def merge(self, other: 'SpaceSaving') -> None:
+        """
+        Suma otro resumen (Agarwal et al., "Mergeable Summaries"). Una clave ausente en uno de los
+        resúmenes recibe como conteo y error el mínimo de ese resumen, y luego se conservan los
+        capacity contadores mayores; las garantías se mantienen respecto del flujo combinado.
+        """
+        own_floor, other_floor = self.min_count(), other.min_count()
+        for key in self.counts:
+            if key not in other.counts:
+                self.counts[key] += other_floor
+                self.errors[key] += other_floor
+        for key, count in other.counts.items():
+            if key in self.counts:
+                self.counts[key] += count
+                self.errors[key] += other.errors[key]
+            else:
+                self.counts[key] = own_floor + count
+                self.errors[key] = own_floor + other.errors[key]
+
+        if len(self.counts) > self.capacity:
+            kept = {key for key, _ in self.most_common(self.capacity)}
+            self.counts = {key: count for key, count in self.counts.items() if key in kept}
+            self.errors = {key: self.errors[key] for key in self.counts}
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def error(self, key: Hashable) -> int:
+        """
+        Devuelve la sobreestimación máxima del conteo de la clave.
+        """
+        return self.errors[key]
+
+    def most_common(self, n: int) -> List[Tuple[Hashable, int]]:
+        """
+        Devuelve las n claves con mayor conteo estimado, con el mismo desempate que Counter.most_common
+        (orden de llegada al resumen).
+        """
+        return heapq.nlargest(n, self.counts.items(), key=itemgetter(1))
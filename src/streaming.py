@@ -0,0 +1,274 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from collections import Counter
+from datetime import datetime, timezone
+import argparse
+import contextlib
+import json
+import os
+import socket
+import sys
+from bad_records import LATE, MISSING_KEYS, BadRecords
+from engine import FIELDS, SOURCE_KEYS, parse_lines
+from sketch import SpaceSaving
+
+# Tops que se mantienen por ventana (nombre en el resultado y campo de engine.FIELDS): emojis,
+# usuarios mencionados y usuarios con más tweets.
+WINDOW_FIELDS: Dict[str, str] = {
+    'emojis': 'emoji',
+    'mentions': 'mention',
+    'users': 'username',
+}
+
+# Claves del tweet que se decodifican en el modo streaming.
+WINDOW_KEYS = ['date'] + [SOURCE_KEYS[field] for field in WINDOW_FIELDS.values()]
+
+
+def _isoformat(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+
+class WindowedTopK:
+    """
+    Top-k de emojis, menciones y usuarios por ventana de tiempo sobre un flujo de tweets, según la
+    fecha de cada tweet (no la de llegada). Las ventanas miden size segundos y avanzan de a slide
+    segundos: con slide igual a size son fijas (tumbling) y con slide menor se superponen (sliding).
+
+    El flujo se divide en paneles de slide segundos con sus propios conteos, y cada ventana es la
+    suma de size / slide paneles consecutivos. Los conteos de la ventana en curso se mantienen
+    sumados: al avanzar, se restan los del panel que sale y se suman los del que entra, sin volver a
+    recorrer los tweets. En memoria solo quedan los paneles de la ventana en curso y los adelantados
+    por la tolerancia de atraso, por lo que la memoria no crece con la duración del flujo.
+
+    Con capacity, cada panel cuenta con un resumen Space-Saving de a lo sumo capacity claves por
+    campo (ver sketch.py) y el top de la ventana se obtiene mezclando los resúmenes de sus paneles:
+    la memoria queda acotada también con muchas claves distintas por ventana, a cambio de conteos
+    aproximados.
+
+    Una ventana se cierra cuando la fecha más reciente recibida supera su fin en más de lateness
+    segundos; al cerrarse se entrega su resultado a on_window. Los tweets de paneles que ya
+    salieron de la ventana en curso se descartan como tardíos (ver bad_records.py).
+    """
+
+    def __init__(self, size: int, slide: Optional[int] = None, k: int = 10, lateness: int = 0,
+                 capacity: Optional[int] = None, on_window: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 errors: Optional[BadRecords] = None):
+        slide = slide or size
+        if size < 1 or slide < 1 or size % slide:
+            raise ValueError(f"size debe ser un múltiplo positivo de slide: {size}, {slide}")
+        if lateness < 0:
+            raise ValueError(f"lateness no puede ser negativo: {lateness}")
+        self.size = size
+        self.slide = slide
+        self.panes_per_window = size // slide
+        self.k = k
+        self.lateness = lateness
+        self.capacity = capacity
+        self.on_window = on_window
+        self.errors = errors if errors is not None else BadRecords()
+        # Conteos por panel (índice = segundos desde 1970 // slide): tweets y un contador por campo.
+        self.panes: Dict[int, Dict[str, Any]] = {}
+        # Conteos sumados de la ventana en curso (solo en el modo exacto).
+        self.window: Optional[Dict[str, Counter]] = {name: Counter() for name in WINDOW_FIELDS} if capacity is None else None
+        self.window_tweets = 0
+        # Último panel de la ventana en curso.
+        self.end: Optional[int] = None
+        self.latest: Optional[float] = None
+        self.closed = 0
+
+    def _new_pane(self) -> Dict[str, Any]:
+        pane = {name: Counter() if self.capacity is None else SpaceSaving(self.capacity) for name in WINDOW_FIELDS}
+        pane['tweets'] = 0
+        return pane
+
+    def add(self, tweet: dict) -> None:
+        """
+        Cuenta un tweet en su panel y, si el panel está dentro de la ventana en curso, en la ventana.
+        Las claves se extraen antes de contar para que un tweet incompleto no quede contado a medias.
+        """
+        try:
+            timestamp = datetime.fromisoformat(tweet['date']).timestamp()
+            keys = [(name, FIELDS[field](tweet)) for name, field in WINDOW_FIELDS.items()]
+        except (KeyError, TypeError, AttributeError, ValueError):
+            self.errors.record(MISSING_KEYS)
+            return
+
+        index = int(timestamp // self.slide)
+        if self.end is None:
+            # La primera ventana en curso es la que termina en la marca de agua del primer tweet.
+            self.end = int((timestamp - self.lateness) // self.slide)
+        if index <= self.end - self.panes_per_window:
+            self.errors.record(LATE)
+            return
+
+        pane = self.panes.get(index)
+        if pane is None:
+            pane = self.panes[index] = self._new_pane()
+        pane['tweets'] += 1
+        for name, values in keys:
+            pane[name].update(values)
+        if index <= self.end:
+            self.window_tweets += 1
+            if self.window is not None:
+                for name, values in keys:
+                    self.window[name].update(values)
+
+        if self.latest is None or timestamp > self.latest:
+            self.latest = timestamp
+            self._close_until(int((timestamp - self.lateness) // self.slide))
+
+    def _close_until(self, index: int) -> None:
+        """
+        Cierra las ventanas que terminan antes del panel index y deja en curso la que termina en él.
+        Las ventanas sin tweets se saltean sin recorrer sus paneles.
+        """
+        while self.end < index:
+            if self.window_tweets:
+                self._close()
+            self._expire(self.end - self.panes_per_window + 1)
+            self.end += 1
+            if not self.window_tweets and self.panes:
+                self.end = max(self.end, min(min(self.panes), index))
+            self._enter(self.end)
+
+    def _close(self) -> None:
+        self.closed += 1
+        if self.on_window is not None:
+            self.on_window(self.top())
+
+    def _expire(self, index: int) -> None:
+        """
+        Quita de la ventana los conteos del panel que sale y lo libera.
+        """
+        pane = self.panes.pop(index, None)
+        if pane is None:
+            return
+        self.window_tweets -= pane['tweets']
+        if self.window is None:
+            return
+        for name in WINDOW_FIELDS:
+            window = self.window[name]
+            for key, count in pane[name].items():
+                remaining = window[key] - count
+                if remaining:
+                    window[key] = remaining
+                else:
+                    # Las claves que quedan en cero se eliminan para que la memoria no crezca.
+                    del window[key]
+
+    def _enter(self, index: int) -> None:
+        """
+        Suma a la ventana los conteos del panel que entra (los tweets que llegaron adelantados).
+        """
+        pane = self.panes.get(index)
+        if pane is None:
+            return
+        self.window_tweets += pane['tweets']
+        if self.window is not None:
+            for name in WINDOW_FIELDS:
+                self.window[name].update(pane[name])
+
+    def top(self) -> Dict[str, Any]:
+        """
+        Devuelve el top-k de la ventana en curso.
+
+        Returns:
+            Dict[str, Any]: Inicio y fin de la ventana (ISO, UTC), cantidad de tweets y, por cada
+            campo de WINDOW_FIELDS, tuplas (clave, conteo), o (clave, conteo estimado, error máximo)
+            con capacity. Los empates se ordenan por llegada a la ventana.
+        """
+        if self.end is None:
+            return {'start': None, 'end': None, 'tweets': 0, **{name: [] for name in WINDOW_FIELDS}}
+        first = self.end - self.panes_per_window + 1
+        result = {'start': _isoformat(first * self.slide), 'end': _isoformat((self.end + 1) * self.slide),
+                  'tweets': self.window_tweets}
+        for name in WINDOW_FIELDS:
+            if self.window is not None:
+                result[name] = self.window[name].most_common(self.k)
+                continue
+            merged = SpaceSaving(self.capacity)
+            for index in range(first, self.end + 1):
+                if index in self.panes:
+                    merged.merge(self.panes[index][name])
+            result[name] = [(key, count, merged.error(key)) for key, count in merged.most_common(self.k)]
+        return result
+
+    def flush(self) -> None:
+        """
+        Cierra las ventanas pendientes al terminar el flujo, hasta la que incluye el último panel.
+        """
+        if self.end is None:
+            return
+        self._close_until(max(self.panes, default=self.end))
+        if self.window_tweets:
+            self._close()
+
+
+def consume(lines: Iterable[bytes], windows: WindowedTopK, backend: Optional[str] = None) -> WindowedTopK:
+    """
+    Decodifica las líneas NDJSON a medida que llegan (solo las claves que usan las ventanas) y
+    alimenta las ventanas. Las líneas inválidas se cuentan en windows.errors.
+    """
+    add = windows.add
+    for tweet in parse_lines(lines, WINDOW_KEYS, backend, errors=windows.errors):
+        add(tweet)
+    return windows
+
+
+def iter_socket_lines(address: str) -> Iterator[bytes]:
+    """
+    Escucha en un socket local y recorre las líneas de cada conexión, una conexión a la vez y sin
+    terminar (las ventanas se conservan entre conexiones). address es 'host:puerto' (TCP) o la ruta
+    de un socket Unix.
+    """
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        server = socket.create_server((host, int(port)))
+    else:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(address)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(address)
+        server.listen()
+    with server:
+        while True:
+            connection, _ = server.accept()
+            with connection, connection.makefile('rb') as stream:
+                yield from stream
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Punto de entrada de línea de comandos: lee tweets de stdin o de un socket e imprime en stdout el
+    resultado de cada ventana que se cierra, uno por línea en JSON. Los avisos de registros
+    descartados se imprimen en stderr.
+    """
+    parser = argparse.ArgumentParser(description="Top-k de emojis, menciones y usuarios por ventana de tiempo.")
+    parser.add_argument('--window', type=int, required=True, help="Duración de la ventana en segundos.")
+    parser.add_argument('--slide', type=int, help="Avance de la ventana en segundos (por defecto, ventanas fijas).")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--lateness', type=int, default=0, help="Segundos de atraso tolerados antes de cerrar una ventana.")
+    parser.add_argument('--capacity', type=int, help="Conteo aproximado con a lo sumo esta cantidad de claves por panel y campo.")
+    parser.add_argument('--socket', help="'host:puerto' o ruta de un socket Unix; por defecto se lee stdin.")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout
+
+    def emit(result: Dict[str, Any]) -> None:
+        out.write(json.dumps(result, ensure_ascii=False) + '\n')
+        out.flush()
+
+    windows = WindowedTopK(args.window, args.slide, args.k, args.lateness, args.capacity, on_window=emit)
+    lines = iter_socket_lines(args.socket) if args.socket else sys.stdin.buffer
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            consume(lines, windows)
+        except KeyboardInterrupt:
+            # Ctrl-C termina la lectura (un socket se escucha sin fin); se cierran las ventanas pendientes.
+            pass
+        windows.flush()
+        windows.errors.log_summary()
+
+
+if __name__ == "__main__":
+    # Uso: tail -f tweets.json | python streaming.py --window 3600 --slide 300 --lateness 600
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Las consultas y el motor son módulos planos de src/, como al ejecutarlos desde ese directorio. La
+# Cloud Function importa sus módulos como utils.*; se agrega al final para no tapar las consultas de src/.
+sys.path.insert(0, SRC)
+sys.path.append(os.path.join(SRC, 'cloud_function'))
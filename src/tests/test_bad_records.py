@@ -0,0 +1,54 @@
+from bad_records import INVALID_JSON, MISSING_KEYS, BadRecords
+from engine import Q1_SPEC, Q3_SPEC, run_query
+from parallel import scan_range, split_ranges
+
+SPECS = [Q1_SPEC, Q3_SPEC]
+
+
+def write_dirty(path, lines=400):
+    # Una línea inválida y una sin usuario cada cuatro: suficientes para que cada rango tenga varias.
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            if i % 4 == 1:
+                f.write('{"date": "2021-02-01T10:00:00+00:00", "user": \n')
+            elif i % 4 == 2:
+                f.write('{"date": "2021-02-01T10:00:00+00:00", "mentionedUsers": null}\n')
+            else:
+                f.write('{"date": "2021-02-%02dT10:00:00+00:00", "user": {"username": "u%d"}, "mentionedUsers": [{"username": "m%d"}]}\n'
+                        % (1 + i % 3, i % 7, i % 5))
+
+
+def warnings(output):
+    return [line for line in output.splitlines() if line.startswith('Error:')]
+
+
+def test_rate_limited_warnings(capsys):
+    errors = BadRecords(log_interval=60)
+    for _ in range(100):
+        errors.record(INVALID_JSON)
+    errors.merge(errors.copy(), source='otro.json')
+    assert len(warnings(capsys.readouterr().out)) == 1
+    assert errors.counts == {INVALID_JSON: 200}
+
+
+def test_worker_ranges_do_not_warn(tmp_path, capsys):
+    path = str(tmp_path / 'dirty.json')
+    write_dirty(path)
+    partials = [scan_range(path, start, end, SPECS)[1] for start, end in split_ranges(path, 8)]
+    assert len(partials) == 8 and all(partial.total for partial in partials)
+    assert warnings(capsys.readouterr().out) == []
+    # Solo el BadRecords de la consulta avisa, y con el límite de frecuencia.
+    merged = BadRecords(log_interval=60)
+    for partial in partials:
+        merged.merge(partial)
+    assert len(warnings(capsys.readouterr().out)) == 1
+    assert merged.counts == {INVALID_JSON: 100, MISSING_KEYS: 100}
+
+
+def test_parallel_counts_match_serial(tmp_path):
+    path = str(tmp_path / 'dirty.json')
+    write_dirty(path)
+    serial, parallel = BadRecords(), BadRecords()
+    assert run_query(path, SPECS, errors=serial) == run_query(path, SPECS, workers=4, errors=parallel)
+    assert serial.counts == parallel.counts == {INVALID_JSON: 100, MISSING_KEYS: 100}
+    assert serial.samples == parallel.samples
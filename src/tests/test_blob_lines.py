@@ -0,0 +1,53 @@
+import pytest
+
+from utils.utils import iter_blob_lines
+
+
+class RangeBlob:
+    """
+    Blob en memoria que solo admite lecturas por rango y registra los rangos pedidos.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.size = len(data)
+        self.requests = []
+
+    def download_as_bytes(self, start: int, end: int) -> bytes:
+        self.requests.append((start, end))
+        return self.data[start:end + 1]
+
+
+TWEETS = [
+    '{"content": "Farmers protest 🚜", "user": {"username": "ana"}}',
+    '{"content": "ñandú 🙏🏽 tilde", "user": {"username": "josé"}}',
+    '',
+    '{"content": "👨‍👩‍👧 familia", "user": {"username": "李"}}',
+]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 16, 1 << 20])
+def test_lines_split_across_chunks(chunk_size):
+    data = '\n'.join(TWEETS).encode('utf-8') + b'\n'
+    blob = RangeBlob(data)
+    lines = list(iter_blob_lines(blob, chunk_size))
+    # Con bloques de 1 a 5 bytes los caracteres de varios bytes (ñ, emojis, 李) quedan partidos
+    # entre dos lecturas; se decodifican recién con la línea completa.
+    assert [line.decode('utf-8') for line in lines] == TWEETS
+    assert all(end - start + 1 <= chunk_size for start, end in blob.requests)
+    assert b''.join(blob.data[start:end + 1] for start, end in blob.requests) == data
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 1 << 20])
+def test_last_line_without_newline(chunk_size):
+    data = '\n'.join(TWEETS).encode('utf-8')
+    assert [line.decode('utf-8') for line in iter_blob_lines(RangeBlob(data), chunk_size)] == TWEETS
+
+
+def test_start_offset_and_empty_blob():
+    data = '\n'.join(TWEETS).encode('utf-8') + b'\n'
+    start = data.index(b'\n') + 1
+    assert [line.decode('utf-8') for line in iter_blob_lines(RangeBlob(data), 3, start)] == TWEETS[1:]
+    empty = RangeBlob(b'')
+    assert list(iter_blob_lines(empty, 3)) == []
+    assert empty.requests == []
@@ -0,0 +1,79 @@
+import glob
+import pickle
+import pytest
+from bad_records import BadRecords
+from checkpoint import CHECKPOINT_VERSION, _fields, checkpoint_path, run_incremental
+from engine import Q1_SPEC, Q2_SPEC, Q3_SPEC, compact_spec, run_query
+
+SPECS = [compact_spec(Q1_SPEC), Q2_SPEC, Q3_SPEC]
+
+
+def tweet(i):
+    return ('{"date": "2021-02-%02dT10:00:00+00:00", "content": "hola 🚜 @m%d", "user": {"username": "u%d"}, '
+            '"mentionedUsers": [{"username": "m%d"}]}\n' % (1 + i % 5, i % 3, i % 7, i % 3)).encode('utf-8')
+
+
+def incremental(path):
+    return [aggregator.result() for aggregator in run_incremental(path, SPECS)]
+
+
+def full(path):
+    return run_query(path, SPECS)
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'tweets.json'
+    path.write_bytes(b''.join(tweet(i) for i in range(200)))
+    return str(path)
+
+
+def test_append_reads_only_new_lines(path):
+    assert incremental(path) == full(path)
+    with open(path, 'ab') as f:
+        f.write(b''.join(tweet(i) for i in range(200, 260)))
+    errors = BadRecords()
+    # Solo se decodifican las líneas nuevas: una inválida entre ellas se cuenta una vez.
+    with open(path, 'ab') as f:
+        f.write(b'{"roto"\n')
+    assert [aggregator.result() for aggregator in run_incremental(path, SPECS, errors=errors)] == full(path)
+    assert errors.counts == {'invalid_json': 1}
+
+
+def test_partial_last_line_is_read_again(path):
+    incremental(path)
+    line = tweet(999)
+    with open(path, 'ab') as f:
+        f.write(line[:25])
+    # La línea a medio escribir se descarta ahora y se vuelve a leer completa en la ejecución siguiente.
+    assert incremental(path) == full(path)
+    with open(path, 'ab') as f:
+        f.write(line[25:])
+    assert incremental(path) == full(path)
+
+
+def test_truncated_or_rewritten_file_is_scanned_again(path):
+    incremental(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:len(data) // 2].rsplit(b'\n', 1)[0] + b'\n')
+    assert incremental(path) == full(path)
+    # Mismo tamaño que el checkpoint pero otro contenido al final del prefijo.
+    with open(path, 'wb') as f:
+        f.write(data.replace(b'"u1"', b'"u9"'))
+    assert incremental(path) == full(path)
+
+
+@pytest.mark.parametrize('saved', [
+    b'cmodulo_que_no_existe\nClase\n.',
+    pickle.dumps({'version': CHECKPOINT_VERSION, 'fields': _fields(SPECS)}),
+    pickle.dumps({'version': CHECKPOINT_VERSION, 'fields': _fields(SPECS), 'offset': 0, 'aggregators': [object()] * 3}),
+    b'no es un pickle',
+])
+def test_unreadable_checkpoint_falls_back_to_full_scan(path, saved):
+    incremental(path)
+    with open(checkpoint_path(path, SPECS), 'wb') as f:
+        f.write(saved)
+    assert incremental(path) == full(path)
+    assert glob.glob(path + '.*.ckpt') == [checkpoint_path(path, SPECS)]
@@ -0,0 +1,81 @@
+import os
+
+import columnar
+from bad_records import INVALID_JSON, BadRecords
+from benchmark.generate import generate
+from engine import Q1_SPEC, Q2_SPEC, Q3_SPEC, run_query
+
+SPECS = [Q1_SPEC, Q2_SPEC, Q3_SPEC]
+
+
+def dirty_copy(source, target):
+    # Cada 50 tweets se intercalan una línea cortada, un tweet sin usuario y otro con menciones nulas.
+    with open(source, 'rb') as f, open(target, 'wb') as out:
+        for i, line in enumerate(f):
+            out.write(line)
+            if i % 50 == 0:
+                out.write(line[:len(line) // 2] + b'\n')
+                out.write(b'{"date": "2021-02-03T10:00:00+00:00", "content": "sin usuario \xf0\x9f\x94\xa5"}\n')
+                out.write(b'{"date": "2021-02-04T10:00:00+00:00", "user": {"username": "solo"}, "mentionedUsers": null}\n')
+
+
+def run_with_errors(path, **kwargs):
+    errors = BadRecords(log_interval=None)
+    return run_query(path, SPECS, errors=errors, **kwargs), errors
+
+
+def test_queries_never_build_the_cache(tmp_path):
+    path = str(tmp_path / 'tweets.json')
+    generate(path, lines=200, seed=5)
+    run_query(path, SPECS)
+    assert not columnar.has_cache(path)
+    assert not os.path.exists(columnar.cache_path(path))
+
+
+def test_cache_matches_json(tmp_path):
+    plain = str(tmp_path / 'plain.json')
+    path = str(tmp_path / 'tweets.json')
+    generate(plain, lines=1500, user_cardinality=300, seed=2)
+    dirty_copy(plain, path)
+    expected, expected_errors = run_with_errors(path)
+    assert expected_errors.counts[INVALID_JSON] == 30
+
+    columnar.build_cache(path)
+    result, errors = run_with_errors(path)
+    assert result == expected
+    assert errors.counts == expected_errors.counts
+    # Los offsets de ejemplo de las líneas inválidas son los del archivo original.
+    assert errors.samples[INVALID_JSON] == expected_errors.samples[INVALID_JSON]
+    # Con workers también se lee la caché, en un único proceso.
+    assert run_with_errors(path, workers=4)[0] == expected
+
+
+def test_stale_cache_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'tweets.json')
+    generate(path, lines=600, seed=8)
+    columnar.build_cache(path)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"date": "2021-02-28T10:00:00+00:00", "user": {"username": "nuevo"}, "content": "@nuevo \U0001f64f",'
+                ' "mentionedUsers": [{"username": "nuevo"}]}\n')
+    assert not columnar.is_fresh(path)
+    result = run_query(path, SPECS)
+    assert columnar.is_fresh(path)
+    os.remove(columnar.cache_path(path))
+    assert result == run_query(path, SPECS)
+
+
+def test_sharded_caches_match_concatenation(tmp_path):
+    whole = str(tmp_path / 'whole.json')
+    generate(whole, lines=900, days=3, seed=4)
+    with open(whole, 'rb') as f:
+        lines = f.readlines()
+    (tmp_path / 'days').mkdir()
+    for part, first in enumerate(range(0, len(lines), 300)):
+        shard = str(tmp_path / 'days' / ('part-%d.json' % part))
+        with open(shard, 'wb') as out:
+            out.writelines(lines[first:first + 300])
+        if part != 1:
+            # Una de las partes queda sin caché y se lee del JSON.
+            columnar.build_cache(shard)
+    pattern = str(tmp_path / 'days' / 'part-*.json')
+    assert run_query(pattern, SPECS) == run_query(pattern, SPECS, workers=2) == run_query(whole, SPECS)
@@ -0,0 +1,59 @@
+from collections import Counter, defaultdict
+import random
+from benchmark.generate import generate
+from compact import DENSE_MIN, CompactCounts
+from q1_memory import q1_memory
+from q1_time import q1_time
+
+
+def counted(pairs):
+    compact = CompactCounts()
+    totals, sub_counters = Counter(), defaultdict(Counter)
+    for key, sub_key in pairs:
+        compact.update([key], [sub_key])
+        totals[key] += 1
+        sub_counters[key][sub_key] += 1
+    return compact, totals, sub_counters
+
+
+def assert_same(compact, totals, sub_counters):
+    # Mismo orden que Counter.most_common, incluidos los desempates por primera aparición.
+    assert compact.most_common(len(totals)) == totals.most_common()
+    for key, counter in sub_counters.items():
+        assert compact.sub_most_common(key, 5) == counter.most_common(5)
+
+
+def pairs(count, groups, users, seed):
+    rng = random.Random(seed)
+    return [('2021-02-%02d' % rng.randrange(1, groups + 1), 'user%d' % rng.randrange(users)) for _ in range(count)]
+
+
+def test_dense_rows_match_counter():
+    # Pocos grupos con muchos usuarios: los grupos pasan a arrays y, con un usuario que publica más
+    # de 65535 veces en una fecha, los conteos se ensanchan de 1 a 4 bytes.
+    data = pairs(20000, 3, DENSE_MIN * 4, seed=1) + [('2021-02-02', 'user7')] * 70000
+    compact, totals, sub_counters = counted(data)
+    assert_same(compact, totals, sub_counters)
+    assert all(type(row) is not dict for row in compact.rows)
+
+
+def test_sparse_rows_and_ties_match_counter():
+    # Muchos grupos chicos (quedan como dict) y conteos repetidos que obligan a desempatar.
+    compact, totals, sub_counters = counted(pairs(3000, 200, 50, seed=2))
+    assert_same(compact, totals, sub_counters)
+
+
+def test_merge_keeps_counts_and_order():
+    data = pairs(20000, 5, DENSE_MIN * 2, seed=3)
+    merged, _, _ = counted(data[:7000])
+    second, _, _ = counted(data[7000:])
+    merged.merge(second)
+    assert_same(merged, *counted(data)[1:])
+
+
+def test_q1_memory_matches_q1_time(tmp_path):
+    path = str(tmp_path / 'tweets.json')
+    generate(path, lines=5000, user_cardinality=2000, seed=5)
+    exact = q1_time(path, counts=True, top_users=3)
+    assert exact
+    assert q1_memory(path, counts=True, top_users=3) == exact
@@ -0,0 +1,83 @@
+import gzip
+import zipfile
+
+import pytest
+
+from bad_records import BadRecords
+from benchmark.generate import generate
+from engine import Q1_SPEC, Q2_SPEC, Q3_SPEC, run_query, top_spec
+
+SPECS = [top_spec(Q1_SPEC, 10, 2), Q2_SPEC, Q3_SPEC]
+
+
+@pytest.fixture(scope='module')
+def plain(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('compressed') / 'tweets.json')
+    generate(path, lines=1200, days=4, user_cardinality=80, seed=12)
+    with open(path, 'rb') as f:
+        lines = f.readlines()
+    lines.insert(700, b'{"date": "2021-02-03T\n')
+    with open(path, 'wb') as f:
+        f.writelines(lines)
+    return path
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def parts(data, count):
+    # Partes cortadas en la mitad de una línea: los lectores deben unirlas.
+    size = len(data) // count + 1
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def query(path, **kwargs):
+    errors = BadRecords(log_interval=None)
+    return run_query(path, SPECS, errors=errors, **kwargs), dict(errors.counts)
+
+
+def test_gzip_members_match_plain(plain, tmp_path):
+    path = str(tmp_path / 'tweets.json.gz')
+    with open(path, 'wb') as f:
+        # Varios miembros concatenados, como los que genera pigz.
+        for part in parts(read(plain), 3):
+            f.write(gzip.compress(part))
+    expected = query(plain)
+    assert query(path) == query(path, workers=2) == expected
+
+
+def test_zip_members_match_plain(plain, tmp_path):
+    path = str(tmp_path / 'tweets.zip')
+    lines = read(plain).splitlines(keepends=True)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('dias/', b'')
+        archive.writestr('__MACOSX/._dias', b'\x00\x05')
+        # Cada archivo del zip termina en una línea completa; el último, sin salto de línea final.
+        for number, first in enumerate(range(0, len(lines), 400)):
+            archive.writestr('dias/%d.json' % number, b''.join(lines[first:first + 400]).rstrip(b'\n'))
+    expected = query(plain)
+    assert query(path) == query(path, workers=3) == expected
+
+
+def test_zstd_frames_match_plain(plain, tmp_path):
+    zstandard = pytest.importorskip('zstandard')
+    path = str(tmp_path / 'tweets.json.zst')
+    compressor = zstandard.ZstdCompressor()
+    with open(path, 'wb') as f:
+        # Frames independientes, como los de pzstd, con líneas partidas entre frames.
+        for part in parts(read(plain), 7):
+            f.write(compressor.compress(part))
+    expected = query(plain)
+    assert query(path) == query(path, workers=3) == expected
+
+
+def test_date_range_and_incremental(plain, tmp_path):
+    path = str(tmp_path / 'tweets.json.gz')
+    with open(path, 'wb') as f:
+        f.write(gzip.compress(read(plain)))
+    date_range = ('2021-02-02', '2021-02-03')
+    assert query(path, date_range=date_range)[0] == query(plain, date_range=date_range)[0]
+    with pytest.raises(ValueError):
+        run_query(path, SPECS, incremental=True)
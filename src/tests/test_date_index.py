@@ -0,0 +1,52 @@
+import random
+import pytest
+from benchmark.generate import generate
+from engine import Q1_SPEC, Q2_SPEC, Q3_SPEC, run_lines, run_query
+from q1_time import q1_time
+
+SPECS = [Q1_SPEC, Q2_SPEC, Q3_SPEC]
+RANGES = [('2021-02-03', '2021-02-05'), ('2021-02-10', None), (None, '2021-02-01'), ('2021-03-01', '2021-03-02')]
+
+
+@pytest.fixture(scope='module')
+def shuffled(tmp_path_factory) -> str:
+    # Las líneas desordenadas dejan cada fecha repartida en muchos rangos de bytes del índice.
+    directory = tmp_path_factory.mktemp('date_index')
+    generate(str(directory / 'sorted.json'), lines=3000, days=10, seed=3)
+    lines = (directory / 'sorted.json').read_bytes().splitlines(keepends=True)
+    random.Random(3).shuffle(lines)
+    path = directory / 'tweets.json'
+    path.write_bytes(b''.join(lines[:-1]) + b'not json\n' + lines[-1])
+    return str(path)
+
+
+def filtered(path, date_range):
+    with open(path, 'rb') as f:
+        return run_lines(f, SPECS, date_range=date_range)
+
+
+@pytest.mark.parametrize('date_range', RANGES)
+def test_index_matches_filter(shuffled, date_range):
+    assert run_query(shuffled, SPECS, date_range=date_range) == filtered(shuffled, date_range)
+
+
+@pytest.mark.parametrize('options', [{'workers': 2}, {'mapped': True}, {'workers': 2, 'mapped': True}, {'incremental': True}])
+def test_other_paths_filter_dates(shuffled, options):
+    date_range = RANGES[0]
+    expected = filtered(shuffled, date_range)
+    assert run_query(shuffled, SPECS, date_range=date_range, **options) == expected
+    # Una segunda ejecución incremental retoma el checkpoint de ese rango de fechas.
+    assert run_query(shuffled, SPECS, date_range=date_range, **options) == expected
+
+
+def test_incremental_checkpoints_per_range(shuffled):
+    for date_range in RANGES[:2]:
+        run_query(shuffled, SPECS, date_range=date_range, incremental=True)
+    for date_range in RANGES[:2]:
+        assert run_query(shuffled, SPECS, date_range=date_range, incremental=True) == filtered(shuffled, date_range)
+
+
+def test_query_with_workers_and_date_range(shuffled):
+    expected = q1_time(shuffled, date_range=RANGES[0])
+    assert expected
+    assert q1_time(shuffled, workers=2, date_range=RANGES[0]) == expected
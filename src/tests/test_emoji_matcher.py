@@ -0,0 +1,47 @@
+import random
+
+import pytest
+from emoji import EMOJI_DATA, emoji_list
+
+from emoji_matcher import extract_emojis, iter_emojis
+
+# Emojis completos (incluidas secuencias ZWJ, banderas y keycaps) y sus piezas sueltas.
+EMOJIS = sorted(EMOJI_DATA)
+PIECES = sorted({char for emj in EMOJI_DATA for char in emj})
+# Texto que rodea a los emojis: ASCII (con los caracteres de los keycaps), acentos, CJK y los
+# caracteres que unen o modifican emojis.
+TEXT = list('abc #*0123456789@\n') + ['ñ', 'é', '李', '\u200d', '\ufe0f', '\ufe0e', '\u20e3', '\U0001f3fd', '\U0001f1e6']
+
+
+def expected(text):
+    return [match['emoji'] for match in emoji_list(text)]
+
+
+def random_text(rng):
+    tokens = []
+    for _ in range(rng.randint(0, 30)):
+        source = rng.random()
+        if source < 0.3:
+            tokens.append(rng.choice(EMOJIS))
+        elif source < 0.6:
+            tokens.append(rng.choice(PIECES))
+        else:
+            tokens.append(rng.choice(TEXT))
+    return ''.join(tokens)
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_fuzzed_text_matches_emoji_list(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        text = random_text(rng)
+        assert extract_emojis(text) == list(iter_emojis(text)) == expected(text), repr(text)
+
+
+@pytest.mark.parametrize('text', [
+    '', 'sin emojis', '#FarmersProtest 123', '#️⃣ y 1️⃣', '👨‍👩‍👧‍👦👍🏽🇮🇳🏳️‍🌈',
+    # Secuencias ZWJ que no son RGI, ZWJ sueltos y modificadores sin emoji base.
+    '👍🏽\u200d🚜', '\u200d😂\u200d', '🏽🏽', '🇮🇳🇦', '❤\ufe0e❤\ufe0f', '👩🏾\u200d🌾李👩\u200d\u200d🌾',
+])
+def test_edge_cases_match_emoji_list(text):
+    assert extract_emojis(text) == expected(text)
@@ -0,0 +1,24 @@
+from utils.bad_records import INVALID_JSON
+from utils.execution import execute
+
+
+calls = []
+
+
+def query(file_path, k=10, timer=None, errors=None):
+    calls.append(file_path)
+    with timer.stage('parse'):
+        errors.record(INVALID_JSON)
+    return [(file_path, k)]
+
+
+def test_execute_runs_once_without_printing_timings(capsys):
+    response = execute(query, 'tweets.json', k=3)
+    assert calls == ['tweets.json']
+    assert response['result'] == [['tweets.json', 3]]
+    assert 'parse' in response['timings']
+    assert response['bad_records']['counts'] == {INVALID_JSON: 1}
+    assert response['metrics']['bad_records'] == 1
+    assert 'profile' not in response
+    # El único aviso es el del registro descartado; los tiempos van en la respuesta.
+    assert [line for line in capsys.readouterr().out.splitlines() if 'Tiempos' in line] == []
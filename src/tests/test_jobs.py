@@ -0,0 +1,137 @@
+import fnmatch
+
+import pytest
+
+import utils.jobs as jobs
+from benchmark.generate import generate
+from utils.bad_records import BadRecords
+from utils.engine import run_lines
+from utils.execution import to_jsonable
+
+
+class Blob:
+    def __init__(self, name, data, generation):
+        self.name, self.data, self.generation, self.size = name, data, generation, len(data)
+
+    def download_as_bytes(self, start=0, end=None):
+        # Como en GCS, el extremo final es inclusivo.
+        return self.data[start:None if end is None else end + 1]
+
+
+class Bucket:
+    """
+    Bucket en memoria con las llamadas que usan los trabajos (get_blob con generación y list_blobs);
+    sirve también como cliente.
+    """
+
+    def __init__(self):
+        self.objects = {}
+
+    def upload(self, name, data):
+        generation = self.objects[name].generation + 1 if name in self.objects else 1
+        self.objects[name] = Blob(name, data, generation)
+
+    def bucket(self, name):
+        return self
+
+    def get_blob(self, name, generation=None):
+        blob = self.objects.get(name)
+        return blob if blob is not None and generation in (None, blob.generation) else None
+
+    def list_blobs(self, bucket_name, prefix=''):
+        return [blob for name, blob in self.objects.items() if name.startswith(prefix)]
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    path = str(tmp_path / 'tweets.json')
+    generate(path, lines=1200, days=3, user_cardinality=150, seed=9)
+    with open(path, 'rb') as f:
+        lines = f.readlines()
+    lines.insert(500, b'{"date": "2021-02-02T10:00:00+00:00", "user": \n')
+    fake = Bucket()
+    # Tres objetos de distinto tamaño; el último sin salto de línea final.
+    for name, part in (('days/1.json', lines[:250]), ('days/2.json', lines[250:900]), ('days/3.json', lines[900:])):
+        fake.upload(name, b''.join(part))
+    fake.upload('days/3.json', fake.objects['days/3.json'].data.rstrip(b'\n'))
+    return fake
+
+
+def one_shot(fake, pattern, function, params):
+    specs, format_result = jobs.job_query(function, **params)
+    data = b'\n'.join(blob.data.rstrip(b'\n') for name, blob in sorted(fake.objects.items()) if fnmatch.fnmatchcase(name, pattern))
+    errors = BadRecords(log_interval=None)
+    return to_jsonable(format_result(run_lines(data.split(b'\n'), specs, errors=errors))), errors.counts
+
+
+def run_to_end(job_id, store, fake):
+    states = []
+    response = jobs.get_job(job_id, store)
+    while response['status'] == jobs.RUNNING:
+        response = jobs.run_job(job_id, store, fake, time_budget=0.0, chunk_bytes=60_000)
+        states.append(response)
+    return response, states
+
+
+@pytest.mark.parametrize('function,params', [('all', {}), ('q1_memory', {'top_users': 3, 'counts': True})])
+def test_resumes_after_failed_chunk(tmp_path, monkeypatch, bucket, function, params):
+    scan_chunk, calls = jobs._scan_chunk, []
+
+    def fail_once(state, aggregators, *args, **kwargs):
+        calls.append(state['index'])
+        # La cuarta parte alcanza a sumar sus conteos antes de fallar: deben descartarse.
+        scan_chunk(state, aggregators, *args, **kwargs)
+        if len(calls) == 4:
+            raise IOError('conexión interrumpida')
+
+    monkeypatch.setattr(jobs, '_scan_chunk', fail_once)
+    store = jobs.LocalJobStore(str(tmp_path / 'jobs'))
+    started = jobs.start_job(function, 'days/*.json', params, store, bucket, time_budget=0.0, chunk_bytes=60_000)
+    response, states = run_to_end(started['job_id'], store, bucket)
+
+    expected, expected_errors = one_shot(bucket, 'days/*.json', function, params)
+    assert response['status'] == jobs.DONE
+    assert response['result'] == expected
+    assert response['bad_records']['counts'] == dict(expected_errors)
+    assert [state['error'] for state in states if state.get('failures')] == ['conexión interrumpida']
+    # Una parte más que las guardadas: la que falló y se repitió.
+    assert len(calls) == response['progress']['chunks'] + 1 > 4
+
+
+def test_fails_after_max_attempts(tmp_path, monkeypatch, bucket):
+    def broken(*args, **kwargs):
+        raise IOError('sin acceso')
+
+    store = jobs.LocalJobStore(str(tmp_path / 'jobs'))
+    started = jobs.start_job('q3_time', 'days/*.json', {}, store, bucket, time_budget=0.0, chunk_bytes=60_000)
+    monkeypatch.setattr(jobs, '_scan_chunk', broken)
+    response, states = run_to_end(started['job_id'], store, bucket)
+    assert response['status'] == jobs.FAILED
+    assert len(states) == response['failures'] == jobs.config.JOB_MAX_ATTEMPTS
+    assert response['progress']['chunks'] == started['progress']['chunks'] == 1
+
+
+def test_rewritten_object_fails_instead_of_mixing(tmp_path, bucket):
+    store = jobs.LocalJobStore(str(tmp_path / 'jobs'))
+    started = jobs.start_job('q2_time', 'days/', {}, store, bucket, time_budget=0.0, chunk_bytes=60_000)
+    bucket.upload('days/3.json', b'')
+    response, _ = run_to_end(started['job_id'], store, bucket)
+    assert response['status'] == jobs.FAILED and 'days/3.json' in response['error']
+
+
+def test_lease_and_conflicts(tmp_path, bucket):
+    store = jobs.LocalJobStore(str(tmp_path / 'jobs'))
+    job_id = jobs.start_job('q3_time', 'days/2.json', {}, store, bucket, time_budget=0.0, chunk_bytes=60_000)['job_id']
+    state, version = store.get(job_id)
+
+    # Mientras otra invocación tiene la reserva, run_job solo devuelve el estado.
+    state['lease_until'] = jobs.time.time() + 60
+    version = store.put(job_id, state, version)
+    assert jobs.run_job(job_id, store, bucket, time_budget=0.0, chunk_bytes=60_000)['progress']['chunks'] == 1
+
+    with pytest.raises(jobs.JobConflict):
+        store.put(job_id, state, version - 1)
+    with pytest.raises(jobs.JobConflict):
+        store.put(job_id, state, None)
+    with pytest.raises(KeyError):
+        jobs.get_job('../' + job_id, store)
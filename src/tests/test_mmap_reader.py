@@ -0,0 +1,36 @@
+import pytest
+
+from benchmark.generate import generate
+from engine import Q1_SPEC, Q2_SPEC, Q3_SPEC, run_query
+from mmap_reader import iter_mapped_lines
+from parallel import split_ranges
+
+
+@pytest.mark.parametrize('data', [
+    b'', b'\n', b'a', b'a\n', b'a\nb', b'a\n\nb\n\n', b'{"x": 1}\r\n{"y": "\xc3\xb1"}\r\n', b'\n\n\n',
+])
+def test_lines_match_file_iteration(tmp_path, data):
+    path = tmp_path / 'lines.json'
+    path.write_bytes(data)
+    # Las mismas líneas que al iterar el archivo, sin el salto de línea final.
+    expected = [line[:-1] if line.endswith(b'\n') else line for line in data.splitlines(keepends=True)]
+    assert list(iter_mapped_lines(str(path))) == expected
+
+
+def test_ranges_concatenate_to_whole_file(tmp_path):
+    path = str(tmp_path / 'tweets.json')
+    generate(path, lines=300, seed=4)
+    whole = list(iter_mapped_lines(path))
+    for parts in (2, 5, 300, 1000):
+        assert [line for start, end in split_ranges(path, parts) for line in iter_mapped_lines(path, start, end)] == whole
+
+
+def test_mapped_queries_match_plain(tmp_path):
+    path = str(tmp_path / 'tweets.json')
+    generate(path, lines=900, days=3, seed=10)
+    with open(path, 'ab') as f:
+        f.write(b'{"date": \n{"date": "2021-02-02T10:00:00+00:00", "user": {"username": "final"}}')
+    specs = [Q1_SPEC, Q2_SPEC, Q3_SPEC]
+    assert run_query(path, specs, mapped=True) == run_query(path, specs)
+    date_range = ('2021-02-02', None)
+    assert run_query(path, specs, mapped=True, date_range=date_range) == run_query(path, specs, date_range=date_range)
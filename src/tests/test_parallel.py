@@ -0,0 +1,43 @@
+import pytest
+
+from benchmark.generate import generate
+from engine import Q1_SPEC, Q2_SPEC, Q3_SPEC, compact_spec, run_query, top_spec
+from parallel import read_range, split_ranges
+
+# Tops completos (k grande): con pocos usuarios y menciones hay muchos empates, que se desempatan
+# por primera aparición y solo coinciden si los rangos se mezclan en el orden del archivo.
+SPECS = [top_spec(Q1_SPEC, 30, 5), compact_spec(top_spec(Q1_SPEC, 30, 5)), top_spec(Q2_SPEC, 100), top_spec(Q3_SPEC, 100)]
+
+
+@pytest.fixture(scope='module')
+def tweets(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('parallel') / 'tweets.json')
+    generate(path, lines=1500, days=5, user_cardinality=25, mention_cardinality=20, seed=6)
+    with open(path, 'ab') as f:
+        # Una línea inválida y una última línea sin salto de línea.
+        f.write(b'{"date": \n{"date": "2021-02-05T23:00:00+00:00", "user": {"username": "user3"}, "content": "\xf0\x9f\x98\x82",'
+                b' "mentionedUsers": [{"username": "mention1"}]}')
+    return path
+
+
+@pytest.mark.parametrize('parts', [1, 2, 7, 64, 5000])
+def test_ranges_cover_whole_lines(tweets, parts):
+    with open(tweets, 'rb') as f:
+        data = f.read()
+    ranges = split_ranges(tweets, parts)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert all(start == 0 or data[start - 1:start] == b'\n' for start, _ in ranges)
+    assert b''.join(line for start, end in ranges for line in read_range(tweets, start, end)) == data
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+@pytest.mark.parametrize('mapped', [False, True])
+def test_parallel_matches_serial(tweets, workers, mapped):
+    assert run_query(tweets, SPECS, workers=workers, mapped=mapped) == run_query(tweets, SPECS)
+
+
+def test_tiny_file_with_more_workers_than_lines(tmp_path):
+    path = str(tmp_path / 'tiny.json')
+    generate(path, lines=3, seed=1)
+    assert run_query(path, SPECS, workers=4) == run_query(path, SPECS)
@@ -0,0 +1,94 @@
+import random
+import threading
+import time
+import pytest
+
+from utils.utils import iter_blob_chunks_parallel, iter_blob_lines, iter_blob_lines_parallel
+
+
+class FakeBlob:
+    """
+    Blob en memoria con la interfaz que usan las lecturas por rango (size y download_as_bytes con
+    el extremo final inclusivo). Algunas descargas demoran un tiempo al azar, por lo que las
+    lecturas simultáneas terminan en otro orden que el pedido.
+    """
+
+    def __init__(self, data: bytes, seed: int = 0):
+        self.data = data
+        self.size = len(data)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def download_as_bytes(self, start: int, end: int) -> bytes:
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            delay = self.rng.random() * 0.001 if self.rng.random() < 0.1 else 0
+        if delay:
+            time.sleep(delay)
+        with self.lock:
+            self.active -= 1
+        return self.data[start:end + 1]
+
+
+def expected_lines(data: bytes):
+    lines = data.split(b'\n')
+    if lines[-1] == b'':
+        lines.pop()
+    return lines
+
+
+def make_data(lines: int, seed: int = 0) -> bytes:
+    # Líneas de largo variable (incluidas vacías y con UTF-8 de varios bytes) para que los cortes
+    # entre bloques caigan en cualquier posición de una línea.
+    rng = random.Random(seed)
+    return b''.join(('ñ' * rng.randrange(0, 40) + str(i)).encode('utf-8') * rng.randrange(0, 3) + b'\n' for i in range(lines))
+
+
+DATA = make_data(100)
+CASES = {
+    'trailing_newline': DATA,
+    'no_trailing_newline': DATA + b'{"ultima": "sin salto"}',
+    'single_line': b'x' * 100,
+    'only_newlines': b'\n' * 50,
+}
+
+
+@pytest.mark.parametrize('name', sorted(CASES))
+@pytest.mark.parametrize('chunk_size', [3, 7, 64, 1000, 1 << 20])
+@pytest.mark.parametrize('concurrency', [1, 2, 8])
+def test_parallel_lines_match_sequential(name, chunk_size, concurrency):
+    data = CASES[name]
+    blob = FakeBlob(data)
+    lines = list(iter_blob_lines_parallel(blob, chunk_size, concurrency))
+    assert lines == list(iter_blob_lines(FakeBlob(data), chunk_size)) == expected_lines(data)
+    assert blob.max_active <= concurrency
+
+
+@pytest.mark.parametrize('chunk_size', [3, 7, 64, 1000])
+@pytest.mark.parametrize('concurrency', [1, 2, 8])
+def test_parallel_chunks_are_in_order(chunk_size, concurrency):
+    data = CASES['no_trailing_newline']
+    blob = FakeBlob(data)
+    chunks = list(iter_blob_chunks_parallel(blob, chunk_size, concurrency))
+    assert b''.join(chunks) == data
+    assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+    assert blob.max_active <= concurrency
+
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_empty_blob(concurrency):
+    assert list(iter_blob_chunks_parallel(FakeBlob(b''), 16, concurrency)) == []
+    assert list(iter_blob_lines_parallel(FakeBlob(b''), 16, concurrency)) == []
+
+
+@pytest.mark.parametrize('chunk_size', [5, 64])
+def test_parallel_lines_from_offset(chunk_size):
+    data = CASES['no_trailing_newline']
+    # Se retoma desde el comienzo de una línea intermedia, como los trabajos por partes.
+    start = data.index(b'\n', len(data) // 3) + 1
+    lines = list(iter_blob_lines_parallel(FakeBlob(data), chunk_size, 4, start=start))
+    assert lines == expected_lines(data[start:])
+    assert b''.join(iter_blob_chunks_parallel(FakeBlob(data), chunk_size, 4, start=start)) == data[start:]
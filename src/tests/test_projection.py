@@ -0,0 +1,73 @@
+import json
+import random
+
+import pytest
+
+from engine import SOURCE_KEYS
+from projection import loads_projected
+
+KEYS = list(SOURCE_KEYS.values())
+# Valores que confunden a una búsqueda de texto: comillas, llaves y claves homónimas dentro de strings.
+TRICKY = ['"date": "1999-01-01"', '{"user": {"username": "falso"}}', '\\', 'ñ 李 😂', '}', '"mentionedUsers": []', '']
+
+
+def random_tweet(rng, depth=0):
+    tweet = {
+        'url': rng.choice(TRICKY), 'date': '2021-02-%02dT10:00:00+00:00' % rng.randint(1, 28),
+        'content': ' '.join(rng.choice(TRICKY) for _ in range(rng.randint(0, 4))),
+        'user': {'username': 'user%d' % rng.randint(0, 9), 'description': rng.choice(TRICKY), 'id': rng.randint(0, 10)},
+        'mentionedUsers': rng.choice([None, [], [{'username': 'm%d' % i, 'description': rng.choice(TRICKY)} for i in range(rng.randint(1, 3))]]),
+        'likeCount': rng.randint(0, 9), 'media': None,
+    }
+    if depth == 0 and rng.random() < 0.5:
+        # Los tweets citados tienen las mismas claves, que no deben tomarse por las del tweet.
+        tweet['quotedTweet'] = random_tweet(rng, 1)
+    for key in list(tweet):
+        if rng.random() < 0.05:
+            del tweet[key]
+        elif key in KEYS and rng.random() < 0.05:
+            tweet[key] = rng.choice([None, 7, 'x', {'username': None}])
+    items = list(tweet.items())
+    rng.shuffle(items)
+    return dict(items)
+
+
+def dumps(tweet, rng):
+    separators = rng.choice([(', ', ': '), (',', ':'), (' , ', ' : ')])
+    return json.dumps(tweet, separators=separators, ensure_ascii=rng.random() < 0.5) + rng.choice(['', '\n', ' \r\n'])
+
+
+def assert_projection(projected, full):
+    for key in KEYS:
+        assert (key in projected) == (key in full), key
+        if key == 'user' and isinstance(full.get('user'), dict):
+            # De 'user' puede decodificarse solo el nombre de usuario.
+            assert projected['user'].get('username') == full['user'].get('username')
+        elif key in full:
+            assert projected[key] == full[key], key
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_projection_matches_json_loads(seed):
+    rng = random.Random(seed)
+    for _ in range(400):
+        line = dumps(random_tweet(rng), rng)
+        keys = rng.sample(KEYS, rng.randint(1, len(KEYS)))
+        full = json.loads(line)
+        projected = loads_projected(line.encode('utf-8') if rng.random() < 0.5 else line, keys)
+        assert_projection({key: value for key, value in projected.items() if key in keys},
+                          {key: value for key, value in full.items() if key in keys})
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_truncated_lines_raise_like_json_loads(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        line = dumps(random_tweet(rng), rng).rstrip()
+        # Una línea cortada justo después de un '}' puede proyectarse sin validar el resto (ver
+        # loads_projected), por lo que se cortan antes de un cierre.
+        cut = line[:rng.randint(0, len(line) - 1)].rstrip('} ')
+        with pytest.raises(json.JSONDecodeError):
+            json.loads(cut)
+        with pytest.raises(json.JSONDecodeError):
+            loads_projected(cut, KEYS)
@@ -0,0 +1,91 @@
+import glob
+import gzip
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bad_records import INVALID_JSON, BadRecords
+from benchmark.generate import generate
+from engine import Q1_SPEC, Q2_SPEC, Q3_SPEC, run_query, top_spec
+from shards import bounded_map, list_shards
+
+SPECS = [top_spec(Q1_SPEC, 10, 3), Q2_SPEC, Q3_SPEC]
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('shards')
+    whole = str(tmp / 'whole.json')
+    generate(whole, lines=1600, days=4, user_cardinality=50, mention_cardinality=30, seed=21)
+    with open(whole, 'rb') as f:
+        lines = f.readlines()
+    lines.insert(1000, b'{"date": "2021-02-03T\n')
+    with open(whole, 'wb') as f:
+        f.writelines(lines)
+
+    (tmp / 'days').mkdir()
+    # Los nombres ordenan los shards (no la fecha de creación); uno comprimido y uno sin salto final.
+    chunks = [lines[:300], lines[300:900], lines[900:1200], lines[1200:]]
+    for name, chunk in reversed(list(zip(['a.json', 'b.json.gz', 'c.json', 'd.json'], chunks))):
+        data = b''.join(chunk)
+        if name.endswith('.gz'):
+            data = gzip.compress(data)
+        elif name == 'd.json':
+            data = data.rstrip(b'\n')
+        (tmp / 'days' / name).write_bytes(data)
+    return whole, str(tmp / 'days' / '*')
+
+
+def query(path, **kwargs):
+    errors = BadRecords(log_interval=None)
+    return run_query(path, SPECS, errors=errors, **kwargs), errors
+
+
+@pytest.mark.parametrize('options', [{}, {'workers': 3}, {'mapped': True}, {'workers': 2, 'mapped': True}])
+def test_shards_match_concatenated_file(dataset, options):
+    whole, pattern = dataset
+    result, errors = query(pattern, **options)
+    expected, expected_errors = query(whole)
+    assert result == expected
+    assert errors.counts == expected_errors.counts
+    # Los offsets de ejemplo indican el shard de cada línea descartada.
+    assert [offset.split(':')[0].rsplit('/', 1)[-1] for offset in errors.samples[INVALID_JSON]] == ['c.json']
+
+
+def test_date_range_and_sidecars(dataset):
+    whole, pattern = dataset
+    date_range = ('2021-02-02', '2021-02-03')
+    expected = query(whole, date_range=date_range)[0]
+    # La primera consulta crea los índices por fecha junto a los shards; la segunda no debe leerlos como datos.
+    assert query(pattern, date_range=date_range)[0] == expected
+    assert any(path.endswith('.dateidx') for path in glob.glob(pattern))
+    assert query(pattern, date_range=date_range, workers=2)[0] == expected
+    assert [path.rsplit('/', 1)[-1] for path, _ in list_shards(pattern)] == ['a.json', 'b.json.gz', 'c.json', 'd.json']
+    with pytest.raises(ValueError):
+        run_query(pattern, SPECS, incremental=True)
+    with pytest.raises(FileNotFoundError):
+        run_query(pattern + '.nada', SPECS)
+
+
+def test_bounded_map_limits_bytes_in_flight():
+    shards = [('s%d' % i, size) for i, size in enumerate([40, 30, 50, 10, 120, 20, 60, 5])]
+    sizes = dict(shards)
+    lock = threading.Lock()
+    active, peaks = [], []
+
+    def work(name):
+        with lock:
+            active.append(name)
+            peaks.append((len(active), sum(sizes[item] for item in active), list(active)))
+        time.sleep(0.01)
+        with lock:
+            active.remove(name)
+        return name
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(bounded_map(executor, work, shards, max_workers=3, max_bytes=100)) == [name for name, _ in shards]
+    assert max(count for count, _, _ in peaks) <= 3
+    # Solo el shard de 120 bytes supera el límite, y se procesa solo.
+    assert all(total <= 100 or names == ['s4'] for _, total, names in peaks)
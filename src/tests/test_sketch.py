@@ -0,0 +1,40 @@
+from collections import Counter
+import pytest
+from benchmark.generate import generate
+from engine import Q3_SPEC, approximate_spec, run_query, top_spec
+from q2_memory import q2_memory
+from q3_memory import q3_memory
+
+# Capacidad del conteo aproximado de prueba, menor que las claves distintas del archivo generado.
+CAPACITY = 50
+
+
+@pytest.fixture(scope='module')
+def tweets(tmp_path_factory) -> str:
+    # Claves con distribución sesgada (pocas muy frecuentes y una cola larga), como en el dataset real.
+    path = str(tmp_path_factory.mktemp('sketch') / 'tweets.json')
+    generate(path, lines=20000, mention_ratio=0.8, seed=7)
+    return path
+
+
+@pytest.mark.parametrize('query', [q2_memory, q3_memory])
+def test_approximate_top_matches_exact(tweets, query):
+    exact = query(tweets)
+    approximate = query(tweets, approximate=True)
+    assert len(exact) == 10
+    assert [(key, count) for key, count, _ in approximate] == exact
+    assert all(error == 0 for _, _, error in approximate)
+
+
+def test_small_capacity_keeps_top_within_error(tweets):
+    # Con una capacidad menor que los usuarios mencionados distintos el conteo desaloja claves: el
+    # top-10 debe seguir siendo el mismo y cada conteo real debe quedar dentro del error informado
+    # (los emojis del generador son pocos, por lo que no alcanzan a desalojarse).
+    spec = top_spec(Q3_SPEC, 10)
+    exact, = run_query(tweets, [spec._replace(top_k=None)])
+    approximate, = run_query(tweets, [approximate_spec(spec, capacity=CAPACITY)])
+    distinct = Counter(dict(exact))
+    assert len(distinct) > CAPACITY
+    assert [key for key, _, _ in approximate] == [key for key, _ in distinct.most_common(10)]
+    for key, count, error in approximate:
+        assert count - error <= distinct[key] <= count
@@ -0,0 +1,69 @@
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from bad_records import INVALID_JSON, MISSING_KEYS
+from benchmark.generate import generate
+from benchmark.streaming import sort_by_date
+from engine import FIELDS, parse_lines
+from streaming import WINDOW_FIELDS, WINDOW_KEYS, WindowedTopK, consume
+
+
+@pytest.fixture(scope='module')
+def ordered(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('streaming')
+    source, target = str(tmp / 'tweets.json'), str(tmp / 'ordered.json')
+    generate(source, lines=2500, days=2, user_cardinality=60, mention_cardinality=40, emoji_density=0.3, seed=3)
+    with open(source, 'ab') as f:
+        f.write(b'{"date": "2021-02-01T\n')
+        f.write(b'{"user": {"username": "sin_fecha"}}\n')
+        f.write(b'{"date": null, "content": ""}\n')
+        # Última línea sin salto de línea: debe quedar separada de la siguiente en la copia ordenada.
+        f.write(b'{"date": "2021-02-01T00:00:01+00:00", "user": {"username": "ultimo"}, "content": "\xf0\x9f\x94\xa5", "mentionedUsers": null}')
+    skipped = sort_by_date(source, target)
+    assert skipped.counts == {INVALID_JSON: 1, MISSING_KEYS: 2}
+    return target
+
+
+def brute_force(tweets, start, end):
+    counts = {name: Counter() for name in WINDOW_FIELDS}
+    total = 0
+    for timestamp, tweet in tweets:
+        if start <= timestamp < end:
+            total += 1
+            for name, field in WINDOW_FIELDS.items():
+                counts[name].update(FIELDS[field](tweet))
+    return total, counts
+
+
+@pytest.mark.parametrize('size,slide,lateness', [(3600, None, 0), (3600, 600, 0), (7200, 1800, 900)])
+def test_windows_match_brute_force(ordered, size, slide, lateness):
+    with open(ordered, 'rb') as f:
+        tweets = [(datetime.fromisoformat(tweet['date']).timestamp(), tweet) for tweet in parse_lines(f, WINDOW_KEYS)]
+    assert len(tweets) == 2501 and tweets == sorted(tweets, key=lambda item: item[0])
+
+    emitted = []
+    windows = WindowedTopK(size, slide, k=5, lateness=lateness, on_window=emitted.append)
+    with open(ordered, 'rb') as f:
+        consume(f, windows)
+    windows.flush()
+    assert windows.errors.total == 0
+
+    slide = slide or size
+    panes = {int(timestamp // slide) for timestamp, _ in tweets}
+    # Se emite cada ventana con tweets, hasta la que termina en el último panel (ver flush).
+    expected = sorted({(end - size // slide + 1) * slide for pane in panes
+                       for end in range(pane, min(pane + size // slide, max(panes) + 1))})
+    assert [datetime.fromisoformat(window['start']).timestamp() for window in emitted] == expected
+
+    for window in emitted:
+        start, end = datetime.fromisoformat(window['start']).timestamp(), datetime.fromisoformat(window['end']).timestamp()
+        total, counts = brute_force(tweets, start, end)
+        assert window['tweets'] == total
+        for name in WINDOW_FIELDS:
+            top = window[name]
+            assert len(top) == min(5, len(counts[name]))
+            # Los conteos son exactos; entre empates en el último puesto puede quedar cualquiera.
+            assert all(counts[name][key] == count for key, count in top)
+            assert [count for _, count in top] == [count for _, count in counts[name].most_common(5)]
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+import columnar  # noqa: E402
+import vectorized  # noqa: E402
+from benchmark.generate import generate  # noqa: E402
+from checkpoint import checkpoint_path  # noqa: E402
+from engine import Aggregator, Q1_SPEC, Q2_SPEC, Q3_SPEC, run_query, top_spec, vectorized_spec  # noqa: E402
+
+SPECS = [top_spec(Q1_SPEC, 10, 3), top_spec(Q2_SPEC, 10), top_spec(Q3_SPEC, 20)]
+
+
+@pytest.fixture
+def tweets(tmp_path, monkeypatch):
+    # Lotes chicos para que los conteos se mezclen muchas veces; pocos usuarios para que haya empates.
+    monkeypatch.setattr(vectorized, 'BATCH_SIZE', 7)
+    monkeypatch.setattr(vectorized, 'MAX_BATCH_SIZE', 64)
+    path = str(tmp_path / 'tweets.json')
+    generate(path, lines=3000, user_cardinality=40, mention_cardinality=30, seed=11)
+    return path
+
+
+def test_matches_counter(tweets):
+    assert run_query(tweets, [vectorized_spec(spec) for spec in SPECS]) == run_query(tweets, SPECS)
+
+
+def test_columnar_fast_path_matches_counter(tweets):
+    expected = run_query(tweets, SPECS)
+    columnar.build_cache(tweets)
+    specs = [vectorized_spec(spec) for spec in (SPECS[0], SPECS[2])]
+    assert all(vectorized.supports_cache(spec) for spec in specs)
+    assert run_query(tweets, specs) == [expected[0], expected[2]]
+
+
+def test_workers_and_incremental_match_counter(tweets):
+    expected = run_query(tweets, SPECS)
+    specs = [vectorized_spec(spec) for spec in SPECS]
+    assert run_query(tweets, specs, workers=3) == expected
+    assert run_query(tweets, specs, incremental=True) == run_query(tweets, SPECS, incremental=True) == expected
+    # El conteo exacto y el vectorizado guardan checkpoints distintos.
+    assert checkpoint_path(tweets, specs) != checkpoint_path(tweets, SPECS)
+    assert run_query(tweets, specs, incremental=True) == run_query(tweets, SPECS, incremental=True) == expected
+
+
+def test_merge_rejects_other_engine():
+    with pytest.raises(ValueError):
+        Aggregator(vectorized_spec(Q1_SPEC)).merge(Aggregator(Q1_SPEC))
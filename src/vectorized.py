@@ -0,0 +1,286 @@
+from typing import Dict, List, Optional, Tuple
+from bad_records import MISSING_KEYS, BadRecords
+from columnar import MISSING_DATE, MISSING_USER, read_columns
+
+# Se importa en el primer uso: NumPy es opcional y solo lo necesita el conteo vectorizado.
+np = None
+
+# Claves que se acumulan antes de convertirlas a ids y contarlas con NumPy. El lote crece con la
+# cantidad de pares distintos, hasta MAX_BATCH_SIZE, para que mezclar cada lote con los conteos
+# acumulados no domine.
+BATCH_SIZE = 1 << 16
+MAX_BATCH_SIZE = 1 << 20
+
+# Cada par (grupo, subclave) se cuenta como un entero de 64 bits: id de grupo en los 32 bits altos
+# e id de subclave en los bajos. Ordenadas, las claves de un grupo quedan contiguas.
+PAIR_SHIFT = 32
+SUB_MASK = (1 << PAIR_SHIFT) - 1
+
+
+def numpy_module():
+    """
+    Importa NumPy, que solo se necesita para el conteo vectorizado.
+    """
+    global np
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("Para el conteo vectorizado se necesita el paquete numpy (pip install numpy).") from None
+    return np
+
+
+class VectorCounts:
+    """
+    Conteos por grupo y, con subclaves, por (grupo, subclave), por ejemplo tweets por fecha y por
+    fecha y usuario, o menciones por usuario. Las claves se acumulan por lotes; cada lote se
+    convierte a arrays de ids enteros y se cuenta con operaciones vectorizadas de NumPy en lugar de
+    sumar en un Counter por tweet: bincount para los totales por grupo y unique sobre las claves de
+    64 bits de los pares para sus conteos.
+
+    Los desempates son los de Counter.most_common: los grupos reciben su id en orden de primera
+    aparición y de cada par se guarda la posición de su primera aparición, que desempata dentro del
+    grupo (lexsort por conteo y posición).
+    """
+
+    def __init__(self, sub_keys: bool = True):
+        numpy_module()
+        self.group_ids: Dict[str, int] = {}
+        self.groups: List[str] = []
+        self.sub_ids: Optional[Dict[str, int]] = {} if sub_keys else None
+        self.subs: List[str] = []
+        self.totals = np.zeros(0, dtype=np.int64)
+        # Pares distintos (claves ordenadas), su conteo y la posición de su primera aparición.
+        self.pair_keys = np.zeros(0, dtype=np.int64)
+        self.pair_counts = np.zeros(0, dtype=np.int64)
+        self.pair_first = np.zeros(0, dtype=np.int64)
+        self.pairs_seen = 0
+        self.batch_limit = BATCH_SIZE
+        self._new_batch()
+
+    def __setstate__(self, state: dict) -> None:
+        # Un proceso que solo recibe conteos ya hechos (checkpoint, procesos hijos) carga NumPy aquí.
+        numpy_module()
+        self.__dict__.update(state)
+
+    def _new_batch(self) -> None:
+        # Claves del lote en orden de llegada: grupos contados y, por cada par, su grupo y subclave.
+        self.batch_groups: List[str] = []
+        self.batch_pair_groups: List[str] = []
+        self.batch_pair_subs: List[str] = []
+
+    def _group(self, key: str) -> int:
+        """
+        Devuelve el id del grupo, registrándolo si es nuevo.
+        """
+        group_id = self.group_ids.get(key)
+        if group_id is None:
+            group_id = self.group_ids[key] = len(self.groups)
+            self.groups.append(key)
+        return group_id
+
+    def _sub(self, key: str) -> int:
+        """
+        Devuelve el id de la subclave, registrándola si es nueva.
+        """
+        sub_id = self.sub_ids.get(key)
+        if sub_id is None:
+            sub_id = self.sub_ids[key] = len(self.subs)
+            self.subs.append(key)
+        return sub_id
+
+    def update(self, keys: List[str], sub_keys: List[str] = ()) -> None:
+        """
+        Cuenta un elemento (por ejemplo un tweet) en cada grupo de keys y, dentro de cada uno, cada
+        subclave de sub_keys. Solo se guardan las claves; se convierten a ids y se cuentan al
+        completar el lote.
+        """
+        groups = self.batch_groups
+        groups += keys
+        if self.sub_ids is not None and sub_keys:
+            if len(keys) == 1:
+                self.batch_pair_groups += keys * len(sub_keys)
+                self.batch_pair_subs += sub_keys
+            else:
+                for key in keys:
+                    self.batch_pair_groups += [key] * len(sub_keys)
+                    self.batch_pair_subs += sub_keys
+        if len(groups) >= self.batch_limit or len(self.batch_pair_subs) >= self.batch_limit:
+            self.flush()
+
+    def _ids(self, keys: List[str], known: Dict[str, int], register) -> 'np.ndarray':
+        """
+        Convierte claves a ids, registrando las nuevas en orden de llegada.
+        """
+        return np.array([known[key] if key in known else register(key) for key in keys], dtype=np.uint32)
+
+    def flush(self) -> None:
+        """
+        Convierte el lote en curso a ids, lo cuenta y lo suma a los conteos acumulados.
+        """
+        if not self.batch_groups and not self.batch_pair_subs:
+            return
+        # Los grupos se registran en el orden del lote, que es el de primera aparición.
+        group_ids = self._ids(self.batch_groups, self.group_ids, self._group)
+        if self.sub_ids is None:
+            self._count(group_ids, group_ids[:0], group_ids[:0])
+        else:
+            self._count(group_ids, self._ids(self.batch_pair_groups, self.group_ids, self._group),
+                        self._ids(self.batch_pair_subs, self.sub_ids, self._sub))
+        self._new_batch()
+
+    def _count(self, group_ids, pair_groups, pair_subs) -> None:
+        """
+        Suma a los conteos un lote de ids de grupo y de pares (grupo, subclave), en orden de llegada.
+        """
+        totals = np.bincount(group_ids, minlength=len(self.groups))
+        totals[:len(self.totals)] += self.totals
+        self.totals = totals
+        if self.sub_ids is None or not len(pair_subs):
+            return
+        keys = (pair_groups.astype(np.int64) << PAIR_SHIFT) | pair_subs
+        unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        self._merge_pairs(unique, np.bincount(inverse.ravel(), minlength=len(unique)), first + self.pairs_seen)
+        self.pairs_seen += len(keys)
+        self.batch_limit = min(max(BATCH_SIZE, len(self.pair_keys)), MAX_BATCH_SIZE)
+
+    def _merge_pairs(self, keys, counts, first) -> None:
+        """
+        Suma pares distintos (sin repetidos, posiciones posteriores a las acumuladas) a los acumulados.
+        """
+        if not len(self.pair_keys):
+            order = np.argsort(keys, kind='stable')
+            self.pair_keys, self.pair_counts, self.pair_first = keys[order], counts[order], first[order]
+            return
+        size = len(self.pair_keys)
+        merged, index, inverse = np.unique(np.concatenate((self.pair_keys, keys)), return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        # Cada mitad no tiene claves repetidas, por lo que la suma por índice es exacta.
+        pair_counts = np.zeros(len(merged), dtype=np.int64)
+        pair_counts[inverse[:size]] += self.pair_counts
+        pair_counts[inverse[size:]] += counts
+        # index es la primera aparición en la concatenación: la posición acumulada si el par ya existía.
+        self.pair_first = np.concatenate((self.pair_first, first))[index]
+        self.pair_keys, self.pair_counts = merged, pair_counts
+
+    def add_codes(self, group_codes, group_names: List[str], sub_codes=None, sub_names: Optional[List[str]] = None) -> None:
+        """
+        Cuenta columnas de ids ya codificados con otros diccionarios (por ejemplo los de la caché
+        columnar): group_codes[i] es el grupo del elemento i (un nombre de group_names) y, con
+        subclaves, sub_codes[i] su subclave. Los ids se traducen a los propios en orden de primera
+        aparición.
+        """
+        self.flush()
+        group_ids = self._translate(group_codes, group_names, self._group)
+        if self.sub_ids is None or sub_codes is None:
+            self._count(group_ids, group_ids[:0], group_ids[:0])
+            return
+        self._count(group_ids, group_ids, self._translate(sub_codes, sub_names, self._sub))
+
+    def _translate(self, codes, names: List[str], register) -> 'np.ndarray':
+        """
+        Traduce ids de otro diccionario a los propios, registrando los nombres nuevos en orden de
+        primera aparición en codes.
+        """
+        if not len(codes):
+            return np.zeros(0, dtype=np.uint32)
+        unique, first = np.unique(codes, return_index=True)
+        lookup = np.zeros(int(unique[-1]) + 1, dtype=np.uint32)
+        for code in unique[np.argsort(first, kind='stable')].tolist():
+            lookup[code] = register(names[code])
+        return lookup[codes]
+
+    def merge(self, other: 'VectorCounts') -> None:
+        """
+        Suma los conteos de otro VectorCounts (con sus propios ids), que deben ser de una parte
+        posterior del archivo.
+        """
+        self.flush()
+        other.flush()
+        group_ids = np.array([self._group(key) for key in other.groups], dtype=np.int64)
+        totals = np.zeros(len(self.groups), dtype=np.int64)
+        totals[:len(self.totals)] = self.totals
+        totals[group_ids] += other.totals
+        self.totals = totals
+        if self.sub_ids is None or not len(other.pair_keys):
+            return
+        sub_ids = np.array([self._sub(key) for key in other.subs], dtype=np.int64)
+        keys = (group_ids[other.pair_keys >> PAIR_SHIFT] << PAIR_SHIFT) | sub_ids[other.pair_keys & SUB_MASK]
+        self._merge_pairs(keys, other.pair_counts, other.pair_first + self.pairs_seen)
+        self.pairs_seen += other.pairs_seen
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        """
+        Los n grupos con más elementos, con su conteo (desempata por orden de primera aparición).
+        """
+        self.flush()
+        top = np.argsort(-self.totals, kind='stable')[:n]
+        return [(self.groups[group_id], int(self.totals[group_id])) for group_id in top.tolist()]
+
+    def sub_most_common(self, key: str, n: int) -> List[Tuple[str, int]]:
+        """
+        Las n subclaves más frecuentes dentro del grupo, con su conteo.
+        """
+        self.flush()
+        group_id = self.group_ids[key]
+        start, end = np.searchsorted(self.pair_keys, [group_id << PAIR_SHIFT, (group_id + 1) << PAIR_SHIFT])
+        counts, first = self.pair_counts[start:end], self.pair_first[start:end]
+        top = np.lexsort((first, -counts))[:n] + start
+        return [(self.subs[sub_id], int(count)) for sub_id, count in
+                zip((self.pair_keys[top] & SUB_MASK).tolist(), self.pair_counts[top].tolist())]
+
+
+# Campos que se leen como columnas de la caché columnar (ver columnar.py): columna de ids,
+# diccionario de nombres y bit de 'flags' que indica que el tweet original no tenía el campo. Las
+# fechas y los usuarios tienen un id por registro; las menciones, los ids de todos los tweets
+# aplanados (un tweet sin menciones válidas no aporta ids ni se descarta, como en extract_mentions).
+CACHE_COLUMNS: Dict[str, Tuple[str, str, int]] = {
+    'date': ('date_ids', 'date_dict', MISSING_DATE),
+    'username': ('user_ids', 'user_dict', MISSING_USER),
+    'mention': ('mention_ids', 'user_dict', 0),
+}
+
+
+def supports_cache(spec) -> bool:
+    """
+    Indica si la agregación vectorizada se puede resolver con las columnas de la caché columnar: sin
+    subgrupo sobre fechas, usuarios o menciones, o por fecha y usuario (un valor de cada uno por tweet).
+    """
+    if spec.group_by not in ('date', 'username', 'mention'):
+        return False
+    return spec.sub_group is None or {spec.group_by, spec.sub_group} <= {'date', 'username'}
+
+
+def scan_cache(file_path: str, aggregators: List, errors: Optional[BadRecords] = None) -> List:
+    """
+    Alimenta agregadores vectorizados (ver supports_cache) con las columnas de ids de la caché
+    columnar, sin reconstruir los tweets. Los registros a los que les falta un campo de alguna
+    agregación se cuentan una vez en errors, como en el recorrido por tweets, junto con las líneas
+    descartadas al generar la caché.
+    """
+    specs = [aggregator.spec for aggregator in aggregators]
+    fields = {spec.group_by for spec in specs} | {spec.sub_group for spec in specs if spec.sub_group}
+    _, columns = read_columns(file_path, ['flags'] + sorted({name for field in fields for name in CACHE_COLUMNS[field][:2]}), errors)
+    flags = np.frombuffer(columns['flags'], dtype=np.uint8)
+
+    def column(field: str, mask):
+        ids = np.frombuffer(columns[CACHE_COLUMNS[field][0]], dtype=np.uint32)
+        return ids if field == 'mention' else ids[mask]
+
+    required = 0
+    for aggregator in aggregators:
+        spec = aggregator.spec
+        missing = CACHE_COLUMNS[spec.group_by][2] | (CACHE_COLUMNS[spec.sub_group][2] if spec.sub_group else 0)
+        required |= missing
+        # Como en Aggregator.add, un tweet sin alguno de los campos de la agregación no se cuenta.
+        mask = (flags & missing) == 0
+        group_names = columns[CACHE_COLUMNS[spec.group_by][1]]
+        if spec.sub_group is None:
+            aggregator.vector.add_codes(column(spec.group_by, mask), group_names)
+        else:
+            aggregator.vector.add_codes(column(spec.group_by, mask), group_names,
+                                        column(spec.sub_group, mask), columns[CACHE_COLUMNS[spec.sub_group][1]])
+
+    skipped = int(np.count_nonzero(flags & required))
+    if errors is not None and skipped:
+        errors.counts[MISSING_KEYS] += skipped
+    return aggregators